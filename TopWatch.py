@@ -1,22 +1,54 @@
 import sys
 import signal
-import time
 signal.signal(signal.SIGINT, signal.SIG_DFL)
 
+# If an instance is already running, the command is forwarded to it before anything from Qt is imported
+if __name__ == '__main__':
+    import control
+    command = control.forward(sys.argv[1:])
+
+    # The frame server, the lean and the terminal backends do not need QtWidgets, so they are chosen before importing it
+    import os.path as opath
+    import setup
+
+    configuration, ok = setup.init(opath.dirname(opath.realpath(__file__)))
+    if command.get('frames') is not None:
+        import frameserver
+
+        sys.exit(frameserver.main(command, configuration))
+
+    backend = command.get('backend') or configuration['backend']
+    if backend == 'lean':
+        import lean
+
+        sys.exit(lean.main(command, configuration))
+
+    if backend == 'tty':
+        import terminal
+
+        sys.exit(terminal.main(command, configuration))
+
 import os
 import os.path         as     opath
 
-from   PyQt5.QtWidgets import QApplication, QAction, QLabel, QSizePolicy, QMainWindow, QColorDialog, QFontDialog, QPushButton, QGridLayout, QWidget, QTimeEdit, QDesktopWidget, QGraphicsOpacityEffect, QDoubleSpinBox
-from   PyQt5.QtGui     import QFont, QColor, QIcon
-from   PyQt5.QtCore    import Qt, QPoint, QTimer, QDateTime, QTime
+# Only what is needed to show the clock is imported here, dialogs and menus are imported when first used
+from   PyQt5.QtWidgets import QApplication, QMainWindow
+from   PyQt5.QtCore    import Qt, QTimer
 
 # Own imports
 import setup
+import timing
+import chrono
+from   controller      import Controller
+from   clockwidget     import ClockWidget
 
-class App(QMainWindow):
-    def __init__(self, *arg, **kwargs):
+class App(Controller, QMainWindow):
+    def __init__(self, configuration=None, clock=None, *arg, **kwargs):
         '''
         Initialize the Application.
+
+        :param dict configuration: checked settings (see setup.check). If None, they are read from the setting file.
+        :param clock: clock of the schedulers (see clocksource.py). If None, the system clock is used.
         '''
 
         super().__init__()
@@ -25,42 +57,58 @@ class App(QMainWindow):
         self.setAttribute(Qt.WA_NoSystemBackground, True)
         self.setAttribute(Qt.WA_TranslucentBackground, True)
 
-        # Hidden opacity used as a temporary slot when opacity is changed for blinking
-        self._opacity     = 1
-
-        # set app icon
-        self.scriptDir    = opath.dirname(opath.realpath(__file__))
-        self.setWindowIcon(QIcon(opath.join(self.scriptDir, 'icon.png')))
-
         # Setup initial color, font and window position
-        configuration, ok = setup.init(self.scriptDir)
-        self.color        = configuration['color']
-        self.font         = QFont()
-        self.font.fromString(configuration['font'])
+        if configuration is None:
+            configuration, ok = setup.init(opath.dirname(opath.realpath(__file__)))
 
-        self.xpos         = configuration['x']
-        self.ypos         = configuration['y']
+        self.initState(configuration, clock=clock)
         self.setGeometry(self.xpos, self.ypos, self.geometry().width(), self.geometry().height())
 
-        self.opacity      = configuration['opacity']
-
-        self.blinkActive  = False
-        self.blinkPeriod  = configuration['blinkPeriod']
-        self.blinkNb      = configuration['blinkNb']
-        self.blinkFreq    = configuration['blinkFreq']
-
-        # Add label
-        self.label        = QLabel('', self)
-        self.label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.label.setAlignment(Qt.AlignCenter)
-        self.label.setStyleSheet('QLabel { color: %s}' %self.color)
+        # Add label drawn from cached glyphs, its opacity being applied when painting
+        self.label        = ClockWidget('', self)
+        self.label.setColor(self.color)
         self.label.setFont(self.font)
+        self.label.setOpacity(self.opacity)
+        self.label.setFormat(self.timeFormat)
         self.showTime()
 
         self.setCentralWidget(self.label)
 
-        # Set menu
+        # Menus are only given their title now so that the layout does not change once their actions are added
         menubar           = self.menuBar()
+        self.filemenu     = menubar.addMenu('&File')
+        self.editmenu     = menubar.addMenu('&Edit')
+        self.settingmenu  = menubar.addMenu('&Settings')
+
+        # Tickers, dragging, autosave and blinking engine
+        self.initEngines()
+        self.setAutoFillBackground(True)
+
+        self.show()
+
+        # Set dimensions relative to label dimensions
+        size              = self.label.sizeHint()
+        self.setFixedSize(size.width()+5, size.height()+5)
+        self.visibility.add(self, self.label, self.showTime)
+
+        # Additional clocks in other time zones, driven by the same scheduler
+        self.clocks       = []
+        for clock in configuration['clocks']:
+            self.addClock(clock)
+
+        # Everything not needed to show the clock is done once the first frame is shown
+        QTimer.singleShot(0, self.finishStartup)
+
+    def finishStartup(self, *args, **kwargs):
+        '''Set the application icon and the menu actions. Called once the clock is shown.'''
+
+        from PyQt5.QtWidgets import QAction, QActionGroup
+        from PyQt5.QtGui     import QIcon
+
+        # set app icon
+        self.setWindowIcon(QIcon(opath.join(self.scriptDir, 'icon.png')))
+
+        # Set menu
         colorAction       = QAction('&Text color', self)
         colorAction.setShortcut('Ctrl+C')
         colorAction.setStatusTip('Change text color')
@@ -81,253 +129,191 @@ class App(QMainWindow):
         saveAction.setStatusTip('Save current configuration')
         saveAction.triggered.connect(self.save)
         
+        secondsAction     = QAction('Show s&econds', self)
+        secondsAction.setCheckable(True)
+        secondsAction.setChecked(timing.granularity(self.timeFormat) <= 1000)
+        secondsAction.setStatusTip('Show seconds (hh:mm:ss) instead of minutes (hh:mm)')
+        secondsAction.toggled.connect(lambda checked: self.setTimeFormat('hh:mm:ss' if checked else 'hh:mm'))
+
+        preciseAction     = QAction('&High precision', self)
+        preciseAction.setCheckable(True)
+        preciseAction.setChecked(self.precise)
+        preciseAction.setStatusTip('Show changes within a fraction of a ms of the real time')
+        preciseAction.toggled.connect(self.setPrecise)
+
+        snapAction        = QAction('S&nap to edges', self)
+        snapAction.setCheckable(True)
+        snapAction.setChecked(self.snap)
+        snapAction.setStatusTip('Snap the window to the screen edges when dragged')
+        snapAction.toggled.connect(self.setSnap)
+
         blinkAction       = QAction('&Blink', self)
         blinkAction.setShortcut('Ctrl+b')
         blinkAction.setStatusTip('Blink configuration')
         blinkAction.triggered.connect(self.blinkWindow)
 
-        self.filemenu     = menubar.addMenu('&File')
+        toggleAction      = QAction('&Start/pause timer', self)
+        toggleAction.setShortcut('Space')
+        toggleAction.setStatusTip('Start or pause the countdown, stopwatch or interval timer')
+        toggleAction.triggered.connect(self.toggleTimer)
+
+        resetTimerAction  = QAction('Reset &timer', self)
+        resetTimerAction.setShortcut('Ctrl+R')
+        resetTimerAction.setStatusTip('Reset the countdown, stopwatch or interval timer')
+        resetTimerAction.triggered.connect(self.resetTimer)
+
+        durationAction    = QAction('Timer &duration', self)
+        durationAction.setStatusTip('Change the duration of the countdown and of the interval timer')
+        durationAction.triggered.connect(self.changeTimerDuration)
+
         self.filemenu.addAction(saveAction)
-        
-        self.editmenu     = menubar.addMenu('&Edit')
         self.editmenu.addAction(blinkAction)
-
-        self.settingmenu  = menubar.addMenu('&Settings')
+        self.editmenu.addAction(toggleAction)
+        self.editmenu.addAction(resetTimerAction)
+        self.editmenu.addAction(durationAction)
+
+        # Modes are mutually exclusive
+        modemenu          = self.settingmenu.addMenu('&Mode')
+        modegroup         = QActionGroup(self)
+        for mode, title in zip(chrono.MODES, ['&Clock', 'Count&down', '&Stopwatch', '&Interval timer']):
+            modeAction    = QAction(title, self)
+            modeAction.setCheckable(True)
+            modeAction.setChecked(mode == self.mode)
+            modeAction.triggered.connect(lambda checked, mode=mode: self.setMode(mode))
+            modegroup.addAction(modeAction)
+            modemenu.addAction(modeAction)
+            self.menuActions[mode] = modeAction
         self.settingmenu.addAction(colorAction)
         self.settingmenu.addAction(fontAction)
+        self.settingmenu.addAction(secondsAction)
+        self.settingmenu.addAction(preciseAction)
+        self.settingmenu.addAction(snapAction)
         self.settingmenu.addAction(resetAction)
 
-        # Start timer
-        self.timer        = QTimer()
-        self.timer.timeout.connect(self.showTime)
-        self.timer.start(1000)
-
-        # Blink timer
-        self.blinktimer  = QTimer()
-        self.blinktimer.timeout.connect(self.run_blink)
-
-        # Small timer used to make the text flicker rapidly
-        self.smalltimer = QTimer()
-        self.smalltimer.timeout.connect(self.blink_text)
-
-        self.op = QGraphicsOpacityEffect(self)
-        self.op.setOpacity(self.opacity)
-        self.label.setGraphicsEffect(self.op)
-        self.setAutoFillBackground(True)
-
-        self.show()
+        self.menuActions.update({'seconds' : secondsAction, 'precise' : preciseAction, 'snap' : snapAction})
 
-        # Set dimensions relative to label dimensions
-        width             = self.label.fontMetrics().width(self.label.text())+5
-        height            = self.label.fontMetrics().height()+5
-        self.setFixedSize(width, height)
+        # Setting file watcher, control server and SIGUSR1 handling
+        self.startServices()
 
+        # Statistics are optionally shown on screen
+        self.statsOverlay = None
+        if self.statsMode == 'overlay':
+            from statswidget import StatsOverlay
 
-    #####################################
-    #        Blink windows setup        #
-    #####################################
+            self.statsOverlay = StatsOverlay()
+        return
 
-    def blinkWindow(self, *args, **kwargs):
-        '''
-        Creates a window to setup blinking.
-        If blinking is activated, calling this function deactivates it.
+    def addClock(self, configuration, *args, **kwargs):
         '''
+        Show an additional clock in another time zone.
 
-        if self.blinkActive:
-            # Reset to default values and show back the clock
-            self.blinkActive = False
+        :param dict configuration: clock configuration (see setup.CLOCKKEYS)
+        '''
 
-            # Stop timers
-            self.smalltimer.stop()
-            self.blinktimer.stop()
+        from zoneclock import ZoneClock
 
-            # Resume previous opacity
-            self.opacity     = self._opacity
-            self.setLabelOpacity(self.opacity)
-        else:
-            blinkDialog      = BlinkWindow(self)
-            blinkDialog.show()
+        try:
+            clock = ZoneClock(configuration, self)
+        except ValueError as e:
+            print('%s. The clock will not be shown.' %e)
+            return
 
+        self.clocks.append(clock)
+        self.visibility.add(clock, clock, clock.showTime)
         return
 
-    def blink_text(self, *args, **kwargs):
-        '''Function used to make the text blink a given number of times.'''
+    def setClocks(self, configurations, *args, **kwargs):
+        '''
+        Only close or create the additional clocks which changed.
 
-        self.cnt += 1
-        self.setLabelOpacity(1-self.opacity)
+        :param list configurations: clock configurations (see setup.CLOCKKEYS)
+        '''
 
-        # Blink 9 times for now and then stop small timer
-        if self.cnt == self.blinkNb:
-            self.setLabelOpacity(0)
-            self.smalltimer.stop()
+        for clock in list(self.clocks):
+            if clock.configuration() not in configurations:
+                self.clocks.remove(clock)
+                clock.close()
 
+        kept = [clock.configuration() for clock in self.clocks]
+        for clock in configurations:
+            if clock not in kept:
+                self.addClock(clock)
         return
 
-    def run_blink(self, *args, **kwargs):
-        '''Function called ever time the text must be blinked.'''
+    def clockConfigurations(self, *args, **kwargs):
+        '''Configurations of the additional clocks as written in the setting file.'''
 
-        # Counter used to know when to stop the flickering
-        self.cnt         = 0
-        self.smalltimer.start(100)
-        return
+        return [clock.configuration() for clock in self.clocks]
 
-    def start_blink(self, blinkfreq, period, nb, *args, **kwargs):
-        '''
-        Starts blinking of the clock.
+    #####################################
+    #        Blink windows setup        #
+    #####################################
 
-        :param float blinkfreq: number of ms between blinks
-        :param QTimeEdit period: time between two blink phases
-        :param int nb: number of blinks per blink phase
+    def blinkWindow(self, *args, **kwargs):
+        '''
+        Creates a window to setup blinking.
+        If blinking is activated, calling this function deactivates it.
         '''
 
-        if not isinstance(blinkfreq, (int, float)):
-            raise TypeError('Blinking frequency must be an int but is given as a %s' %type(blinkfreq))
-        else:
-            blinkfreq    = int(blinkfreq)
-
-        if blinkfreq <= 0:
-            raise ValueError('Blinking frequency must be positive only (current value is %f)' %blinkfreq)
-
-        if not isinstance(nb, (int, float)):
-            raise TypeError('Number of blinks must be int but is given as a %s' %type(nb))
+        if self.blinkActive:
+            self.stopBlink()
         else:
-            nb           = int(nb)
-
-        if nb <= 0:
-            raise ValueError('Number of blinks must be positive only (current value is %d)' %nb)
-
-        # Store values if the user save the current configuration later on
-        self.blinkActive = True
-        self.blinkNb     = nb
-        self.blinkFreq   = blinkfreq # in ms
-        self.blinkPeriod = period
+            from blinkwindow import BlinkWindow
 
-        # Period between blinking phases in ms
-        period_ms        = sum([int(i)*60**pos for pos, i in enumerate(self.blinkPeriod.toString().split(':')[::-1])]) * 1000
-
-        # Save opacity for when we go back to normal
-        self._opacity    = self.opacity
-        self.setLabelOpacity(0)
+            blinkDialog      = BlinkWindow(self)
+            blinkDialog.show()
 
-        self.blinktimer.start(period_ms)
         return
 
 
     #############################################
     #               Miscellaneous               #
     #############################################
-    
-    def setLabelOpacity(self, value, *args, **kwargs):
-        '''Set the opacity of the label.'''
-        
-        if value > 1:
-            value = 1
-        elif value < 0:
-            value = 0
-            
-        self.opacity = value
-        self.op.setOpacity(self.opacity)
-        return
 
     def changeColor(self, *args, **kwargs):
         '''Ask for a text color and change it.'''
 
+        from PyQt5.QtWidgets import QColorDialog
+
         color         = QColorDialog.getColor()
         if color.isValid():
            self.color = color
-           self.label.setStyleSheet('QLabel { color: %s }' %self.color.name())
+           self.label.setColor(self.color)
+           self.autosave.request()
         return
 
     def changeFont(self, *args, **kwargs):
         '''Ask for a text style and change it.'''
 
+        from PyQt5.QtWidgets import QFontDialog
+
         font, ok = QFontDialog.getFont()
         if ok:
            self.font = font
            self.updateFont()
+           self.autosave.request()
         return
 
-    def keyPressEvent(self, e, *args, **kwargs):
-        ''''Actions taken when a key is pressed.'''
-        
-        # Deal with shift key being pressed first
-        if e.modifiers() & Qt.ShiftModifier:
-            if e.key() == Qt.Key_Up:
-                self.setLabelOpacity(self.opacity+0.05)
-            elif e.key() == Qt.Key_Down:
-                self.setLabelOpacity(self.opacity-0.05)
-        else:
-            if e.key() == Qt.Key_Down:
-               newSize = self.font.pointSize()-1
-               if newSize < 1:
-                   newSize = 1
-    
-               self.font.setPointSize(newSize)
-    
-            elif e.key() == Qt.Key_Up:
-               self.font.setPointSize(self.font.pointSize()+1)
-    
-            else:
-               return
-    
-            self.updateFont()
-        return
-
-    def reset(self, *args, **kwargs):
-       '''Reset the configuration.'''
-
-       # Reset interface
-       self.color = '#ffdd1c'
-       self.font.fromString('fixed,30,-1,5,75,0,0,0,0,0')
-       self.label.setStyleSheet('QLabel { color: %s }' %self.color)
-       self.updateFont()
+    def changeTimerDuration(self, *args, **kwargs):
+        '''Ask for the duration of the countdown and of the interval timer, and reset the timer.'''
 
-       # Reset configuration file
-       setup.default('settings.yaml')
-       return
+        from PyQt5.QtWidgets import QInputDialog
 
-    def updateFont(self, *args, **kwargs):
-        '''Update the label font with the value given in self.font and update the window size accordingly.'''
+        text, ok     = QInputDialog.getText(self, 'TopWatch - Timer duration', 'Duration (hh:mm:ss)',
+                                            text=chrono.durationString(self.timerDuration))
+        if not ok:
+            return
 
-        self.label.setFont(self.font)
-        width  = self.label.fontMetrics().width(self.label.text())+2
-        height = self.label.fontMetrics().height()+2
-        self.setFixedSize(width, height)
-        return
+        duration     = chrono.parseDuration(text)
+        if duration is None or duration <= 0:
+            print('Given timer duration %s is not a positive duration in format hh:mm:ss.' %text)
+            return
 
-    def save(self, *args, **kwargs):
-        '''Save the current configuration.'''
-
-        # Try to save color with its name if it exists, otherwise use color code
-        try:
-            color     = self.color.name()
-        except AttributeError:
-            color     = self.color
-
-        # Convert blinking period from Qt Qtimer to string
-        period_str    = self.blinkPeriod.toString()
-
-        configuration = {'font'        : self.font.toString(),
-                         'color'       : color,
-                         'x'           : self.x(),
-                         'y'           : self.y(),
-                         'opacity'     : round(self.opacity, 2),
-                         'blinkPeriod' : period_str,
-                         'blinkFreq'   : int(self.blinkFreq),
-                         'blinkNb'     : int(self.blinkNb)
-                        }
-        setup.writeConfiguration(opath.join(self.scriptDir, 'settings.yaml'), configuration)
-        return
-
-
-    def showTime(self, *args, **kwargs):
-        '''Update the time label when value has changed.'''
-
-        time       = QDateTime.currentDateTime()
-        timeStr    = time.toString('hh:mm')
-        
-        if timeStr != self.label.text():
-            self.label.setText(timeStr)
+        self.timerDuration = duration
+        if self.chrono is not None:
+            self.setMode(self.mode)
+        else:
+            self.autosave.request()
         return
 
     ############################################
@@ -339,126 +325,42 @@ class App(QMainWindow):
         button = event.button()
         
         if   button == 1:
-            self.oldPos = event.globalPos()
+            self.dragger.start(event.globalPos())
         elif button == 2:
             self.close()
         return
 
     def mouseMoveEvent(self, event):
-        delta = QPoint(event.globalPos() - self.oldPos)
-        self.move(self.x() + delta.x(), self.y() + delta.y())
-        self.oldPos = event.globalPos()
+        self.dragger.moveTo(event.globalPos())
         return
 
-class BlinkWindow(QMainWindow):
-    def __init__(self, parent, *arg, **kwargs):
-        '''
-        Initialize the Window.
-        '''
-
-        super().__init__(parent)
-        self.parent    = parent
-
-        self.setWindowTitle('TopWatch - Setup blinking')
-        self.setWindowFlags(Qt.Dialog)
-        sizeObject = QDesktopWidget().screenGeometry(-1)
-        self.setGeometry(sizeObject.width()//2, sizeObject.height()//2, self.geometry().width(), self.geometry().height())
-
-        # Time edit label
-        self.teditTxt = QLabel()
-        self.teditTxt.setText('Period (hh:mm:ss)')
-
-        # Time edit widget
-        self.tedit    = QTimeEdit(self)
-        self.tedit.setDisplayFormat('hh:mm:ss')
-        self.tedit.setTime(self.parent.blinkPeriod)
-
-        # Duration edit label
-        self.lenTxt   = QLabel()
-        self.lenTxt.setText('Duration (ms)')
-
-        # Duration edit widget
-        self.lenedit  = QDoubleSpinBox(self)
-        self.lenedit.setDecimals(0)
-        self.lenedit.setMaximum(10000)
-        self.lenedit.setMinimum(50)
-        self.lenedit.setValue(self.parent.blinkFreq)
-
-        # Blink number edit label
-        self.blnbTxt  = QLabel()
-        self.blnbTxt.setText('Blink number')
-
-        # Blink number edit widget
-        self.blnbedit = QDoubleSpinBox(self)
-        self.blnbedit.setValue(self.parent.blinkNb)
-        self.blnbedit.setDecimals(0)
-        self.blnbedit.setMinimum(1)
+    def mouseReleaseEvent(self, event):
 
-        # Ok button setup
-        self.okButton = QPushButton(self)
-        self.okButton.setText('Ok')
-        self.okButton.clicked.connect(self.ok)
-        self.okButton.setToolTip("Activate blinking")
-
-        # Cancel button setup
-        self.cancelButton = QPushButton(self)
-        self.cancelButton.setText('Cancel')
-        self.cancelButton.clicked.connect(self.cancel)
-        self.cancelButton.setToolTip("Cancel blinking setup")
-
-        # Layout
-        self.layout      = QGridLayout()
-
-        self.layout.addWidget(self.teditTxt,     0, 0)
-        self.layout.addWidget(self.tedit,        1, 0)
-
-        self.layout.addWidget(self.lenTxt,       2, 0)
-        self.layout.addWidget(self.lenedit,      3, 0)
-
-        self.layout.addWidget(self.blnbTxt,      2, 1)
-        self.layout.addWidget(self.blnbedit,     3, 1)
-
-        self.layout.addWidget(self.okButton,     4, 0)
-        self.layout.addWidget(self.cancelButton, 4, 1)
-
-        self.mainWidget   = QWidget()
-        self.mainWidget.setLayout(self.layout)
-        self.setCentralWidget(self.mainWidget)
-
-
-    ###############################
-    #           Methods           #
-    ###############################
-
-    def cancel(self, *args, **kwargs):
-        '''When cancel is pressed blinking parameters are updated it the user wants to save later on.'''
-
-        self.parent.blinkNb     = self.blnbedit.value()
-        self.parent.blinkPeriod = self.tedit.time()
-        self.parent.blinkFreq   = self.lenedit.value()
-        self.close()
+        if event.button() == 1:
+            self.dragger.finish()
+            self.autosave.request()
         return
 
-    def keyPressEvent(self, e, *args, **kwargs):
-        '''Actions taken when a key is pressed.'''
+    def closeEvent(self, event):
+        '''Write pending changes before closing.'''
 
-        if e.key() == Qt.Key_Escape:
-           self.cancel(*args, **kwargs)
-        elif e.key() == Qt.Key_Return:
-            self.ok(*args, **kwargs)
-        return
+        self.shutdown()
+        for clock in self.clocks:
+            clock.close()
 
-    def ok(self, *args, **kwargs):
-        '''Start blinking when ok is pressed.'''
+        if getattr(self, 'statsOverlay', None) is not None:
+            self.statsOverlay.close()
 
-        self.parent.start_blink(self.lenedit.value(), self.tedit.time(), self.blnbedit.value())
-        self.close()
+        super().closeEvent(event)
         return
 
 
-
 if __name__ == '__main__':
-    root   = QApplication(sys.argv)
-    app    = App()
-    sys.exit(root.exec_())
+    root   = QApplication(sys.argv[:1])
+    app    = App(configuration)
 
+    # The command given on the command line is run once the clock is shown
+    if command['command'] != 'show':
+        QTimer.singleShot(0, lambda: print(app.command(command)))
+
+    sys.exit(root.exec_())
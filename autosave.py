@@ -0,0 +1,154 @@
+"""
+Mercier Wilfried - IRAP
+
+Automatic saving of the configuration, written off the GUI thread.
+"""
+
+import threading
+from   PyQt5.QtCore import QObject, QTimer
+
+# Own imports
+import setup
+
+class AutoSaver(QObject):
+    '''
+    Save the configuration a given delay after the last change.
+
+    Changes happening within the delay are coalesced into a single save. The configuration is only gathered on the GUI thread,
+    serialising and writing it is done by a worker thread so that saving never stalls the interface.
+    '''
+
+    def __init__(self, fname, configuration, delay=1000, parent=None, *args, **kwargs):
+        '''
+        Initialize the saver.
+
+        Parameters
+        ----------
+            fname : str
+                name of the YAML setting file
+            configuration : function
+                function returning the configuration dictionnary to save
+            delay : int
+                time in ms without changes after which the configuration is saved
+            parent : QObject
+                parent object
+        '''
+
+        super().__init__(parent)
+
+        self.fname         = fname
+        self.configuration = configuration
+
+        # Nothing is saved when disabled, e.g. when the setting file belongs to another process
+        self.enabled       = True
+
+        self.timer         = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.saveNow)
+
+        # Latest configuration waiting to be written, older ones being dropped
+        self._cond         = threading.Condition()
+        self._pending      = None
+        self._busy         = False
+
+        # Content of the latest file written, so that changes made by the saver itself can be recognised
+        self._written      = None
+
+        # The worker thread is only started when something must be saved
+        self._thread       = None
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def request(self, *args, **kwargs):
+        '''Ask for the configuration to be saved once no other change happens for a while.'''
+
+        if self.enabled:
+            self.timer.start()
+        return
+
+    def cancel(self, *args, **kwargs):
+        '''Drop the pending save request, e.g. when the change comes from the setting file itself.'''
+
+        self.timer.stop()
+        return
+
+    def saveNow(self, configuration=None, *args, **kwargs):
+        '''
+        Save the configuration without waiting.
+
+        Parameters
+        ----------
+            configuration : dict
+                configuration to save. If None, the current configuration is used.
+        '''
+
+        self.timer.stop()
+        if not self.enabled:
+            return
+
+        if configuration is None:
+            configuration = self.configuration()
+
+        with self._cond:
+            self._pending = configuration
+            self._cond.notify_all()
+
+        if self._thread is None:
+            self._thread  = threading.Thread(target=self._run, name='TopWatch autosave', daemon=True)
+            self._thread.start()
+        return
+
+    def written(self, text, *args, **kwargs):
+        '''
+        Whether a content is the one written by the latest save.
+
+        Parameters
+        ----------
+            text : str
+                content of the setting file
+        '''
+
+        with self._cond:
+            return text == self._written
+
+    def flush(self, timeout=5, *args, **kwargs):
+        '''
+        Save pending changes and wait until everything is written.
+
+        Parameters
+        ----------
+            timeout : float
+                maximum time to wait in s
+        '''
+
+        if self.timer.isActive():
+            self.saveNow()
+
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending is None and not self._busy, timeout)
+        return
+
+    def _run(self, *args, **kwargs):
+        '''Worker thread writing configurations as they come.'''
+
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None)
+                configuration = self._pending
+                self._pending = None
+                self._busy    = True
+
+            written           = None
+            try:
+                written       = setup.writeConfiguration(self.fname, configuration)
+            except (OSError, ValueError) as e:
+                print('Configuration could not be saved in %s: %s' %(self.fname, e))
+
+            with self._cond:
+                if written is not None:
+                    self._written = written
+                self._busy    = False
+                self._cond.notify_all()
@@ -0,0 +1,437 @@
+"""
+Mercier Wilfried - IRAP
+
+Headless benchmarks of TopWatch.
+
+Run with
+
+    python benchmark.py -o results.json
+
+and compare two runs (e.g. from two commits) with
+
+    python benchmark.py --compare old.json new.json
+
+The benchmarks run with the offscreen Qt platform so that no display is needed. Every clock measured, including the ones
+started in child processes to measure the startup, uses the default settings with autosave disabled, so that the setting
+file is never read nor written.
+"""
+
+import os
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+import resource
+import subprocess
+import os.path     as opath
+
+scriptDir = opath.dirname(opath.realpath(__file__))
+
+# Font sizes at which the paint time is measured
+FONTSIZES = [30, 100, 300]
+
+def commit(*args, **kwargs):
+    '''Current git commit of the code, or None if it cannot be found.'''
+
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=scriptDir, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def usage(*args, **kwargs):
+    '''CPU time (s) and number of voluntary context switches of the current process.'''
+
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return ru.ru_utime + ru.ru_stime, ru.ru_nvcsw
+
+def peakRSS(*args, **kwargs):
+    '''Peak resident set size of the current process in kB.'''
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+##########################################
+#               Benchmarks               #
+##########################################
+
+def firstPaint(t0, backend='widgets', *args, **kwargs):
+    '''
+    Start the application and print the time in s between t0 and the first painted frame, and the peak RSS at that time.
+    Meant to be run in a child process.
+
+    Parameters
+    ----------
+        t0 : float
+            POSIX time at which the process was started
+        backend : str
+            'widgets' or 'lean' (see lean.py)
+    '''
+
+    from   PyQt5.QtCore    import QObject, QEvent, QTimer
+
+    def done():
+        print(json.dumps({'firstPaint' : time.time() - t0, 'peakRSS' : peakRSS()}))
+        root.quit()
+
+    # Windows without widgets are painted when they are exposed, without paint event
+    paint  = QEvent.Expose if backend == 'lean' else QEvent.Paint
+
+    class PaintFilter(QObject):
+        '''Quit as soon as the first paint event has been processed.'''
+
+        def eventFilter(self, obj, event):
+            if event.type() == paint:
+                root.removeEventFilter(self)
+                QTimer.singleShot(0, done)
+            return False
+
+    # The lean backend must never import QtWidgets
+    if backend == 'lean':
+        from PyQt5.QtGui     import QGuiApplication as Application
+    else:
+        from PyQt5.QtWidgets import QApplication    as Application
+
+    root   = Application(sys.argv)
+
+    # The filter is installed on the application since the first painted widget is not known in advance
+    filt   = PaintFilter()
+    root.installEventFilter(filt)
+
+    # Default settings are given so that no setting file is created when there is none
+    import setup
+
+    configuration = setup.check(dict(setup.DEFAULT))
+    if backend == 'lean':
+        import lean
+        clock  = lean.LeanClock(configuration)
+    else:
+        import TopWatch
+        clock  = TopWatch.App(configuration)
+    clock.autosave.enabled = False
+
+    # The clock is kept alive until the event loop is over
+    root.exec_()
+    del clock
+    return
+
+def startup(nb=5, backend='widgets', *args, **kwargs):
+    '''
+    Median time in s from process start to first painted frame, and median peak RSS in kB at that time.
+
+    Parameters
+    ----------
+        nb : int
+            number of runs
+        backend : str
+            'widgets' or 'lean' (see lean.py)
+    '''
+
+    times = []
+    rss   = []
+    for _ in range(nb):
+        t0   = time.time()
+        out  = subprocess.run([sys.executable, opath.realpath(__file__), '--first-paint', repr(t0), '--backend', backend],
+                              cwd=scriptDir, capture_output=True, text=True, check=True).stdout
+        out  = json.loads(out.strip().splitlines()[-1])
+        times.append(out['firstPaint'])
+        rss.append(out['peakRSS'])
+
+    times.sort()
+    rss.sort()
+    suffix = '' if backend == 'widgets' else '_%s' %backend
+    return {'startup%s_s' %suffix : times[len(times)//2], 'startupRSS%s_kB' %suffix : rss[len(rss)//2]}
+
+def importTime(module='TopWatch', *args, **kwargs):
+    '''
+    Cumulative import time of a module in µs, as given by python -X importtime.
+
+    Parameters
+    ----------
+        module : str
+            TopWatch for the widgets backend, or lean
+    '''
+
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s' %module],
+                         cwd=scriptDir, capture_output=True, text=True, check=True).stderr
+
+    for line in err.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return {'import_us' if module == 'TopWatch' else 'import_%s_us' %module : int(fields[1])}
+    return {}
+
+def tick(app, nb=2000, *args, **kwargs):
+    '''
+    Per-call cost of showTime in µs, when the displayed time does not change and when it does.
+
+    Parameters
+    ----------
+        app : TopWatch.App
+            application
+        nb : int
+            number of calls
+    '''
+
+    same    = timeit.timeit(app.showTime, number=nb)/nb
+
+    def changed():
+        app.label.setText('')
+        app.showTime()
+
+    changed = timeit.timeit(changed, number=nb)/nb
+    return {'showTime_us' : same*1e6, 'showTimeChanged_us' : changed*1e6}
+
+def paint(app, nb=50, *args, **kwargs):
+    '''
+    Time in µs to repaint the clock at different font sizes.
+
+    Parameters
+    ----------
+        app : TopWatch.App
+            application
+        nb : int
+            number of repaints per font size
+    '''
+
+    results   = {}
+    size      = app.font.pointSize()
+    for fsize in FONTSIZES:
+        app.font.setPointSize(fsize)
+        app.updateFont()
+
+        # First paint includes the glyph rendering
+        app.label.repaint()
+        results['paint%d_us' %fsize] = timeit.timeit(app.label.repaint, number=nb)/nb*1e6
+
+    app.font.setPointSize(size)
+    app.updateFont()
+    return results
+
+def idle(root, duration, name, *args, **kwargs):
+    '''
+    CPU time, timer firings and voluntary context switches per minute while running the event loop.
+
+    Timer firings are the timer events and the timerfd activations (see clocksource.py) processed by the event loop, the
+    timer ending the measurement not being counted.
+
+    Parameters
+    ----------
+        root : QApplication
+            Qt application
+        duration : float
+            duration in s
+        name : str
+            name prepended to the result keys
+    '''
+
+    from PyQt5.QtCore import QObject, QEvent, QEventLoop, QTimer
+
+    class TimerCounter(QObject):
+        '''Count the timer events and the socket notifier activations of every object.'''
+
+        def __init__(self):
+            super().__init__()
+            self.nb = 0
+
+        def eventFilter(self, obj, event):
+            if event.type() in (QEvent.Timer, QEvent.SockAct):
+                self.nb += 1
+            return False
+
+    loop      = QEventLoop()
+    QTimer.singleShot(int(duration*1000), loop.quit)
+
+    counter   = TimerCounter()
+    root.installEventFilter(counter)
+    cpu, nb   = usage()
+    t0        = time.monotonic()
+    loop.exec_()
+    elapsed   = time.monotonic() - t0
+    cpu2, nb2 = usage()
+    root.removeEventFilter(counter)
+
+    return {'%s_cpu_s_per_min' %name            : (cpu2 - cpu)*60/elapsed,
+            '%s_wakeups_per_min' %name          : (counter.nb - 1)*60/elapsed,
+            '%s_context_switches_per_min' %name : (nb2 - nb)*60/elapsed
+           }
+
+def hibernation(app, period=6, *args, **kwargs):
+    '''
+    Average resident size in kB across blinking cycles at the largest font size, with and without releasing the glyphs
+    during the hidden phases. Hidden phases of a few seconds are considered long so that the cycles are short.
+
+    Parameters
+    ----------
+        app : TopWatch.App
+            application
+        period : int
+            blinking period in s
+    '''
+
+    from   PyQt5.QtCore import QEventLoop, QTimer, QTime
+    import memory
+
+    size     = app.font.pointSize()
+    app.font.setPointSize(FONTSIZES[-1])
+    app.updateFont()
+
+    results  = {}
+    for name, after in [('blink_rss_kB', 2000), ('blink_rss_nohibernate_kB', float('inf'))]:
+        app.blinker.HIBERNATE = after
+        app.blinker.PREWARM   = 500
+
+        samples  = []
+        timer    = QTimer()
+        timer.timeout.connect(lambda: samples.append(memory.rss()))
+        timer.start(50)
+
+        loop     = QEventLoop()
+        QTimer.singleShot(3*period*1000, loop.quit)
+        app.start_blink(100, QTime(0, 0, period), 3)
+        loop.exec_()
+        app.stopBlink()
+        timer.stop()
+
+        if None not in samples:
+            results[name] = sum(samples)/len(samples)
+
+    del app.blinker.HIBERNATE, app.blinker.PREWARM
+    app.font.setPointSize(size)
+    app.updateFont()
+    return results
+
+def simulate(hours=1000, *args, **kwargs):
+    '''
+    Simulated hours per second of scheduling and blinking (15 min period) on a virtual clock, and timers fired per hour.
+    Glyphs are released and rendered again around each hidden phase, as with the system clock.
+
+    Parameters
+    ----------
+        hours : float
+            simulated duration in hours
+    '''
+
+    from   PyQt5.QtCore import QTime, QCoreApplication
+    import TopWatch
+    import setup
+    import clocksource
+
+    clock   = clocksource.VirtualClock()
+    app     = TopWatch.App(setup.check(dict(setup.DEFAULT)), clock=clock)
+    app.autosave.enabled = False
+
+    # Schedulers are suspended until the clock is exposed
+    QCoreApplication.processEvents()
+    app.start_blink(100, QTime(0, 15, 0), 3)
+
+    t0      = time.perf_counter()
+    fired   = clock.advance(hours*3600)
+    elapsed = time.perf_counter() - t0
+
+    app.stopBlink()
+    app.close()
+    return {'simulated_h_per_s' : hours/elapsed, 'simulated_timers_per_h' : fired/hours}
+
+def run(duration=10, nbStartup=5, *args, **kwargs):
+    '''
+    Run all the benchmarks.
+
+    Parameters
+    ----------
+        duration : float
+            duration in s of the idle and blinking measurements
+        nbStartup : int
+            number of runs to measure the startup time
+
+    Return a dictionary with the results.
+    '''
+
+    from   PyQt5.QtWidgets import QApplication
+    from   PyQt5.QtCore    import QTime, QT_VERSION_STR
+    import TopWatch
+    import setup
+
+    results = {'commit'   : commit(),
+               'date'     : time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'python'   : platform.python_version(),
+               'qt'       : QT_VERSION_STR,
+               'platform' : platform.platform()
+              }
+
+    # Both backends are measured in child processes, the lean one never importing QtWidgets
+    results.update(importTime())
+    results.update(importTime('lean'))
+    results.update(startup(nb=nbStartup))
+    results.update(startup(nb=nbStartup, backend='lean'))
+
+    # The setting file of the user is neither read nor written when blinking is started and stopped
+    root    = QApplication(sys.argv)
+    app     = TopWatch.App(setup.check(dict(setup.DEFAULT)))
+    app.autosave.enabled = False
+    root.processEvents()
+
+    results.update(tick(app))
+    results.update(paint(app))
+    results.update(idle(root, duration, 'idle'))
+
+    app.start_blink(100, QTime(0, 0, 1), 3)
+    results.update(idle(root, duration, 'blink'))
+    app.stopBlink()
+
+    results.update(hibernation(app))
+
+    results['peakRSS_kB'] = peakRSS()
+
+    # Scheduling and blinking simulated on a virtual clock by another clock
+    app.close()
+    results.update(simulate())
+    return results
+
+def compare(old, new, *args, **kwargs):
+    '''
+    Print the relative change of every numerical result between two result files.
+
+    Parameters
+    ----------
+        old : str
+            reference result file
+        new : str
+            new result file
+    '''
+
+    with open(old, 'r') as f:
+        old = json.load(f)
+
+    with open(new, 'r') as f:
+        new = json.load(f)
+
+    print('%-32s %14s %14s %9s' %('benchmark', 'old', 'new', 'change'))
+    for key, value in new.items():
+        if isinstance(value, (int, float)) and isinstance(old.get(key), (int, float)):
+            change = '%+8.1f%%' %((value - old[key])/old[key]*100) if old[key] != 0 else 'n/a'
+            print('%-32s %14.4g %14.4g %9s' %(key, old[key], value, change))
+    return
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless benchmarks of TopWatch.')
+    parser.add_argument('-o', '--output',   default='benchmark.json',     help='output JSON file')
+    parser.add_argument('-d', '--duration', default=10,  type=float,     help='duration in s of the idle and blinking measurements')
+    parser.add_argument('-n', '--startup',  default=5,   type=int,       help='number of runs to measure the startup time')
+    parser.add_argument('--compare',        nargs=2,     metavar='FILE', help='compare two result files')
+    parser.add_argument('--first-paint',    type=float,  help=argparse.SUPPRESS)
+    parser.add_argument('--backend',        default='widgets', help=argparse.SUPPRESS)
+    args   = parser.parse_args()
+
+    if args.first_paint is not None:
+        firstPaint(args.first_paint, backend=args.backend)
+    elif args.compare:
+        compare(*args.compare)
+    else:
+        results = run(duration=args.duration, nbStartup=args.startup)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,150 @@
+"""
+Mercier Wilfried - IRAP
+
+Blinking sequences compiled into a keyframe schedule.
+"""
+
+from   bisect import bisect_right
+
+# Time between two updates when the opacity is fading, in ms
+FRAME = 16
+
+def linear(x, *args, **kwargs):
+    '''Linear fading curve.'''
+
+    return x
+
+def smoothstep(x, *args, **kwargs):
+    '''Smooth fading curve with zero slope at both ends.'''
+
+    return x*x*(3 - 2*x)
+
+class BlinkSchedule:
+    '''
+    Opacity of the clock within a blinking cycle, given as keyframes computed once.
+
+    A cycle lasts one period. It starts with nb flashes, each one being visible for duration ms and hidden for duration ms,
+    and the clock stays hidden for the rest of the period. The first cycle starts one period after the blinking is started.
+    '''
+
+    def __init__(self, period, duration, nb, fade=0, curve=smoothstep, *args, **kwargs):
+        '''
+        Compile the keyframes.
+
+        Parameters
+        ----------
+            period : int
+                duration of a cycle in ms
+            duration : int
+                duration of a single flash in ms
+            nb : int
+                number of flashes per cycle
+            fade : int
+                duration in ms of the fade in and fade out of a flash. If 0, the clock is shown and hidden at once.
+            curve : function
+                fading curve mapping [0, 1] to [0, 1]
+        '''
+
+        if period <= 0:
+            raise ValueError('Blinking period must be positive only (current value is %d)' %period)
+
+        if duration <= 0:
+            raise ValueError('Blinking duration must be positive only (current value is %d)' %duration)
+
+        if nb <= 0:
+            raise ValueError('Number of blinks must be positive only (current value is %d)' %nb)
+
+        self.period   = period
+        self.nb       = nb
+        self.curve    = curve
+
+        # Flashes must fit within a period
+        self.duration = min(duration, period/(2*nb))
+        self.fade     = min(max(fade, 0), self.duration/2)
+
+        keys          = [(0, 0)]
+        for i in range(nb):
+            start     = 2*i*self.duration
+            keys     += [(start,                            0),
+                         (start + self.fade,                1),
+                         (start + self.duration - self.fade, 1),
+                         (start + self.duration,            0)
+                        ]
+        keys.append((period, 0))
+
+        self.offsets  = tuple(k[0] for k in keys)
+        self.levels   = tuple(k[1] for k in keys)
+
+    def at(self, t, *args, **kwargs):
+        '''
+        Opacity level at a given time and delay until it changes.
+
+        Parameters
+        ----------
+            t : float
+                time in ms since the start of the first cycle. Negative values correspond to the period before the first cycle.
+
+        Return the opacity level between 0 and 1 and the delay in ms until the next update is needed.
+        '''
+
+        if t < 0:
+            return 0, -t
+
+        phase = t % self.period
+        i     = bisect_right(self.offsets, phase) - 1
+        o0    = self.offsets[i]
+        o1    = self.offsets[i+1]
+        v0    = self.levels[i]
+        v1    = self.levels[i+1]
+
+        if v0 == v1:
+            return v0, o1 - phase
+
+        return v0 + (v1 - v0)*self.curve((phase - o0)/(o1 - o0)), min(FRAME, o1 - phase)
+
+class Blinking:
+    '''
+    Blinking schedule followed from a fixed anchor on a monotonic clock, so that the blinking phase never drifts however
+    long it runs. It only computes levels, front ends waking up after the delays it gives.
+    '''
+
+    def __init__(self, schedule, now, once=False, *args, **kwargs):
+        '''
+        Start following a schedule. The first cycle starts one period later, or at once if a single cycle is run.
+
+        Parameters
+        ----------
+            schedule : BlinkSchedule
+                compiled blinking schedule
+            now : int
+                time in ns of the monotonic clock when blinking starts
+            once : bool
+                whether to only run a single cycle, starting at once
+        '''
+
+        self.schedule = schedule
+        self.once     = once
+        self.anchor   = now + (0 if once else schedule.period*1000000)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def finished(self, now, *args, **kwargs):
+        '''Whether a single cycle is run and it is over at a given time in ns of the monotonic clock.'''
+
+        return self.once and now - self.anchor >= self.schedule.period*1000000
+
+    def at(self, now, *args, **kwargs):
+        '''
+        Opacity level at a given time and delay until it changes.
+
+        Parameters
+        ----------
+            now : int
+                time in ns of the monotonic clock
+
+        Return the opacity level between 0 and 1 and the delay in ms until the next update is needed.
+        '''
+
+        return self.schedule.at((now - self.anchor)/1000000)
@@ -0,0 +1,133 @@
+"""
+Mercier Wilfried - IRAP
+
+Window used to setup blinking.
+"""
+
+from   PyQt5.QtWidgets import QLabel, QMainWindow, QPushButton, QGridLayout, QWidget, QTimeEdit, QDesktopWidget, QDoubleSpinBox
+from   PyQt5.QtCore    import Qt, QTime
+
+class BlinkWindow(QMainWindow):
+    def __init__(self, parent, *arg, **kwargs):
+        '''
+        Initialize the Window.
+        '''
+
+        super().__init__(parent)
+        self.parent    = parent
+
+        self.setWindowTitle('TopWatch - Setup blinking')
+        self.setWindowFlags(Qt.Dialog)
+        sizeObject = QDesktopWidget().screenGeometry(-1)
+        self.setGeometry(sizeObject.width()//2, sizeObject.height()//2, self.geometry().width(), self.geometry().height())
+
+        # Time edit label
+        self.teditTxt = QLabel()
+        self.teditTxt.setText('Period (hh:mm:ss)')
+
+        # Time edit widget
+        self.tedit    = QTimeEdit(self)
+        self.tedit.setDisplayFormat('hh:mm:ss')
+
+        # Blinking needs a positive period
+        self.tedit.setMinimumTime(QTime(0, 0, 1))
+        self.tedit.setTime(self.parent.blinkPeriod)
+
+        # Duration edit label
+        self.lenTxt   = QLabel()
+        self.lenTxt.setText('Duration (ms)')
+
+        # Duration edit widget
+        self.lenedit  = QDoubleSpinBox(self)
+        self.lenedit.setDecimals(0)
+        self.lenedit.setMaximum(10000)
+        self.lenedit.setMinimum(50)
+        self.lenedit.setValue(self.parent.blinkFreq)
+
+        # Blink number edit label
+        self.blnbTxt  = QLabel()
+        self.blnbTxt.setText('Blink number')
+
+        # Blink number edit widget
+        self.blnbedit = QDoubleSpinBox(self)
+        self.blnbedit.setValue(self.parent.blinkNb)
+        self.blnbedit.setDecimals(0)
+        self.blnbedit.setMinimum(1)
+
+        # Fade edit label
+        self.fadeTxt  = QLabel()
+        self.fadeTxt.setText('Fade (ms)')
+
+        # Fade edit widget
+        self.fadeedit = QDoubleSpinBox(self)
+        self.fadeedit.setDecimals(0)
+        self.fadeedit.setMaximum(5000)
+        self.fadeedit.setMinimum(0)
+        self.fadeedit.setValue(self.parent.blinkFade)
+        self.fadeedit.setToolTip("Duration of the fade in and fade out of a blink (0 to disable)")
+
+        # Ok button setup
+        self.okButton = QPushButton(self)
+        self.okButton.setText('Ok')
+        self.okButton.clicked.connect(self.ok)
+        self.okButton.setToolTip("Activate blinking")
+
+        # Cancel button setup
+        self.cancelButton = QPushButton(self)
+        self.cancelButton.setText('Cancel')
+        self.cancelButton.clicked.connect(self.cancel)
+        self.cancelButton.setToolTip("Cancel blinking setup")
+
+        # Layout
+        self.layout      = QGridLayout()
+
+        self.layout.addWidget(self.teditTxt,     0, 0)
+        self.layout.addWidget(self.tedit,        1, 0)
+
+        self.layout.addWidget(self.fadeTxt,      0, 1)
+        self.layout.addWidget(self.fadeedit,     1, 1)
+
+        self.layout.addWidget(self.lenTxt,       2, 0)
+        self.layout.addWidget(self.lenedit,      3, 0)
+
+        self.layout.addWidget(self.blnbTxt,      2, 1)
+        self.layout.addWidget(self.blnbedit,     3, 1)
+
+        self.layout.addWidget(self.okButton,     4, 0)
+        self.layout.addWidget(self.cancelButton, 4, 1)
+
+        self.mainWidget   = QWidget()
+        self.mainWidget.setLayout(self.layout)
+        self.setCentralWidget(self.mainWidget)
+
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def cancel(self, *args, **kwargs):
+        '''When cancel is pressed blinking parameters are updated it the user wants to save later on.'''
+
+        self.parent.blinkNb     = self.blnbedit.value()
+        self.parent.blinkPeriod = self.tedit.time()
+        self.parent.blinkFreq   = self.lenedit.value()
+        self.parent.blinkFade   = self.fadeedit.value()
+        self.parent.autosave.request()
+        self.close()
+        return
+
+    def keyPressEvent(self, e, *args, **kwargs):
+        '''Actions taken when a key is pressed.'''
+
+        if e.key() == Qt.Key_Escape:
+           self.cancel(*args, **kwargs)
+        elif e.key() == Qt.Key_Return:
+            self.ok(*args, **kwargs)
+        return
+
+    def ok(self, *args, **kwargs):
+        '''Start blinking when ok is pressed.'''
+
+        self.parent.start_blink(self.lenedit.value(), self.tedit.time(), self.blnbedit.value(), fade=self.fadeedit.value())
+        self.close()
+        return
@@ -0,0 +1,251 @@
+"""
+Mercier Wilfried - IRAP
+
+Countdown, stopwatch and interval timer computed from a monotonic reference.
+
+Displayed values are always computed from the time elapsed since a fixed start point, so that errors never accumulate
+however long the timer runs, and the scheduler only wakes up when the displayed value changes.
+"""
+
+import re
+import time
+
+# Own imports
+import timing
+
+# Available modes, clock showing the current time
+MODES    = ['clock', 'countdown', 'stopwatch', 'interval']
+
+# Tokens of a duration format, quoted text being displayed as is
+_TOKENS  = re.compile(r"'[^']*'|hh|h|mm|m|ss|s|zzz|z|" + timing.TENTHS)
+
+# Value in ms of each unit
+_UNITS   = {'h' : 3600000, 'm' : 60000, 's' : 1000, timing.TENTHS : 100, 'z' : 1}
+
+def boottime_ns(*args, **kwargs):
+    '''Time in ns of a monotonic clock which keeps running while the machine is suspended, if there is one.'''
+
+    if hasattr(time, 'CLOCK_BOOTTIME'):
+        return time.clock_gettime_ns(time.CLOCK_BOOTTIME)
+    return time.monotonic_ns()
+
+def parseDuration(text, *args, **kwargs):
+    '''
+    Convert a duration given as h:mm:ss (hours can be larger than 23) into ms.
+
+    Parameters
+    ----------
+        text : str
+            duration
+
+    Return the duration in ms or None if the text is not a valid duration.
+    '''
+
+    match = re.fullmatch(r'\s*(\d+):([0-5]\d):([0-5]\d)\s*', str(text))
+    if match is None:
+        return None
+
+    h, m, s = (int(i) for i in match.groups())
+    return ((h*60 + m)*60 + s)*1000
+
+def durationString(ms, *args, **kwargs):
+    '''Duration in ms given as hh:mm:ss, the inverse of parseDuration.'''
+
+    s = ms//1000
+    return '%02d:%02d:%02d' %(s//3600, s//60%60, s%60)
+
+def formatDuration(fmt, ms, *args, **kwargs):
+    '''
+    Format a duration.
+
+    Tokens are the same as Qt time formats (h, hh, m, mm, s, ss, z, zzz) plus T for the tenth of second. The largest unit
+    in the format is not wrapped, e.g. 90 minutes are shown as 90:00 with mm:ss.
+
+    Parameters
+    ----------
+        fmt : str
+            duration format
+        ms : int
+            duration in ms
+    '''
+
+    units   = [token[0] for token in _TOKENS.findall(fmt) if not token.startswith("'")]
+    largest = max(units, key=lambda u: _UNITS[u]) if units else None
+
+    def replace(match):
+        token = match.group(0)
+        if token.startswith("'"):
+            return token[1:-1]
+
+        unit  = token[0]
+        value = ms//_UNITS[unit]
+        if unit != largest:
+            value %= {'h' : 24, 'm' : 60, 's' : 60, timing.TENTHS : 10, 'z' : 1000}[unit]
+
+        if token == 'zzz':
+            return '%03d' %value
+        return '%0*d' %(len(token), value)
+
+    return _TOKENS.sub(replace, fmt)
+
+class Chrono:
+    '''
+    Countdown, stopwatch or interval timer.
+
+    The stopwatch shows the elapsed time, the countdown the remaining time until it stops at zero, and the interval timer
+    the remaining time of the current interval, restarting at once when an interval ends. Remaining times are rounded up
+    so that zero is only shown once the time is over.
+    '''
+
+    def __init__(self, mode='stopwatch', duration=300000, clock=boottime_ns, *args, **kwargs):
+        '''
+        Initialize the timer. It is stopped at zero elapsed time.
+
+        Parameters
+        ----------
+            mode : str
+                'countdown', 'stopwatch' or 'interval'
+            duration : int
+                duration of the countdown or of an interval in ms
+            clock : function
+                monotonic clock returning a time in ns
+        '''
+
+        if mode not in MODES[1:]:
+            raise ValueError('Timer mode must be one of %s but is %s' %(MODES[1:], mode))
+
+        if mode != 'stopwatch' and duration <= 0:
+            raise ValueError('Timer duration must be positive only (current value is %s ms)' %duration)
+
+        self.mode     = mode
+        self.duration = duration
+        self.clock    = clock
+
+        # Start point in ns when running, and elapsed time in ms accumulated before the last pause
+        self._start   = None
+        self._elapsed = 0
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    @property
+    def running(self):
+        '''Whether the timer is running.'''
+
+        return self._start is not None
+
+    def start(self, *args, **kwargs):
+        '''Start or resume the timer.'''
+
+        if self._start is None:
+            self._start = self.clock()
+        return
+
+    def pause(self, *args, **kwargs):
+        '''Pause the timer.'''
+
+        if self._start is not None:
+            self._elapsed = self.elapsed()
+            self._start   = None
+        return
+
+    def reset(self, *args, **kwargs):
+        '''Go back to zero elapsed time, keeping the timer running if it was.'''
+
+        self._elapsed = 0
+        if self._start is not None:
+            self._start = self.clock()
+        return
+
+    def elapsed(self, now=None, *args, **kwargs):
+        '''
+        Elapsed time in ms, not counting pauses.
+
+        Parameters
+        ----------
+            now : int
+                time in ns given by the clock. If None, the current time is used.
+        '''
+
+        if self._start is None:
+            return self._elapsed
+
+        if now is None:
+            now = self.clock()
+
+        return self._elapsed + (now - self._start)//1000000
+
+    def finished(self, now=None, *args, **kwargs):
+        '''Whether the countdown reached zero.'''
+
+        return self.mode == 'countdown' and self.elapsed(now) >= self.duration
+
+    def cycles(self, now=None, *args, **kwargs):
+        '''Number of intervals already completed in interval mode.'''
+
+        if self.mode != 'interval':
+            return 0
+        return self.elapsed(now)//self.duration
+
+    def remaining(self, now=None, *args, **kwargs):
+        '''Time in ms until the end of the countdown or of the current interval, or None for the stopwatch.'''
+
+        elapsed = self.elapsed(now)
+        if self.mode == 'countdown':
+            return max(0, self.duration - elapsed)
+        elif self.mode == 'interval':
+            return self.duration - elapsed%self.duration
+        return None
+
+    def value(self, fmt, now=None, *args, **kwargs):
+        '''
+        Displayed time in ms: the elapsed time floored, or the remaining time rounded up, to the step of the format.
+
+        Parameters
+        ----------
+            fmt : str
+                duration format
+            now : int
+                time in ns given by the clock. If None, the current time is used.
+        '''
+
+        step      = timing.granularity(fmt) or 1
+        remaining = self.remaining(now)
+        if remaining is None:
+            return self.elapsed(now)//step*step
+
+        return -(-remaining//step)*step
+
+    def text(self, fmt, now=None, *args, **kwargs):
+        '''Displayed string with the given duration format.'''
+
+        return formatDuration(fmt, self.value(fmt, now))
+
+    def msToNextChange(self, fmt, now=None, *args, **kwargs):
+        '''
+        Time in ms until the displayed value changes.
+
+        Parameters
+        ----------
+            fmt : str
+                duration format
+            now : int
+                time in ns given by the clock. If None, the current time is used.
+
+        Return the delay in ms (always >= 1) or None if the value will not change (paused or finished timer).
+        '''
+
+        if not self.running or self.finished(now):
+            return None
+
+        if now is None:
+            now   = self.clock()
+
+        # Elapsed times are floored to the ms, so that the change is never anticipated
+        step      = timing.granularity(fmt) or 1
+        if self.mode == 'stopwatch':
+            return step - self.elapsed(now)%step
+
+        remaining = self.remaining(now)
+        return remaining%step or step
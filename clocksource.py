@@ -0,0 +1,544 @@
+"""
+Mercier Wilfried - IRAP
+
+Clocks and timers used by the schedulers, and timers armed at an absolute wall clock time reporting wall clock
+discontinuities.
+
+On Linux, a timerfd armed on CLOCK_REALTIME with TFD_TIMER_ABSTIME | TFD_TIMER_CANCEL_ON_SET wakes the application up
+exactly at the given time, and at once when the wall clock is set (manual change, NTP step) or the machine resumes from
+suspend. Elsewhere, a relative QTimer is used and discontinuities are detected when it fires.
+
+The schedulers read the time and create their timers through a clock (see SystemClock). A VirtualClock can be given
+instead to simulate hours of scheduling and blinking in a fraction of a second, e.g. in benchmarks.
+"""
+
+import os
+import sys
+import time
+import errno
+import heapq
+import ctypes
+import weakref
+from   math         import ceil
+from   itertools    import count
+from   PyQt5        import sip
+from   PyQt5.QtCore import Qt, QObject, QTimer, QDateTime, QSocketNotifier, pyqtSignal
+
+# Own imports
+from   chrono       import boottime_ns
+
+# timerfd constants (see timerfd_create(2))
+CLOCK_REALTIME          = 0
+TFD_NONBLOCK            = 0o4000
+TFD_CLOEXEC             = 0o2000000
+TFD_TIMER_ABSTIME       = 1
+TFD_TIMER_CANCEL_ON_SET = 2
+
+# Difference in s between the elapsed wall clock and monotonic times above which the wall clock is considered as set
+TOLERANCE               = 0.1
+
+# Time in s after which a stopped timerfd is armed, so that discontinuities are still reported without waking up
+IDLE                    = 365*86400
+
+class _timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+class _itimerspec(ctypes.Structure):
+    _fields_ = [('it_interval', _timespec), ('it_value', _timespec)]
+
+_LIBC = None
+
+def _libc(*args, **kwargs):
+    '''C library, only loaded when os does not provide timerfd functions (Python < 3.13).'''
+
+    global _LIBC
+    if _LIBC is None:
+        _LIBC = ctypes.CDLL(None, use_errno=True)
+        _LIBC.timerfd_create.argtypes  = [ctypes.c_int, ctypes.c_int]
+        _LIBC.timerfd_settime.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.POINTER(_itimerspec), ctypes.c_void_p]
+    return _LIBC
+
+def timerfdCreate(*args, **kwargs):
+    '''Create a non blocking timerfd on CLOCK_REALTIME and return its file descriptor.'''
+
+    if hasattr(os, 'timerfd_create'):
+        return os.timerfd_create(os.CLOCK_REALTIME, flags=os.TFD_NONBLOCK | os.TFD_CLOEXEC)
+
+    fd = _libc().timerfd_create(CLOCK_REALTIME, TFD_NONBLOCK | TFD_CLOEXEC)
+    if fd < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    return fd
+
+def timerfdArm(fd, due, *args, **kwargs):
+    '''
+    Arm a timerfd at an absolute wall clock time, cancelling it if the wall clock is set.
+
+    Parameters
+    ----------
+        fd : int
+            file descriptor of the timerfd
+        due : float
+            POSIX time in s. If None, the timer is disarmed.
+    '''
+
+    ns      = 0 if due is None else max(1, int(due*1000000000))
+    flags   = TFD_TIMER_ABSTIME | TFD_TIMER_CANCEL_ON_SET
+
+    if hasattr(os, 'timerfd_settime_ns'):
+        os.timerfd_settime_ns(fd, flags=flags, initial=ns)
+        return
+
+    spec    = _itimerspec()
+    spec.it_value.tv_sec, spec.it_value.tv_nsec = divmod(ns, 1000000000)
+    if _libc().timerfd_settime(fd, flags, ctypes.byref(spec), None) < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    return
+
+_SUPPORTED = None
+
+def supported(*args, **kwargs):
+    '''Whether timerfd can be used on this system, only probed on the first call.'''
+
+    global _SUPPORTED
+    if _SUPPORTED is None:
+        _SUPPORTED = _probe()
+    return _SUPPORTED
+
+def _probe(*args, **kwargs):
+    '''Create and close a timerfd to know whether timerfd can be used on this system.'''
+
+    if not sys.platform.startswith('linux'):
+        return False
+
+    try:
+        fd = timerfdCreate()
+    except (OSError, AttributeError):
+        return False
+
+    os.close(fd)
+    return True
+
+class WallTimer(QObject):
+    '''
+    Single shot timer armed at an absolute wall clock time, based on a relative QTimer.
+
+    A wall clock discontinuity is only noticed when the timer fires, by comparing the elapsed wall clock and monotonic times.
+    '''
+
+    # Emitted when the due time is reached
+    timeout      = pyqtSignal()
+
+    # Emitted instead of timeout when the wall clock was set or the machine resumed from suspend since the timer was armed
+    clockChanged = pyqtSignal()
+
+    def __init__(self, parent=None, *args, **kwargs):
+        '''
+        Initialize the timer.
+
+        Parameters
+        ----------
+            parent : QObject
+                parent object
+        '''
+
+        super().__init__(parent)
+
+        # Wall clock and monotonic times when the timer was armed
+        self._wall  = None
+        self._mono  = None
+
+        # A precise timer is used since a coarse one can fire up to 5% early
+        self.timer  = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._fire)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def start(self, due, *args, **kwargs):
+        '''
+        Arm the timer.
+
+        Parameters
+        ----------
+            due : float
+                POSIX time in s
+        '''
+
+        self._wall = time.time()
+        self._mono = time.monotonic()
+
+        # Rounding up ensures the timer never fires before the due time
+        self.timer.start(max(0, ceil((due - self._wall)*1000)))
+        return
+
+    def stop(self, *args, **kwargs):
+        '''Disarm the timer.'''
+
+        self.timer.stop()
+        return
+
+    def isActive(self, *args, **kwargs):
+        '''Whether the timer is armed.'''
+
+        return self.timer.isActive()
+
+    def close(self, *args, **kwargs):
+        '''Disarm the timer, which holds no system resource.'''
+
+        self.timer.stop()
+        return
+
+    def _fire(self, *args, **kwargs):
+        '''Emit timeout, or clockChanged if the wall clock did not follow the monotonic clock.'''
+
+        if abs((time.time() - self._wall) - (time.monotonic() - self._mono)) > TOLERANCE:
+            self.clockChanged.emit()
+        else:
+            self.timeout.emit()
+        return
+
+class TimerFdTimer(QObject):
+    '''
+    Single shot timer armed at an absolute wall clock time, based on a Linux timerfd watched by the Qt event loop.
+
+    The kernel wakes the application up at the due time, or as soon as the wall clock is set or the machine resumes from
+    suspend. Once stopped, the timerfd is armed far in the future so that discontinuities are still reported.
+    '''
+
+    timeout      = pyqtSignal()
+    clockChanged = pyqtSignal()
+
+    def __init__(self, parent=None, *args, **kwargs):
+        '''
+        Initialize the timer.
+
+        Parameters
+        ----------
+            parent : QObject
+                parent object
+        '''
+
+        super().__init__(parent)
+
+        self.fd       = timerfdCreate()
+        self._armed   = False
+
+        self.notifier = QSocketNotifier(self.fd, QSocketNotifier.Read, self)
+        self.notifier.activated.connect(self._read)
+        timerfdArm(self.fd, time.time() + IDLE)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def start(self, due, *args, **kwargs):
+        '''
+        Arm the timer.
+
+        Parameters
+        ----------
+            due : float
+                POSIX time in s
+        '''
+
+        self._armed = True
+        timerfdArm(self.fd, due)
+        return
+
+    def stop(self, *args, **kwargs):
+        '''Disarm the timer, discontinuities still being reported.'''
+
+        self._armed = False
+        if self.fd is not None:
+            timerfdArm(self.fd, time.time() + IDLE)
+        return
+
+    def isActive(self, *args, **kwargs):
+        '''Whether the timer is armed.'''
+
+        return self._armed
+
+    def close(self, *args, **kwargs):
+        '''Release the timerfd. The timer can no longer be started afterwards.'''
+
+        if self.fd is not None:
+            self._armed = False
+            self.notifier.setEnabled(False)
+            os.close(self.fd)
+            self.fd     = None
+        return
+
+    def _read(self, *args, **kwargs):
+        '''Emit timeout or clockChanged depending on why the timerfd woke up.'''
+
+        try:
+            os.read(self.fd, 8)
+        except OSError as e:
+            if e.errno == errno.ECANCELED:
+                self.clockChanged.emit()
+            return
+
+        if self._armed:
+            self._armed = False
+            self.timeout.emit()
+        else:
+            timerfdArm(self.fd, time.time() + IDLE)
+        return
+
+def wallTimer(parent=None, *args, **kwargs):
+    '''
+    Timer armed at an absolute wall clock time, using a timerfd if possible.
+
+    Parameters
+    ----------
+        parent : QObject
+            parent object
+    '''
+
+    if supported():
+        return TimerFdTimer(parent)
+    return WallTimer(parent)
+
+class SystemClock:
+    '''Clocks of the system and Qt timers, used by the schedulers unless another clock is given.'''
+
+    def time(self, *args, **kwargs):
+        '''Wall clock time as a POSIX time in s.'''
+
+        return time.time()
+
+    def boottime_ns(self, *args, **kwargs):
+        '''Time in ns of a monotonic clock which keeps running while the machine is suspended.'''
+
+        return boottime_ns()
+
+    def dateTime(self, *args, **kwargs):
+        '''Local wall clock time as a QDateTime.'''
+
+        return QDateTime.currentDateTime()
+
+    def sleep(self, delay, *args, **kwargs):
+        '''Block for a given delay in s.'''
+
+        time.sleep(delay)
+        return
+
+    def timer(self, parent=None, *args, **kwargs):
+        '''Precise single shot timer started with a delay in ms.'''
+
+        timer = QTimer(parent)
+        timer.setSingleShot(True)
+        timer.setTimerType(Qt.PreciseTimer)
+        return timer
+
+    def wallTimer(self, parent=None, *args, **kwargs):
+        '''Single shot timer started with a wall clock time in s (see wallTimer).'''
+
+        return wallTimer(parent)
+
+# Clock used when none is given
+SYSTEM = SystemClock()
+
+class VirtualTimer(QObject):
+    '''Single shot timer of a virtual clock, firing when the clock is advanced past its due time.'''
+
+    timeout      = pyqtSignal()
+    clockChanged = pyqtSignal()
+
+    def __init__(self, clock, wall=False, parent=None, *args, **kwargs):
+        '''
+        Initialize the timer.
+
+        Parameters
+        ----------
+            clock : VirtualClock
+                clock the timer follows
+            wall : bool
+                whether the timer is started with a wall clock time in s rather than with a delay in ms
+            parent : QObject
+                parent object
+        '''
+
+        super().__init__(parent)
+
+        self.clock   = clock
+        self.wall    = wall
+
+        # Wall clock time the timer is armed at, and number of its entry in the queue of the clock (None if stopped)
+        self.due     = None
+        self._entry  = None
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def start(self, value, *args, **kwargs):
+        '''
+        Arm the timer.
+
+        Parameters
+        ----------
+            value : float
+                POSIX time in s for a wall clock timer, delay in ms otherwise
+        '''
+
+        if self.wall:
+            self.due    = value
+            delay       = ceil((value - self.clock.time())*1000000000)
+        else:
+            delay       = int(value*1000000)
+
+        self._entry     = self.clock._schedule(self, self.clock.boottime_ns() + max(0, delay))
+        return
+
+    def stop(self, *args, **kwargs):
+        '''Disarm the timer.'''
+
+        self._entry = None
+        return
+
+    def isActive(self, *args, **kwargs):
+        '''Whether the timer is armed.'''
+
+        return self._entry is not None
+
+    def close(self, *args, **kwargs):
+        '''Disarm the timer.'''
+
+        self._entry = None
+        return
+
+class VirtualClock:
+    '''
+    Clock only moving when it is advanced, with timers firing in order of their due time.
+
+    Each timer sees the clock at its due time when it fires, so that schedulers behave as with the system clock, however
+    far the clock is advanced at once. Setting the wall clock reports a discontinuity to every wall clock timer, as the
+    timerfd does.
+    '''
+
+    def __init__(self, start=None, *args, **kwargs):
+        '''
+        Initialize the clock.
+
+        Parameters
+        ----------
+            start : float
+                initial wall clock time as a POSIX time in s. If None, the current time is used.
+        '''
+
+        self._wall  = int((time.time() if start is None else start)*1000000000)
+        self._boot  = 0
+
+        # Armed timers as (due monotonic time in ns, entry number, timer), stopped ones being skipped
+        self._queue = []
+        self._ids   = count(1)
+        self._walls = weakref.WeakSet()
+
+        # Number of timers fired since the clock was created
+        self.fired  = 0
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def time(self, *args, **kwargs):
+        '''Wall clock time as a POSIX time in s.'''
+
+        return self._wall/1000000000
+
+    def boottime_ns(self, *args, **kwargs):
+        '''Time in ns of the monotonic clock, starting at 0.'''
+
+        return self._boot
+
+    def dateTime(self, *args, **kwargs):
+        '''Local wall clock time as a QDateTime.'''
+
+        return QDateTime.fromMSecsSinceEpoch(self._wall//1000000)
+
+    def sleep(self, delay, *args, **kwargs):
+        '''Move the clock forward by a given delay in s, timers due meanwhile firing when the clock is advanced next.'''
+
+        self._step(int(delay*1000000000))
+        return
+
+    def timer(self, parent=None, *args, **kwargs):
+        '''Single shot timer started with a delay in ms.'''
+
+        return VirtualTimer(self, parent=parent)
+
+    def wallTimer(self, parent=None, *args, **kwargs):
+        '''Single shot timer started with a wall clock time in s.'''
+
+        timer = VirtualTimer(self, wall=True, parent=parent)
+        self._walls.add(timer)
+        return timer
+
+    def advance(self, delay, *args, **kwargs):
+        '''
+        Move the clock forward, firing the timers due meanwhile, including the ones they arm.
+
+        Parameters
+        ----------
+            delay : float
+                delay in s
+
+        Return the number of timers fired.
+        '''
+
+        end          = self._boot + int(delay*1000000000)
+        fired        = self.fired
+        while self._queue and self._queue[0][0] <= end:
+            due, entry, timer = heapq.heappop(self._queue)
+            if timer._entry != entry or sip.isdeleted(timer):
+                continue
+
+            self._step(due - self._boot)
+            timer._entry = None
+            self.fired  += 1
+            timer.timeout.emit()
+
+        self._step(end - self._boot)
+        return self.fired - fired
+
+    def setTime(self, wall, *args, **kwargs):
+        '''
+        Set the wall clock without moving the monotonic clock, as a manual change or an NTP step would.
+
+        Parameters
+        ----------
+            wall : float
+                POSIX time in s
+        '''
+
+        self._wall   = int(wall*1000000000)
+        for timer in list(self._walls):
+            if sip.isdeleted(timer):
+                continue
+
+            # Armed timers follow the new wall clock time, then the discontinuity is reported
+            if timer.isActive():
+                timer.start(timer.due)
+            timer.clockChanged.emit()
+        return
+
+    def _step(self, ns, *args, **kwargs):
+        '''Move the wall clock and the monotonic clock forward.'''
+
+        ns           = max(0, ns)
+        self._wall  += ns
+        self._boot  += ns
+        return
+
+    def _schedule(self, timer, due, *args, **kwargs):
+        '''Put a timer in the queue and return the number of its entry.'''
+
+        entry = next(self._ids)
+        heapq.heappush(self._queue, (due, entry, timer))
+        return entry
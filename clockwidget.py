@@ -0,0 +1,88 @@
+"""
+Mercier Wilfried - IRAP
+
+Widget painting the time from glyphs rendered once in a cached pixmap atlas (see glyphs.py).
+"""
+
+from   time            import perf_counter
+from   PyQt5.QtWidgets import QWidget, QSizePolicy
+from   PyQt5.QtGui     import QFont, QPainter
+from   PyQt5.QtCore    import pyqtSignal
+
+# Own imports
+import stats
+from   glyphs          import GlyphText
+
+class ClockWidget(GlyphText, QWidget):
+    '''
+    Widget showing a short text drawn from a glyph atlas.
+
+    Only the glyphs which changed are repainted and the opacity is applied by the painter.
+    '''
+
+    opacityChanged = pyqtSignal(float)
+
+    def __init__(self, text='', parent=None, *args, **kwargs):
+        '''
+        Initialize the widget.
+
+        Parameters
+        ----------
+            text : str
+                text to show
+            parent : QWidget
+                parent widget
+        '''
+
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.initGlyphs(text)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def setFont(self, font, *args, **kwargs):
+        '''
+        Change the font of the text.
+
+        Parameters
+        ----------
+            font : QFont
+                new font
+        '''
+
+        super().setFont(QFont(font))
+        self.setGlyphFont(font)
+        return
+
+    def glyphsResized(self, *args, **kwargs):
+        '''Update the layout when the size needed to draw the text changes.'''
+
+        self.updateGeometry()
+        return
+
+    ##########################################
+    #               Qt methods               #
+    ##########################################
+
+    def sizeHint(self, *args, **kwargs):
+        '''Size needed to draw the widest text the format can produce, or the current text if there is no format.'''
+
+        return self.textSize()
+
+    def paintEvent(self, event, *args, **kwargs):
+        '''Draw the glyphs intersecting the area to repaint.'''
+
+        rec     = stats.RECORDER
+        if rec is not None:
+            rec.count('repaints')
+            t0  = perf_counter()
+
+        painter = QPainter(self)
+        self.paintGlyphs(painter, event.rect())
+        painter.end()
+
+        if rec is not None:
+            rec.add('paint', (perf_counter() - t0)*1000)
+        return
@@ -0,0 +1,183 @@
+"""
+Mercier Wilfried - IRAP
+
+Control of a running TopWatch instance through a local socket.
+
+Running TopWatch while another instance is running forwards the command given on the command line to it, e.g.
+
+    python TopWatch.py blink --period 00:15:00 --nb 3
+    python TopWatch.py color '#ff0000'
+    python TopWatch.py mode countdown --duration 00:25:00 --start
+    python TopWatch.py remind add 13:25 --nb 5
+    python TopWatch.py remind import meetings.txt
+    python TopWatch.py quit
+    python TopWatch.py --backend lean
+    python TopWatch.py --backend tty mode stopwatch --start
+    python TopWatch.py --frames --pipe - | ffmpeg -f rawvideo -pix_fmt rgba -video_size 222x84 -i - out.mkv
+
+This module does not depend on Qt so that forwarding a command is fast.
+"""
+
+import os
+import sys
+import json
+import socket
+import argparse
+import tempfile
+import os.path  as opath
+
+# Own imports
+import chrono
+
+# Time to wait for the running instance in s
+TIMEOUT  = 2
+
+# Rendering backends: QtWidgets with menus and dialogs, QtGui only with a minimal footprint (see lean.py), or block digits
+# in a terminal without Qt (see terminal.py)
+BACKENDS = ['widgets', 'lean', 'tty']
+
+def socketPath(*args, **kwargs):
+    '''Path of the control socket of the current user, or None if local sockets are not supported.'''
+
+    if not hasattr(socket, 'AF_UNIX') or not hasattr(os, 'getuid'):
+        return None
+
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return opath.join(directory, 'topwatch-%d.sock' %os.getuid())
+
+def parser(*args, **kwargs):
+    '''Command line parser.'''
+
+    parser = argparse.ArgumentParser(prog='TopWatch', description='A small digital clock which remains on top of other applications. '
+                                     'If TopWatch is already running, the command is sent to the running instance.')
+    parser.add_argument('--backend', choices=BACKENDS, help='rendering backend used if TopWatch is not running yet, '
+                        'overriding the one of the setting file. A terminal clock (tty) is started in any case.')
+    parser.add_argument('--frames', nargs='?', const='', metavar='PATH',
+                        help='run headless and write the clock frames into a shared memory ring buffer (see framebuffer.py) '
+                        'instead of showing it, next to the visible clock if there is one')
+    parser.add_argument('--pipe', metavar='PATH', help="with --frames, also write frames as raw RGBA video into a file or "
+                        "named pipe, or into the standard output with '-'")
+
+    sub    = parser.add_subparsers(dest='command')
+
+    sub.add_parser('show', help='show the clock (stop blinking if needed), default command')
+
+    blink  = sub.add_parser('blink', help='start or stop blinking, missing parameters being taken from the current configuration')
+    blink.add_argument('--period',   help='time the clock is hidden between two blinking sequences (hh:mm:ss)')
+    blink.add_argument('--duration', type=int, help='duration of a single blink in ms')
+    blink.add_argument('--nb',       type=int, help='number of blinks in a blinking sequence')
+    blink.add_argument('--fade',     type=int, help='duration of the fade in and fade out of a blink in ms')
+    blink.add_argument('--stop',     action='store_true', help='stop blinking')
+
+    color  = sub.add_parser('color', help='change the text color')
+    color.add_argument('color', help="color name or code (e.g. red or '#ffdd1c')")
+
+    size   = sub.add_parser('font-size', help='change the text size')
+    size.add_argument('size', type=int, help='font point size')
+
+    mode   = sub.add_parser('mode', help='show the time, or a countdown, stopwatch or interval timer')
+    mode.add_argument('mode', choices=chrono.MODES, help='mode')
+    mode.add_argument('--duration', help='duration of the countdown or of an interval (hh:mm:ss)')
+    mode.add_argument('--start',    action='store_true', help='start the timer at once')
+
+    timer  = sub.add_parser('timer', help='start, pause or reset the countdown, stopwatch or interval timer')
+    timer.add_argument('action', choices=['start', 'pause', 'reset'], help='action')
+
+    remind = sub.add_parser('remind', help='flash the clock at given times of the day, missing parameters being taken from the '
+                            'current configuration')
+    remind.add_argument('action', choices=['add', 'cancel', 'list', 'clear', 'import'], help='action')
+    remind.add_argument('value', nargs='?', help="time (hh:mm[:ss] every day, :mm[:ss] every hour or 'yyyy-mm-dd hh:mm[:ss]' "
+                        "once) to add, reminder number to cancel or file to import with one 'time [nb [duration [fade]]]' per line")
+    remind.add_argument('--nb',       type=int, help='number of flashes')
+    remind.add_argument('--duration', type=int, help='duration of a single flash in ms')
+    remind.add_argument('--fade',     type=int, help='duration of the fade in and fade out of a flash in ms')
+
+    sub.add_parser('lateness', help='print how late the latest time changes were shown')
+    sub.add_parser('stats', help='print the instrumentation statistics as JSON (TopWatch must run with TOPWATCH_STATS=1)')
+    sub.add_parser('quit', help='quit the running instance')
+    return parser
+
+def parse(argv, *args, **kwargs):
+    '''
+    Parse the command line into a command dictionnary.
+
+    Parameters
+    ----------
+        argv : list of str
+            command line arguments (without the program name)
+    '''
+
+    command = vars(parser().parse_args(argv))
+    if command['command'] is None:
+        command['command'] = 'show'
+
+    # The running instance may not have the same working directory
+    if command['command'] == 'remind' and command['action'] == 'import' and command['value'] is not None:
+        command['value']   = opath.abspath(command['value'])
+    return command
+
+def send(command, path=None, *args, **kwargs):
+    '''
+    Send a command to the running instance.
+
+    Parameters
+    ----------
+        command : dict
+            command dictionnary
+        path : str
+            path of the control socket. If None, the default one is used.
+
+    Return the reply of the running instance, or None if no instance is running.
+    '''
+
+    path = path or socketPath()
+    if path is None or not opath.exists(path):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(TIMEOUT)
+            sock.connect(path)
+            sock.sendall(json.dumps(command).encode() + b'\n')
+
+            # The reply can span several lines and ends when the running instance closes the connection
+            reply = b''
+            while True:
+                data   = sock.recv(4096)
+                if not data:
+                    break
+                reply += data
+    except OSError:
+        return None
+
+    return reply.decode().strip()
+
+def forward(argv, *args, **kwargs):
+    '''
+    Forward the command line to the running instance and exit if there is one.
+
+    Parameters
+    ----------
+        argv : list of str
+            command line arguments (without the program name)
+
+    Return the command dictionnary if no instance is running.
+    '''
+
+    command = parse(argv)
+
+    # A frame server or a terminal clock runs next to the visible clock
+    if command['frames'] is not None or command['backend'] == 'tty':
+        return command
+
+    reply   = send(command)
+
+    if reply is not None:
+        print(reply)
+        sys.exit(0 if reply.startswith('ok') else 1)
+
+    if command['command'] == 'quit':
+        print('TopWatch is not running.')
+        sys.exit(1)
+
+    return command
@@ -0,0 +1,935 @@
+"""
+Mercier Wilfried - IRAP
+
+Behaviour shared by the rendering backends: configuration, scheduling, blinking, timers and commands.
+
+The window classes of the backends (TopWatch.App with QtWidgets, lean.LeanClock with QtGui only) inherit from Controller
+and provide the window itself and a label showing the time (see glyphs.GlyphText).
+"""
+
+import signal
+import os.path         as     opath
+from   time            import perf_counter
+from   PyQt5.QtGui     import QFont, QPixmapCache
+from   PyQt5.QtCore    import Qt, QTimer, QTime, QDateTime
+
+# Own imports
+import setup
+import stats
+import timing
+import chrono
+import reminder
+import clocksource
+import glyphs
+import memory
+from   ticker          import Ticker, Blinker, ChronoTicker, ReminderTicker
+from   blink           import BlinkSchedule
+from   autosave        import AutoSaver
+from   drag            import DragMover
+from   visibility      import Visibility
+
+# Time in ms without font size change after which a previewed size is applied
+FONTDELAY = 400
+
+class Controller:
+    '''
+    Behaviour of the main clock window, independent of the toolkit used to draw it.
+
+    Classes using it must provide a label attribute showing the time, the window methods show, raise_, activateWindow,
+    close, x, y, move and setFixedSize, and the methods clockConfigurations and setClocks for the additional clocks.
+    '''
+
+    def initState(self, configuration, clock=None, *args, **kwargs):
+        '''
+        Initialize the state from the configuration. Called before the label is created.
+
+        :param dict configuration: checked settings (see setup.check)
+        :param clock: clock of the schedulers (see clocksource.py). If None, the system clock is used.
+        '''
+
+        # Time source of the schedulers, which can be a virtual clock to simulate them
+        self.clock         = clock or clocksource.SYSTEM
+
+        # Hidden opacity used as a temporary slot when opacity is changed for blinking
+        self._opacity      = 1
+
+        # Opt-in instrumentation (see stats.py)
+        self.statsMode     = stats.mode()
+        if self.statsMode is not None:
+            stats.enable()
+
+        self.scriptDir     = opath.dirname(opath.realpath(__file__))
+
+        # Setup initial color, font and window position
+        self.color         = configuration['color']
+        self.font          = QFont()
+        self.font.fromString(configuration['font'])
+
+        self.xpos          = configuration['x']
+        self.ypos          = configuration['y']
+
+        self.opacity       = configuration['opacity']
+        self.snap          = configuration['snap']
+
+        self.blinkActive   = False
+        self.blinkPeriod   = QTime.fromMSecsSinceStartOfDay(configuration['blinkPeriod'])
+        self.blinkNb       = configuration['blinkNb']
+        self.blinkFreq     = configuration['blinkFreq']
+        self.blinkFade     = configuration['blinkFade']
+
+        # Format of the displayed time and whether changes are shown within a fraction of a ms
+        self.timeFormat    = configuration['format']
+        self.precise       = configuration['precise']
+
+        # Countdown, stopwatch or interval timer shown instead of the time when not in clock mode
+        self.mode          = configuration['mode']
+        self.timerDuration = configuration['timerDuration']
+        self.timerFormat   = configuration['timerFormat']
+        self.chrono        = None
+
+        # Reminders added to the scheduler once it is created
+        self._reminders    = [reminder.parse(spec) for spec in configuration['reminders']]
+
+        # Backend used at the next start, which may differ from the running one
+        self.backend       = configuration['backend']
+
+        # Checkable menu actions, created once the clock is shown
+        self.menuActions   = {}
+
+        # Nothing is formatted nor repainted while no clock can be seen
+        self.visibility    = Visibility(self)
+        self.visibility.seenChanged.connect(self.clocksSeen)
+        self.visibility.exposedChanged.connect(self.clocksExposed)
+        return
+
+    def initEngines(self, *args, **kwargs):
+        '''Start the schedulers and create the helpers. Called once the label is created.'''
+
+        # Start timer which only wakes up when the displayed time changes
+        self.ticker       = Ticker(self.timeFormat, precise=self.precise, parent=self, clock=self.clock)
+        self.ticker.tick.connect(self.showTime)
+        self.ticker.start()
+
+        # Timer which only wakes up when the value of the countdown, stopwatch or interval timer changes
+        self.chronoTicker = ChronoTicker(parent=self, clock=self.clock)
+        self.chronoTicker.tick.connect(self.showTime)
+        self.ticker.clockChanged.connect(self.chronoTicker.resync)
+        if self.mode != 'clock':
+            self.setMode(self.mode, save=False)
+
+        # Font size changes made with the keyboard are previewed and applied once the keys are released or left alone
+        self.fontTimer    = QTimer(self)
+        self.fontTimer.setSingleShot(True)
+        self.fontTimer.setInterval(FONTDELAY)
+        self.fontTimer.timeout.connect(self.commitFont)
+
+        # Window dragging, with at most one move per frame
+        self.dragger      = DragMover(self, snap=self.snap, parent=self)
+
+        # Changes are saved automatically
+        self.autosave     = AutoSaver(opath.join(self.scriptDir, 'settings.yaml'), self.configuration, parent=self)
+
+        # Blinking engine following a precomputed schedule
+        self.blinker      = Blinker(self, clock=self.clock)
+        self.blinker.level.connect(self.blink_text)
+        self.blinker.hibernating.connect(self.hibernate)
+        self.blinker.waking.connect(self.prewarm)
+        self.ticker.clockChanged.connect(self.blinker.resync)
+
+        # Single timer for every reminder, each one flashing the clock once on top of the blinking
+        self.reminderTicker = ReminderTicker(parent=self, clock=self.clock)
+        self.reminderTicker.fired.connect(self.remind)
+        for item in self._reminders:
+            self.reminderTicker.add(item)
+        self._reminders   = None
+
+        self.flasher      = Blinker(self, clock=self.clock)
+        self.flasher.level.connect(self.flash_text)
+        self.flasher.finished.connect(self.stopFlash)
+        return
+
+    def startServices(self, server=True, *args, **kwargs):
+        '''
+        Watch the setting file, listen to other invocations and handle SIGUSR1. Called once the clock is shown.
+
+        :param bool server: whether to listen to other invocations
+        '''
+
+        # Changes made to the setting file while running are applied, except the ones made by the autosave
+        from settingswatcher import SettingsWatcher
+
+        self.settingsWatcher = SettingsWatcher(self.autosave.fname, ignore=self.autosave.written, parent=self)
+        self.settingsWatcher.changed.connect(self.applyConfiguration)
+
+        # Later invocations send their commands through a local socket
+        import control
+
+        self.server       = None
+        path              = control.socketPath()
+        if server and path is not None:
+            from server import ControlServer
+
+            self.server   = ControlServer(path, self.command, parent=self)
+
+        # Statistics are dumped on SIGUSR1 or F12
+        if self.statsMode is not None and hasattr(signal, 'SIGUSR1'):
+            from signaldump import SignalDump
+
+            self.statsSignal  = SignalDump(self.dumpStats, parent=self)
+        return
+
+    def shutdown(self, *args, **kwargs):
+        '''Write pending changes, stop listening to other invocations and release the timers. Called when the window is closed.'''
+
+        self.autosave.flush()
+        if getattr(self, 'server', None) is not None:
+            self.server.close()
+
+        self.ticker.close()
+        self.reminderTicker.close()
+        return
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def command(self, command, *args, **kwargs):
+        '''
+        Run a command sent by another invocation of TopWatch.
+
+        :param dict command: command dictionnary (see control.parse)
+
+        Return the reply sent back.
+        '''
+
+        from PyQt5.QtGui  import QColor
+
+        name = command['command']
+        if name == 'show':
+            self.stopBlink()
+            self.show()
+            self.raise_()
+            self.activateWindow()
+
+        elif name == 'blink':
+            if command.get('stop'):
+                self.stopBlink()
+                return 'ok'
+
+            period = self.blinkPeriod
+            if command.get('period') is not None:
+                period = QTime.fromString(command['period'], 'hh:mm:ss')
+                if not period.isValid():
+                    return 'error: period %s is not in format hh:mm:ss' %command['period']
+
+            # Blinking is restarted with the new parameters
+            self.stopBlink()
+
+            duration   = self.blinkFreq if command.get('duration') is None else command['duration']
+            nb         = self.blinkNb   if command.get('nb')       is None else command['nb']
+            fade       = self.blinkFade if command.get('fade')     is None else command['fade']
+            try:
+                self.start_blink(duration, period, nb, fade=fade)
+            except (TypeError, ValueError) as e:
+                return 'error: %s' %e
+
+        elif name == 'color':
+            color = QColor(command['color'])
+            if not color.isValid():
+                return 'error: %s is not a valid color' %command['color']
+
+            self.color = color
+            self.label.setColor(self.color)
+            self.autosave.request()
+
+        elif name == 'font-size':
+            if command['size'] < 1:
+                return 'error: font size must be positive'
+
+            self.font.setPointSize(command['size'])
+            self.updateFont()
+            self.autosave.request()
+
+        elif name == 'lateness':
+            mean, late, nb = self.ticker.latenessSummary()
+            if nb == 0:
+                return 'ok no change shown yet'
+
+            return 'ok mean %.3f ms, max %.3f ms over the last %d changes' %(mean, late, nb)
+
+        elif name == 'stats':
+            if stats.RECORDER is None:
+                return 'error: instrumentation is disabled, start TopWatch with TOPWATCH_STATS=1'
+
+            import json
+
+            return 'ok %s' %json.dumps(stats.RECORDER.dump())
+
+        elif name == 'mode':
+            duration = None
+            if command.get('duration') is not None:
+                duration = chrono.parseDuration(command['duration'])
+                if duration is None or duration <= 0:
+                    return 'error: duration %s is not a positive duration in format hh:mm:ss' %command['duration']
+
+            self.setMode(command['mode'], duration=duration)
+            if command.get('start'):
+                self.toggleTimer()
+
+        elif name == 'timer':
+            if self.chrono is None:
+                return 'error: no timer in clock mode, change the mode first'
+
+            if command['action'] == 'reset':
+                self.resetTimer()
+            elif (command['action'] == 'start') != self.chrono.running:
+                self.toggleTimer()
+
+        elif name == 'remind':
+            return self.remindCommand(command)
+
+        elif name == 'quit':
+            QTimer.singleShot(0, self.close)
+
+        else:
+            return 'error: unknown command %s' %name
+
+        return 'ok'
+
+    def remindCommand(self, command, *args, **kwargs):
+        '''
+        Add, cancel, list or import reminders.
+
+        :param dict command: command dictionnary with the keys 'action', 'value', 'nb', 'duration' and 'fade' (see control.parse)
+
+        Return the reply sent back.
+        '''
+
+        action   = command['action']
+        value    = command.get('value')
+        defaults = {'nb'       : self.blinkNb   if command.get('nb')       is None else command['nb'],
+                    'duration' : self.blinkFreq if command.get('duration') is None else command['duration'],
+                    'fade'     : self.blinkFade if command.get('fade')     is None else command['fade']
+                   }
+
+        if action in ('add', 'cancel', 'import') and value is None:
+            return 'error: remind %s needs a value' %action
+
+        if action == 'add':
+            try:
+                item = reminder.parse(value, **defaults)
+            except ValueError as e:
+                return 'error: %s' %e
+
+            num      = self.reminderTicker.add(item)
+            if num is None:
+                return 'error: reminder %s is in the past' %value
+
+            self.autosave.request()
+            return 'ok reminder %d next at %s' %(num, self.reminderTime(num))
+
+        if action == 'cancel':
+            try:
+                num  = int(value)
+            except ValueError:
+                return 'error: %s is not a reminder number' %value
+
+            if not self.reminderTicker.cancel(num):
+                return 'error: no reminder %d' %num
+
+            self.autosave.request()
+
+        elif action == 'list':
+            queue    = self.reminderTicker.queue
+            lines    = ['%4d  %-19s  next at %s  %d x %d ms' %(num, item.at, self.reminderTime(num), item.nb, item.duration)
+                        for num, item in sorted(queue.reminders.items(), key=lambda i: queue.due(i[0]))]
+            return '\n'.join(['ok %d reminders' %len(lines)] + lines)
+
+        elif action == 'clear':
+            self.reminderTicker.clear()
+            self.autosave.request()
+
+        elif action == 'import':
+            try:
+                items = reminder.load(value, **defaults)
+            except (OSError, ValueError) as e:
+                return 'error: %s' %e
+
+            nums     = [self.reminderTicker.add(item) for item in items]
+            self.autosave.request()
+            return 'ok %d reminders added, %d in the past skipped' %(len(nums) - nums.count(None), nums.count(None))
+
+        return 'ok'
+
+    def reminderTime(self, num, *args, **kwargs):
+        '''Local time a reminder fires next, as written in replies.'''
+
+        return QDateTime.fromMSecsSinceEpoch(int(self.reminderTicker.queue.due(num)*1000)).toString('yyyy-MM-dd hh:mm:ss')
+
+    def remind(self, item, *args, **kwargs):
+        '''
+        Flash the clocks once when a reminder fires, on top of the blinking if it is active.
+
+        :param reminder.Reminder item: reminder which fired
+        '''
+
+        if stats.RECORDER is not None:
+            stats.RECORDER.count('reminders.fired')
+
+        self.flasher.start(BlinkSchedule(2*item.nb*item.duration, item.duration, item.nb, fade=item.fade), once=True)
+        if not self.visibility.anyExposed():
+            self.flasher.pause()
+        return
+
+    def flash_text(self, level, *args, **kwargs):
+        '''
+        Function called by the reminder flasher every time the opacity level changes. The stored opacity is kept.
+
+        :param float level: opacity level between 0 (hidden) and 1 (opacity before the reminder fired)
+        '''
+
+        self.label.setOpacity(level*(self._opacity if self.blinkActive else self.opacity))
+        for clock in self.clocks:
+            clock.setOpacity(level*clock.baseOpacity)
+        return
+
+    def stopFlash(self, *args, **kwargs):
+        '''Show back the clocks as they were before a reminder fired, following the blinking if it is active.'''
+
+        self.flasher.stop()
+        if self.blinkActive:
+            self.blinker.refresh()
+        else:
+            self.label.setOpacity(self.opacity)
+            for clock in self.clocks:
+                clock.setOpacity(clock.baseOpacity)
+        return
+
+    def stopBlink(self, *args, **kwargs):
+        '''Stop blinking and show back the clocks with their previous opacity.'''
+
+        if not self.blinkActive:
+            return
+
+        # Reset to default values and show back the clock
+        self.blinkActive = False
+
+        # Stop blinking
+        self.blinker.stop()
+
+        # Resume previous opacity
+        self.opacity     = self._opacity
+        self.setLabelOpacity(self.opacity)
+        for clock in self.clocks:
+            clock.setOpacity(clock.baseOpacity)
+        return
+
+    def blink_text(self, level, *args, **kwargs):
+        '''
+        Function called by the blinking engine every time the opacity level changes.
+
+        :param float level: opacity level between 0 (hidden) and 1 (opacity before blinking started)
+        '''
+
+        # A reminder being shown takes over until it is over
+        if self.flasher.isActive():
+            return
+
+        self.setLabelOpacity(level*self._opacity)
+        for clock in self.clocks:
+            clock.setOpacity(level*clock.baseOpacity)
+        return
+
+    def hibernate(self, *args, **kwargs):
+        '''Release the rendered glyphs and give the freed memory back to the system during a long hidden blinking phase.'''
+
+        self.label.releaseAtlas()
+        for clock in self.clocks:
+            clock.releaseAtlas()
+
+        glyphs.releaseAtlases()
+        QPixmapCache.clear()
+        memory.trim()
+
+        if stats.RECORDER is not None:
+            stats.RECORDER.count('hibernations')
+        return
+
+    def prewarm(self, *args, **kwargs):
+        '''Render the glyphs again shortly before the clocks are shown after a long hidden blinking phase.'''
+
+        t0 = perf_counter()
+        self.label.atlas()
+        for clock in self.clocks:
+            clock.atlas()
+
+        if stats.RECORDER is not None:
+            stats.RECORDER.add('prewarm', (perf_counter() - t0)*1000)
+        return
+
+    def start_blink(self, blinkfreq, period, nb, fade=0, *args, **kwargs):
+        '''
+        Starts blinking of the clock.
+
+        :param float blinkfreq: duration of a single blink in ms
+        :param QTime period: time between two blink phases
+        :param int nb: number of blinks per blink phase
+        :param float fade: duration of the fade in and fade out of a blink in ms
+        '''
+
+        if not isinstance(blinkfreq, (int, float)):
+            raise TypeError('Blinking frequency must be an int but is given as a %s' %type(blinkfreq))
+        else:
+            blinkfreq    = int(blinkfreq)
+
+        if blinkfreq <= 0:
+            raise ValueError('Blinking frequency must be positive only (current value is %f)' %blinkfreq)
+
+        if not isinstance(nb, (int, float)):
+            raise TypeError('Number of blinks must be int but is given as a %s' %type(nb))
+        else:
+            nb           = int(nb)
+
+        if nb <= 0:
+            raise ValueError('Number of blinks must be positive only (current value is %d)' %nb)
+
+        if not isinstance(fade, (int, float)):
+            raise TypeError('Fading duration must be an int but is given as a %s' %type(fade))
+        else:
+            fade         = int(fade)
+
+        # Period between blinking phases in ms
+        period_ms        = period.msecsSinceStartOfDay()
+        if period_ms <= 0:
+            raise ValueError('Blinking period must be positive only (current value is %s)' %period.toString())
+
+        # Store values if the user save the current configuration later on
+        self.blinkActive = True
+        self.blinkNb     = nb
+        self.blinkFreq   = blinkfreq # in ms
+        self.blinkPeriod = period
+        self.blinkFade   = fade
+        self.autosave.request()
+
+        # Save opacity for when we go back to normal
+        self._opacity    = self.opacity
+        self.setLabelOpacity(0)
+
+        self.blinker.start(BlinkSchedule(period_ms, blinkfreq, nb, fade=fade))
+        if not self.visibility.anyExposed():
+            self.blinker.pause()
+        return
+
+    def setLabelOpacity(self, value, *args, **kwargs):
+        '''Set the opacity of the label.'''
+        
+        if value > 1:
+            value = 1
+        elif value < 0:
+            value = 0
+            
+        self.opacity = value
+        self.label.setOpacity(self.opacity)
+        return
+
+    def keyPressEvent(self, e, *args, **kwargs):
+        ''''Actions taken when a key is pressed.'''
+
+        if e.key() == Qt.Key_F12:
+            self.dumpStats()
+            return
+
+        # Deal with shift key being pressed first
+        if e.modifiers() & Qt.ShiftModifier:
+            if e.key() == Qt.Key_Up:
+                self.setLabelOpacity(self.opacity+0.05)
+            elif e.key() == Qt.Key_Down:
+                self.setLabelOpacity(self.opacity-0.05)
+            else:
+                return
+        else:
+            if e.key() == Qt.Key_Down:
+               newSize = self.font.pointSize()-1
+               if newSize < 1:
+                   newSize = 1
+    
+               self.font.setPointSize(newSize)
+    
+            elif e.key() == Qt.Key_Up:
+               self.font.setPointSize(self.font.pointSize()+1)
+    
+            else:
+               return
+    
+            self.previewFont()
+
+        self.autosave.request()
+        return
+
+    def keyReleaseEvent(self, e, *args, **kwargs):
+        '''Apply the previewed font size once the key changing it is released. Releases sent by auto-repeat are skipped.'''
+
+        if not e.isAutoRepeat() and e.key() in (Qt.Key_Up, Qt.Key_Down):
+            self.commitFont()
+        return
+
+    def previewFont(self, *args, **kwargs):
+        '''
+        Show the size given in self.font by scaling the current glyphs, the font and the window size being only updated by
+        commitFont, so that holding a key down does not render glyphs and resize the window at every step.
+        '''
+
+        current = self.label.glyphFont().pointSizeF()
+        if current <= 0 or self.font.pointSizeF() <= 0:
+            self.updateFont()
+            return
+
+        self.label.setPreviewScale(self.font.pointSizeF()/current)
+        self.fontTimer.start()
+        return
+
+    def commitFont(self, *args, **kwargs):
+        '''Apply the previewed font size, if any.'''
+
+        self.fontTimer.stop()
+        if self.label.previewScale() != 1:
+            self.updateFont()
+
+            if stats.RECORDER is not None:
+                stats.RECORDER.count('font.commits')
+        return
+
+    def setTimeFormat(self, fmt, save=True, *args, **kwargs):
+        '''
+        Change the format of the displayed time.
+
+        :param str fmt: Qt time format, which can also contain T for the tenth of second
+        :param bool save: whether to save the configuration
+        '''
+
+        self.timeFormat = fmt
+        if self.chrono is None:
+            self.ticker.setFormat(fmt)
+            self.label.setFormat(fmt)
+            self.showTime()
+            self.updateFont()
+
+        if save:
+            self.autosave.request()
+        return
+
+    def setPrecise(self, precise, save=True, *args, **kwargs):
+        '''Enable or disable the precise mode.'''
+
+        self.precise = precise
+        self.ticker.setPrecise(precise)
+        if save:
+            self.autosave.request()
+        return
+
+    def setMode(self, mode, duration=None, save=True, *args, **kwargs):
+        '''
+        Show the time, or a countdown, stopwatch or interval timer. Timers start paused at zero.
+
+        :param str mode: one of chrono.MODES
+        :param int duration: duration of the countdown or of an interval in ms. If None, the current one is used.
+        :param bool save: whether to save the configuration
+        '''
+
+        if duration is not None:
+            self.timerDuration = duration
+
+        self.mode          = mode
+        if mode == 'clock':
+            self.chrono    = None
+            self.chronoTicker.setChrono(None, None)
+            self.ticker.setFormat(self.timeFormat)
+            self.label.setFormat(self.timeFormat)
+        else:
+            # Additional clocks are still followed by the scheduler
+            self.chrono    = chrono.Chrono(mode, self.timerDuration, clock=self.clock.boottime_ns)
+            self.chronoTicker.setChrono(self.chrono, self.timerFormat)
+            self.ticker.setFormat(None)
+            self.label.setFormat(self.timerFormat)
+
+        self.showTime()
+        self.updateFont()
+        if save:
+            self.autosave.request()
+        return
+
+    def toggleTimer(self, *args, **kwargs):
+        '''Start or pause the countdown, stopwatch or interval timer.'''
+
+        if self.chrono is None:
+            return
+
+        if self.chrono.running:
+            self.chrono.pause()
+            self.chronoTicker.stop()
+        else:
+            # A finished countdown starts again
+            if self.chrono.finished():
+                self.chrono.reset()
+
+            self.chrono.start()
+            self.chronoTicker.start()
+
+        self.showTime()
+        return
+
+    def resetTimer(self, *args, **kwargs):
+        '''Reset the countdown, stopwatch or interval timer.'''
+
+        if self.chrono is None:
+            return
+
+        self.chrono.reset()
+        self.chronoTicker.stop()
+        if self.chrono.running:
+            self.chronoTicker.start()
+
+        self.showTime()
+        return
+
+    def clocksSeen(self, seen, *args, **kwargs):
+        '''
+        Suspend the scheduler while no clock can be seen (hidden phase of a blink, minimized or covered windows, locked
+        screen) and resume it when one can be seen again. Clocks catch up with the current time when they are seen again.
+
+        :param bool seen: whether at least one clock can be seen
+        '''
+
+        if seen:
+            self.ticker.resume()
+            if self.chrono is not None and self.chrono.running:
+                self.chronoTicker.start()
+        else:
+            self.ticker.pause()
+            self.chronoTicker.stop()
+
+        if stats.RECORDER is not None:
+            stats.RECORDER.count('ticker.resumes' if seen else 'ticker.pauses')
+        return
+
+    def clocksExposed(self, exposed, *args, **kwargs):
+        '''
+        Suspend blinking while no clock could be seen, even if it was not transparent. The blinking phase is kept.
+
+        :param bool exposed: whether at least one clock is exposed
+        '''
+
+        if exposed:
+            self.blinker.resume()
+            self.flasher.resume()
+        else:
+            self.blinker.pause()
+            self.flasher.pause()
+        return
+
+    def dumpStats(self, *args, **kwargs):
+        '''Write the instrumentation statistics into a JSON file if instrumentation is enabled.'''
+
+        if stats.RECORDER is not None:
+            print('Statistics written in %s' %stats.RECORDER.save())
+        return
+
+    def setSnap(self, snap, save=True, *args, **kwargs):
+        '''Enable or disable snapping to the screen edges.'''
+
+        self.snap         = snap
+        self.dragger.snap = snap
+        for clock in self.clocks:
+            clock.dragger.snap = snap
+
+        if save:
+            self.autosave.request()
+        return
+
+    def applyConfiguration(self, configuration, *args, **kwargs):
+        '''
+        Apply a configuration read from the setting file while running, only changing what differs from the current one.
+
+        :param dict configuration: checked settings (see setup.check)
+        '''
+
+        current   = setup.check(self.configuration())
+        changed   = {key for key, value in configuration.items() if current.get(key) != value}
+        if not changed:
+            return
+
+        # Appearance: only a font change needs the text to be measured again and the window to be resized
+        if 'color' in changed:
+            self.color = configuration['color']
+            self.label.setColor(self.color)
+
+        if 'font' in changed:
+            self.font.fromString(configuration['font'])
+            self.updateFont()
+
+        if 'opacity' in changed:
+            if self.blinkActive:
+                self._opacity = configuration['opacity']
+            else:
+                self.setLabelOpacity(configuration['opacity'])
+
+        if changed & {'x', 'y'}:
+            self.move(configuration['x'], configuration['y'])
+
+        if 'snap' in changed:
+            self.setSnap(configuration['snap'], save=False)
+
+        if 'precise' in changed:
+            self.setPrecise(configuration['precise'], save=False)
+
+        if 'format' in changed:
+            self.setTimeFormat(configuration['format'], save=False)
+
+        # Blinking schedule is only rebuilt if one of its parameters changed
+        blinkKeys = {'blinkPeriod', 'blinkFreq', 'blinkNb', 'blinkFade'}
+        if changed & blinkKeys:
+            self.blinkPeriod = QTime.fromMSecsSinceStartOfDay(configuration['blinkPeriod'])
+            self.blinkFreq   = configuration['blinkFreq']
+            self.blinkNb     = configuration['blinkNb']
+            self.blinkFade   = configuration['blinkFade']
+
+            if self.blinkActive:
+                self.stopBlink()
+                self.start_blink(self.blinkFreq, self.blinkPeriod, self.blinkNb, fade=self.blinkFade)
+                self.autosave.cancel()
+
+        if changed & {'mode', 'timerDuration', 'timerFormat'}:
+            self.timerDuration = configuration['timerDuration']
+            self.timerFormat   = configuration['timerFormat']
+            self.setMode(configuration['mode'], save=False)
+
+        # Only the additional clocks which changed are closed or created
+        if 'clocks' in changed:
+            self.setClocks(configuration['clocks'])
+
+        # Only the reminders which changed are cancelled or added
+        if 'reminders' in changed:
+            self.setReminders(configuration['reminders'])
+
+        # The backend can only be changed at the next start
+        if 'backend' in changed:
+            self.backend = configuration['backend']
+
+        self.updateActions()
+        return
+
+    def setReminders(self, specs, *args, **kwargs):
+        '''
+        Cancel the reminders which are not in a list and add the new ones, keeping the others scheduled.
+
+        :param list specs: checked reminder settings (see reminder.Reminder.configuration)
+        '''
+
+        pending = {}
+        for num, item in self.reminderTicker.queue.reminders.items():
+            pending.setdefault(tuple(sorted(item.configuration().items())), []).append(num)
+
+        for spec in specs:
+            nums = pending.get(tuple(sorted(spec.items())))
+            if nums:
+                nums.pop()
+            else:
+                self.reminderTicker.add(reminder.parse(spec))
+
+        for nums in pending.values():
+            for num in nums:
+                self.reminderTicker.cancel(num)
+        return
+
+    def updateActions(self, *args, **kwargs):
+        '''Check the menu actions matching the current configuration, without triggering them.'''
+
+        states = {'seconds' : timing.granularity(self.timeFormat) <= 1000,
+                  'precise' : self.precise,
+                  'snap'    : self.snap
+                 }
+        states.update({mode : mode == self.mode for mode in chrono.MODES})
+
+        for name, action in self.menuActions.items():
+            action.blockSignals(True)
+            action.setChecked(states[name])
+            action.blockSignals(False)
+        return
+
+    def reset(self, *args, **kwargs):
+       '''Reset the configuration.'''
+
+       # Reset every setting in memory, then write the state actually shown so that both always match
+       self.applyConfiguration(setup.check(dict(setup.DEFAULT)))
+       self.autosave.saveNow()
+       return
+
+    def updateFont(self, *args, **kwargs):
+        '''
+        Update the label font with the value given in self.font and update the window size accordingly.
+        The window is sized for the widest time the format can produce, so it never needs resizing when the time changes.
+        '''
+
+        self.label.setFont(self.font)
+        size   = self.label.sizeHint()
+        self.setFixedSize(size.width()+2, size.height()+2)
+        return
+
+    def save(self, *args, **kwargs):
+        '''Save the current configuration.'''
+
+        self.autosave.saveNow()
+        return
+
+    def configuration(self, *args, **kwargs):
+        '''Current configuration as written in the setting file.'''
+
+        # Try to save color with its name if it exists, otherwise use color code
+        try:
+            color     = self.color.name()
+        except AttributeError:
+            color     = self.color
+
+        # Convert blinking period from Qt Qtimer to string
+        period_str    = self.blinkPeriod.toString()
+
+        configuration = {'font'          : self.font.toString(),
+                         'color'         : color,
+                         'x'             : self.x(),
+                         'y'             : self.y(),
+                         'opacity'       : round(self._opacity if self.blinkActive else self.opacity, 2),
+                         'blinkPeriod'   : period_str,
+                         'blinkFreq'     : int(self.blinkFreq),
+                         'blinkNb'       : int(self.blinkNb),
+                         'blinkFade'     : int(self.blinkFade),
+                         'snap'          : bool(self.snap),
+                         'format'        : self.timeFormat,
+                         'precise'       : bool(self.precise),
+                         'clocks'        : self.clockConfigurations(),
+                         'mode'          : self.mode,
+                         'timerDuration' : chrono.durationString(self.timerDuration),
+                         'timerFormat'   : self.timerFormat,
+                         'backend'       : self.backend,
+                         'reminders'     : [item.configuration() for item in self.reminderTicker.queue.reminders.values()]
+                        }
+        return configuration
+
+    def showTime(self, *args, **kwargs):
+        '''Update the time label when value has changed.'''
+
+        # Skipped while the clock cannot be seen, the time being updated once it can be seen again
+        if not self.visibility.seen(self):
+            return
+
+        if self.chrono is not None:
+            timeStr = self.chrono.text(self.timerFormat)
+            if timeStr != self.label.text():
+                self.label.setText(timeStr)
+            return
+
+        # Formatted without Qt so that every front end shows the same string (see timing.formatTime)
+        timeStr    = timing.formatTime(self.timeFormat, timing.localMs(self.clock.time()))
+
+        if timeStr != self.label.text():
+            self.label.setText(timeStr)
+        return
@@ -0,0 +1,168 @@
+"""
+Mercier Wilfried - IRAP
+
+Window dragging applying at most one move per display frame.
+"""
+
+from   PyQt5.QtGui  import QGuiApplication
+from   PyQt5.QtCore import Qt, QObject, QPoint, QTimer
+
+class DragMover(QObject):
+    '''
+    Move a window following the mouse, with at most one move per display frame.
+
+    Mouse events only update the target position. The first one moves the window at once and later ones are applied when
+    a frame has elapsed, so that fast mice never move the window more often than the screen refreshes. The window can
+    optionally snap to the edges of the screens, whose geometries are cached and only updated when they change.
+    '''
+
+    def __init__(self, window, snap=False, distance=10, parent=None, *args, **kwargs):
+        '''
+        Initialize the mover.
+
+        Parameters
+        ----------
+            window : QWidget
+                window to move
+            snap : bool
+                whether to snap the window to the screen edges
+            distance : int
+                distance in pixels below which the window snaps to an edge
+            parent : QObject
+                parent object
+        '''
+
+        super().__init__(parent)
+
+        self.window      = window
+        self.snap        = snap
+        self.distance    = distance
+
+        self._offset     = QPoint()
+        self._target     = None
+
+        # Cached screen geometries and frame duration
+        self._geometries = []
+        self._frame      = 16
+
+        self.timer       = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._apply)
+
+        app              = QGuiApplication.instance()
+        app.screenAdded.connect(self._watchScreen)
+        app.screenRemoved.connect(self._screenRemoved)
+        for screen in app.screens():
+            self._watchScreen(screen)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def start(self, globalPos, *args, **kwargs):
+        '''
+        Start dragging.
+
+        Parameters
+        ----------
+            globalPos : QPoint
+                mouse position in screen coordinates
+        '''
+
+        self._offset = globalPos - self.window.pos()
+        self._target = None
+        return
+
+    def moveTo(self, globalPos, *args, **kwargs):
+        '''
+        Ask for the window to follow the mouse.
+
+        Parameters
+        ----------
+            globalPos : QPoint
+                mouse position in screen coordinates
+        '''
+
+        self._target = globalPos - self._offset
+        if not self.timer.isActive():
+            self._apply()
+        return
+
+    def finish(self, *args, **kwargs):
+        '''Stop dragging and apply the last position at once.'''
+
+        self.timer.stop()
+        if self._target is not None:
+            self._move()
+        return
+
+    def snapped(self, pos, *args, **kwargs):
+        '''
+        Position of the window once snapped to the closest screen edges.
+
+        Parameters
+        ----------
+            pos : QPoint
+                position of the top left corner of the window
+        '''
+
+        width  = self.window.frameGeometry().width()
+        height = self.window.frameGeometry().height()
+        x, y   = pos.x(), pos.y()
+
+        for geom in self._geometries:
+            if geom.top() - self.distance <= y <= geom.bottom() + self.distance:
+                if abs(x - geom.left()) <= self.distance:
+                    x = geom.left()
+                elif abs(x + width - 1 - geom.right()) <= self.distance:
+                    x = geom.right() - width + 1
+
+            if geom.left() - self.distance <= x <= geom.right() + self.distance:
+                if abs(y - geom.top()) <= self.distance:
+                    y = geom.top()
+                elif abs(y + height - 1 - geom.bottom()) <= self.distance:
+                    y = geom.bottom() - height + 1
+
+        return QPoint(x, y)
+
+    def _apply(self, *args, **kwargs):
+        '''Move the window if the mouse moved and wait for the next frame.'''
+
+        if self._target is not None:
+            self._move()
+            self.timer.start(self._frame)
+        return
+
+    def _move(self, *args, **kwargs):
+        '''Move the window to the target position.'''
+
+        pos          = self.snapped(self._target) if self.snap else self._target
+        self._target = None
+        if pos != self.window.pos():
+            self.window.move(pos)
+        return
+
+    def _watchScreen(self, screen, *args, **kwargs):
+        '''Update the cache whenever a screen changes.'''
+
+        screen.availableGeometryChanged.connect(self._cacheScreens)
+        screen.refreshRateChanged.connect(self._cacheScreens)
+        self._cacheScreens()
+        return
+
+    def _screenRemoved(self, *args, **kwargs):
+        '''Update the cache once the removed screen is gone.'''
+
+        QTimer.singleShot(0, self._cacheScreens)
+        return
+
+    def _cacheScreens(self, *args, **kwargs):
+        '''Cache the screen geometries and the duration of a frame of the fastest screen.'''
+
+        screens          = QGuiApplication.screens()
+        self._geometries = [screen.availableGeometry() for screen in screens]
+
+        rate             = max([screen.refreshRate() for screen in screens] + [0])
+        self._frame      = max(1, int(1000/rate)) if rate > 0 else 16
+        return
@@ -0,0 +1,284 @@
+"""
+Mercier Wilfried - IRAP
+
+Ring buffer of RGBA frames in a memory-mapped file, shared with consumers on the same machine (see frameserver.py).
+
+Layout of the file (little endian):
+
+    header (64 bytes)   magic b'TWFB', then as uint32: version, pixel format, width, height, stride in bytes, number of
+                        slots, flags (1 when the file was replaced or the writer stopped, consumers must open it again),
+                        then as uint64 at offset 32: sequence number of the latest complete frame (0 before the first one),
+                        and as uint32 at offset 40: process id of the writer
+    slots               number of slots times a slot header (64 bytes) followed by height*stride bytes of pixels
+
+A slot header holds as uint64 the sequence number of its frame (0 while it is written) and the POSIX time in ns when the
+frame started being shown. Frame n is in slot (n-1) % slots. Pixels are RGBA8888 with premultiplied alpha, rows being
+padded to the stride.
+
+Consumers read the sequence number of a slot before and after using its pixels, and drop the frame if it changed.
+
+This module does not depend on Qt so that consumers can use FrameReader without it.
+"""
+
+import os
+import mmap
+import ctypes
+import struct
+import tempfile
+import os.path as opath
+
+MAGIC        = b'TWFB'
+VERSION      = 1
+
+# Pixel formats
+RGBA8888_PREMULTIPLIED = 1
+
+# Header: magic, version, format, width, height, stride, slots, flags, latest sequence number
+HEADER       = struct.Struct('<4s7IQ')
+HEADERSIZE   = 64
+
+# Slot header: sequence number, time in ns
+SLOT         = struct.Struct('<QQ')
+SLOTSIZE     = 64
+
+# Offsets of the flags, of the latest sequence number and of the writer process id in the header
+FLAGS        = 28
+LATEST       = 32
+PID          = 40
+
+# Flag set when the file must be opened again
+STALE        = 1
+
+# Default number of slots, a consumer can use a frame while the next ones are written
+SLOTS        = 3
+
+# Alignment of rows and slots in bytes
+ALIGN        = 64
+
+def defaultPath(*args, **kwargs):
+    '''Default path of the frame file of the current user.'''
+
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    user      = os.getuid() if hasattr(os, 'getuid') else os.getpid()
+    return opath.join(directory, 'topwatch-%d.frames' %user)
+
+def _align(size, *args, **kwargs):
+    '''Size rounded up to the alignment.'''
+
+    return -(-size//ALIGN)*ALIGN
+
+class FrameRing:
+    '''
+    Writer side of the ring buffer.
+
+    Frames are drawn in place in the mapped memory (see address), so that producing a frame never copies it. Changing the
+    geometry writes a new file which atomically replaces the previous one, consumers being told to open it again.
+    '''
+
+    def __init__(self, path, width, height, slots=SLOTS, *args, **kwargs):
+        '''
+        Create the file.
+
+        Parameters
+        ----------
+            path : str
+                path of the frame file
+            width : int
+                width of the frames in pixels
+            height : int
+                height of the frames in pixels
+            slots : int
+                number of slots
+        '''
+
+        self.path     = path
+        self.slots    = slots
+        self.sequence = 0
+        self.map      = None
+        self._refs    = []
+        self.create(width, height)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def create(self, width, height, *args, **kwargs):
+        '''
+        Create a file with new frame dimensions and replace the previous one.
+
+        Parameters
+        ----------
+            width : int
+                width of the frames in pixels
+            height : int
+                height of the frames in pixels
+        '''
+
+        self.width    = max(1, width)
+        self.height   = max(1, height)
+        self.stride   = _align(self.width*4)
+        self.slotSize = SLOTSIZE + _align(self.stride*self.height)
+
+        tmp           = '%s.tmp' %self.path
+        fd            = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, HEADERSIZE + self.slots*self.slotSize)
+            new       = mmap.mmap(fd, HEADERSIZE + self.slots*self.slotSize)
+        finally:
+            os.close(fd)
+
+        HEADER.pack_into(new, 0, MAGIC, VERSION, RGBA8888_PREMULTIPLIED, self.width, self.height, self.stride, self.slots,
+                         0, self.sequence)
+        struct.pack_into('<I', new, PID, os.getpid())
+        os.replace(tmp, self.path)
+
+        self.release()
+        self.map      = new
+        return
+
+    def release(self, *args, **kwargs):
+        '''Tell consumers that the current file is no longer written and unmap it.'''
+
+        if self.map is None:
+            return
+
+        # Memory exported to the users of address must be released before unmapping
+        self._refs.clear()
+        struct.pack_into('<I', self.map, FLAGS, STALE)
+        self.map.close()
+        self.map      = None
+        return
+
+    def close(self, *args, **kwargs):
+        '''Stop writing frames and remove the file.'''
+
+        self.release()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        return
+
+    def offset(self, slot, *args, **kwargs):
+        '''Offset in the file of the pixels of a slot.'''
+
+        return HEADERSIZE + slot*self.slotSize + SLOTSIZE
+
+    def address(self, slot, *args, **kwargs):
+        '''
+        Address in memory of the pixels of a slot, valid until the geometry changes.
+
+        Parameters
+        ----------
+            slot : int
+                slot index
+        '''
+
+        ref = ctypes.c_char.from_buffer(self.map, self.offset(slot))
+        self._refs.append(ref)
+        return ctypes.addressof(ref)
+
+    def begin(self, *args, **kwargs):
+        '''Mark the slot of the next frame as being written and return its index.'''
+
+        slot = self.sequence%self.slots
+        SLOT.pack_into(self.map, HEADERSIZE + slot*self.slotSize, 0, 0)
+        return slot
+
+    def commit(self, slot, time_ns, *args, **kwargs):
+        '''
+        Publish the frame written in a slot.
+
+        Parameters
+        ----------
+            slot : int
+                slot index returned by begin
+            time_ns : int
+                POSIX time in ns when the frame starts being shown
+        '''
+
+        self.sequence += 1
+        SLOT.pack_into(self.map, HEADERSIZE + slot*self.slotSize, self.sequence, time_ns)
+        struct.pack_into('<Q', self.map, LATEST, self.sequence)
+        return
+
+    def pixels(self, slot, *args, **kwargs):
+        '''Memory view on the pixels of a slot, without copying them.'''
+
+        offset = self.offset(slot)
+        return memoryview(self.map)[offset:offset + self.stride*self.height]
+
+class FrameReader:
+    '''
+    Consumer side of the ring buffer.
+
+    Frames are given as memory views on the mapped file, so they must be used, then checked with valid, before the writer
+    reuses their slot.
+    '''
+
+    def __init__(self, path=None, *args, **kwargs):
+        '''
+        Open the file.
+
+        Parameters
+        ----------
+            path : str
+                path of the frame file. If None, the default one is used.
+        '''
+
+        self.path = path or defaultPath()
+        self.map  = None
+        self.open()
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def open(self, *args, **kwargs):
+        '''Map the current file.'''
+
+        self.close()
+        with open(self.path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, fmt, self.width, self.height, self.stride, self.slots, flags, latest = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('%s is not a TopWatch frame file of version %d' %(self.path, VERSION))
+
+        self.slotSize = SLOTSIZE + _align(self.stride*self.height)
+        return
+
+    def close(self, *args, **kwargs):
+        '''Unmap the file.'''
+
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        return
+
+    def latest(self, *args, **kwargs):
+        '''
+        Latest complete frame, opening the file again if it was replaced.
+
+        Return (sequence number, time in ns, pixels as a memoryview) or None if there is no frame yet.
+        '''
+
+        if struct.unpack_from('<I', self.map, FLAGS)[0] & STALE:
+            self.open()
+
+        sequence       = struct.unpack_from('<Q', self.map, LATEST)[0]
+        if sequence == 0:
+            return None
+
+        offset         = HEADERSIZE + (sequence - 1)%self.slots*self.slotSize
+        seq, time_ns   = SLOT.unpack_from(self.map, offset)
+        if seq != sequence:
+            return None
+
+        return sequence, time_ns, memoryview(self.map)[offset + SLOTSIZE:offset + SLOTSIZE + self.stride*self.height]
+
+    def valid(self, sequence, *args, **kwargs):
+        '''Whether the pixels of a frame given by latest were not overwritten since.'''
+
+        offset = HEADERSIZE + (sequence - 1)%self.slots*self.slotSize
+        return SLOT.unpack_from(self.map, offset)[0] == sequence
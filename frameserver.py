@@ -0,0 +1,290 @@
+"""
+Mercier Wilfried - IRAP
+
+Headless frame server rendering the clock into a shared memory ring buffer (see framebuffer.py), e.g. to overlay it on
+screen recordings or video walls without capturing the desktop.
+
+The clock follows the setting file of the visible one (font, color, opacity, format, mode and blinking) and frames are
+drawn directly in the mapped memory, only when the displayed text or the blinking level changes. Frames can also be
+written to a pipe as raw RGBA video.
+"""
+
+import os
+import sys
+import time
+from   PyQt5        import sip
+from   PyQt5.QtGui  import QGuiApplication, QImage, QPainter
+from   PyQt5.QtCore import Qt, QObject, QTimer, QRect, pyqtSignal
+
+# Own imports
+import setup
+import stats
+import framebuffer
+from   glyphs       import GlyphText
+from   controller   import Controller
+
+class FrameText(GlyphText, QObject):
+    '''Text drawn from a glyph atlas into the frames of a frame server.'''
+
+    opacityChanged = pyqtSignal(float)
+
+    def __init__(self, server, text='', *args, **kwargs):
+        '''
+        Initialize the text.
+
+        Parameters
+        ----------
+            server : FrameServer
+                frame server drawing the text
+            text : str
+                text to show
+        '''
+
+        super().__init__(server)
+        self.server = server
+        self.initGlyphs(text)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def width(self, *args, **kwargs):
+        '''Width of the frames.'''
+
+        return self.server.ring.width
+
+    def height(self, *args, **kwargs):
+        '''Height of the frames.'''
+
+        return self.server.ring.height
+
+    def devicePixelRatioF(self, *args, **kwargs):
+        '''Frames are drawn at their size in pixels.'''
+
+        return 1.0
+
+    def update(self, *args, **kwargs):
+        '''Ask for a new frame, the whole text being drawn again in each slot.'''
+
+        self.server.requestFrame()
+        return
+
+    def setFont(self, font, *args, **kwargs):
+        '''Change the font of the text.'''
+
+        self.setGlyphFont(font)
+        return
+
+    def sizeHint(self, *args, **kwargs):
+        '''Size needed to draw the widest text the format can produce, or the current text if there is no format.'''
+
+        return self.textSize()
+
+    def glyphsResized(self, *args, **kwargs):
+        '''Nothing to do, the frames are resized by the controller (see Controller.updateFont).'''
+
+        return
+
+class FrameServer(Controller, QObject):
+    '''
+    Clock without window writing its frames into a ring buffer.
+
+    The setting file is only read, it belongs to the visible clock. Additional clocks are not rendered.
+    '''
+
+    def __init__(self, path=None, pipe=None, configuration=None, clock=None, *args, **kwargs):
+        '''
+        Initialize the server.
+
+        Parameters
+        ----------
+            path : str
+                path of the frame file. If None, the default one is used.
+            pipe : int
+                file descriptor frames are also written to as raw RGBA video. If None, they are not.
+            configuration : dict
+                checked settings (see setup.check). If None, they are read from the setting file.
+            clock : clocksource.SystemClock or clocksource.VirtualClock
+                clock of the schedulers, also giving the time of the frames. If None, the system clock is used.
+        '''
+
+        super().__init__()
+
+        if configuration is None:
+            configuration, ok = setup.init(os.path.dirname(os.path.realpath(__file__)))
+
+        self.initState(configuration, clock=clock)
+        self.pipe         = pipe
+
+        # Images drawing in place into each slot, created again when the geometry changes
+        self.ring         = framebuffer.FrameRing(path or framebuffer.defaultPath(), 1, 1)
+        self.images       = []
+
+        # Changes within an iteration of the event loop produce a single frame
+        self.frameTimer   = QTimer(self)
+        self.frameTimer.setSingleShot(True)
+        self.frameTimer.timeout.connect(self.writeFrame)
+
+        self.label        = FrameText(self)
+        self.label.setColor(self.color)
+        self.label.setFont(self.font)
+        self.label.setOpacity(self.opacity)
+        self.label.setFormat(self.timeFormat)
+        self.updateFont()
+        self.showTime()
+
+        # Tickers, autosave and blinking engine. The setting file belongs to the visible clock.
+        self.initEngines()
+        self.autosave.enabled = False
+
+        self._clocks      = configuration['clocks']
+        self.clocks       = []
+
+        QTimer.singleShot(0, lambda: self.startServices(server=False))
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def setFixedSize(self, width, height, *args, **kwargs):
+        '''Change the dimensions of the frames, consumers being told to open the frame file again.'''
+
+        if (width, height) == (self.ring.width, self.ring.height):
+            return
+
+        # Images must not outlive the memory they draw into
+        self.images = []
+        self.ring.create(width, height)
+        self.images = [QImage(sip.voidptr(self.ring.address(slot)), self.ring.width, self.ring.height, self.ring.stride,
+                              QImage.Format_RGBA8888_Premultiplied) for slot in range(self.ring.slots)]
+
+        if self.pipe is not None:
+            print('Frames are now %dx%d pixels.' %(self.ring.width, self.ring.height), file=sys.stderr)
+
+        self.requestFrame()
+        return
+
+    def requestFrame(self, *args, **kwargs):
+        '''Write a frame once the current iteration of the event loop is over.'''
+
+        if not self.frameTimer.isActive():
+            self.frameTimer.start(0)
+        return
+
+    def writeFrame(self, *args, **kwargs):
+        '''Draw the text in place into the next slot, publish it and write it to the pipe.'''
+
+        rec     = stats.RECORDER
+        if rec is not None:
+            rec.count('frames')
+            t0  = time.perf_counter()
+
+        slot    = self.ring.begin()
+        painter = QPainter(self.images[slot])
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.fillRect(0, 0, self.ring.width, self.ring.height, Qt.transparent)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+        self.label.paintGlyphs(painter, QRect(0, 0, self.ring.width, self.ring.height))
+        painter.end()
+        self.ring.commit(slot, int(self.clock.time()*1000000000))
+
+        if self.pipe is not None:
+            self.writePipe(slot)
+
+        if rec is not None:
+            rec.add('frame', (time.perf_counter() - t0)*1000)
+        return
+
+    def writePipe(self, slot, *args, **kwargs):
+        '''Write the pixels of a slot to the pipe, straight from the mapped memory.'''
+
+        with self.ring.pixels(slot) as view:
+            try:
+                while view:
+                    view = view[os.write(self.pipe, view):]
+            except BrokenPipeError:
+                print('The frame pipe was closed by its reader.', file=sys.stderr)
+                self.pipe = None
+        return
+
+    def setClocks(self, configurations, *args, **kwargs):
+        '''Keep the configurations of the additional clocks, which are not rendered.'''
+
+        self._clocks = configurations
+        return
+
+    def clockConfigurations(self, *args, **kwargs):
+        '''Configurations of the additional clocks as written in the setting file.'''
+
+        return self._clocks
+
+    def x(self, *args, **kwargs):
+        '''Position of the visible clock, kept as it is.'''
+
+        return self.xpos
+
+    def y(self, *args, **kwargs):
+        '''Position of the visible clock, kept as it is.'''
+
+        return self.ypos
+
+    def move(self, x, y, *args, **kwargs):
+        '''Keep the position of the visible clock.'''
+
+        self.xpos = x
+        self.ypos = y
+        return
+
+    def show(self, *args, **kwargs):
+        '''Nothing to show.'''
+
+        return
+
+    raise_         = show
+    activateWindow = show
+
+    def close(self, *args, **kwargs):
+        '''Remove the frame file and quit.'''
+
+        self.shutdown()
+        self.images = []
+        self.ring.close()
+        QGuiApplication.quit()
+        return
+
+def main(command, configuration=None, *args, **kwargs):
+    '''
+    Run the frame server.
+
+    Parameters
+    ----------
+        command : dict
+            command given on the command line (see control.parse), with the keys 'frames' and 'pipe'
+        configuration : dict
+            checked settings (see setup.check). If None, they are read from the setting file.
+
+    Return the exit code of the application.
+    '''
+
+    # No display is needed
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    pipe   = None
+    if command.get('pipe') == '-':
+        # Messages must not be mixed with the frames
+        pipe       = os.dup(sys.stdout.fileno())
+        sys.stdout = sys.stderr
+    elif command.get('pipe') is not None:
+        pipe       = os.open(command['pipe'], os.O_WRONLY | os.O_CREAT, 0o600)
+
+    root   = QGuiApplication(sys.argv[:1])
+    server = FrameServer(path=command.get('frames') or None, pipe=pipe, configuration=configuration)
+    print('Writing %dx%d frames in %s' %(server.ring.width, server.ring.height, server.ring.path))
+
+    # The command given on the command line is run once the server started, e.g. to start a timer
+    if command['command'] != 'show':
+        QTimer.singleShot(0, lambda: print(server.command(command)))
+
+    code   = root.exec_()
+    server.close()
+    return code
@@ -0,0 +1,471 @@
+"""
+Mercier Wilfried - IRAP
+
+Glyphs rendered once in cached pixmap atlases and drawn from them, shared by the clock widgets and windows.
+
+This module only depends on QtGui so that it can be used without QtWidgets.
+"""
+
+from   math          import ceil
+from   collections   import OrderedDict
+from   PyQt5.QtGui   import QColor, QFont, QFontMetrics, QPainter, QPixmap
+from   PyQt5.QtCore  import Qt, QPointF, QRectF, QSize, QTime
+
+# Own imports
+import timing
+
+# Characters always present in an atlas
+DIGITS     = '0123456789'
+BASECHARS  = DIGITS + ':'
+
+# Atlases and font metrics shared between widgets, the least recently used ones being dropped first
+_ATLASES   = OrderedDict()
+MAXATLAS   = 8
+_METRICS   = OrderedDict()
+MAXMETRICS = 16
+
+# Shapes of the strings produced by each format
+_SHAPES    = {}
+
+def shapes(fmt, *args, **kwargs):
+    '''
+    Every string a time format can produce, with digits replaced by 0.
+
+    Since all digits share the same advance, the width of a string only depends on its shape. Every hour of the day is
+    formatted, with minutes, seconds and milliseconds taking values with one, two and three digits, which gives every
+    shape.
+
+    Parameters
+    ----------
+        fmt : str
+            time format, which can contain T for the tenth of second
+    '''
+
+    if fmt not in _SHAPES:
+        table        = str.maketrans(DIGITS, '0'*len(DIGITS))
+        result       = set()
+        for hour in range(24):
+            for minute in [0, 10]:
+                for sec in [0, 10]:
+                    for ms in [0, 10, 123]:
+                        text = QTime(hour, minute, sec, ms).toString(timing.expand(fmt, ms))
+                        result.add(text.translate(table))
+        _SHAPES[fmt] = frozenset(result)
+
+    return _SHAPES[fmt]
+
+class FontMetricsIndex:
+    '''
+    Metrics of a font needed to draw and size the clock, computed once and independent of the color.
+
+    Digits share the same advance (the largest one) so that the position of a digit never depends on the others.
+    '''
+
+    def __init__(self, font, *args, **kwargs):
+        '''
+        Initialize the index.
+
+        Parameters
+        ----------
+            font : QFont
+                font
+        '''
+
+        self.fm        = QFontMetrics(font)
+        self.height    = self.fm.height()
+        self.ascent    = self.fm.ascent()
+        self.digit     = max(self.fm.horizontalAdvance(c) for c in DIGITS)
+
+        self._advances = {}
+        self._pads     = {}
+        self._extents  = {}
+
+    def advance(self, char, *args, **kwargs):
+        '''Advance of a character.'''
+
+        if char not in self._advances:
+            self._advances[char] = self.digit if char in DIGITS else self.fm.horizontalAdvance(char)
+        return self._advances[char]
+
+    def pad(self, chars, *args, **kwargs):
+        '''Extra space needed on each side of glyphs for parts drawn outside of their advance (e.g. italic fonts).'''
+
+        for c in chars:
+            if c not in self._pads:
+                self._pads[c] = max(0, -min(self.fm.leftBearing(c), self.fm.rightBearing(c)))
+
+        return max([0] + [self._pads[c] for c in chars])
+
+    def extent(self, fmt, *args, **kwargs):
+        '''
+        Width of the widest string a time format can produce, including the padding.
+
+        Parameters
+        ----------
+            fmt : str
+                time format
+        '''
+
+        if fmt not in self._extents:
+            strings            = shapes(fmt)
+            chars              = set(BASECHARS).union(*strings)
+            widest             = max([0] + [sum(self.advance(c) for c in text) for text in strings])
+            self._extents[fmt] = widest + 2*self.pad(chars)
+        return self._extents[fmt]
+
+def metrics(font, *args, **kwargs):
+    '''
+    Get the metrics index of a font from the cache, computing it if needed.
+
+    Parameters
+    ----------
+        font : QFont
+            font
+    '''
+
+    key             = font.toString()
+    if key in _METRICS:
+        _METRICS.move_to_end(key)
+    else:
+        _METRICS[key] = FontMetricsIndex(font)
+        if len(_METRICS) > MAXMETRICS:
+            _METRICS.popitem(last=False)
+
+    return _METRICS[key]
+
+class GlyphAtlas:
+    '''
+    Pixmap holding every glyph of a given set of characters rendered once with a given font and color.
+    '''
+
+    def __init__(self, font, color, chars, dpr=1, *args, **kwargs):
+        '''
+        Render the glyphs.
+
+        Parameters
+        ----------
+            font : QFont
+                font used to render the glyphs
+            color : QColor or str
+                color of the glyphs
+            chars : str
+                characters to render
+            dpr : float
+                device pixel ratio of the screen the glyphs are drawn on
+        '''
+
+        index         = metrics(font)
+        self.chars    = chars
+        self.dpr      = dpr
+        self.height   = index.height
+        self.advances = {c: index.advance(c) for c in chars}
+        self.pad      = index.pad(chars)
+
+        # Position of each glyph in the pixmap, in logical coordinates
+        self.rects    = {}
+        x             = 0
+        for c in chars:
+            width         = self.advances[c] + 2*self.pad
+            self.rects[c] = QRectF(x, 0, width, self.height)
+            x            += width
+
+        self.pixmap   = QPixmap(max(1, ceil(x*dpr)), max(1, ceil(self.height*dpr)))
+        self.pixmap.setDevicePixelRatio(dpr)
+        self.pixmap.fill(Qt.transparent)
+
+        painter       = QPainter(self.pixmap)
+        painter.setFont(font)
+        painter.setPen(QColor(color))
+        for c in chars:
+            # Glyphs narrower than their advance (digits) are centered
+            offset    = self.pad + (self.advances[c] - index.fm.horizontalAdvance(c))/2
+            painter.drawText(QPointF(self.rects[c].x() + offset, index.ascent), c)
+        painter.end()
+
+    def width(self, text, *args, **kwargs):
+        '''Width of a text drawn with this atlas.'''
+
+        return sum(self.advances[c] for c in text) + 2*self.pad
+
+    def source(self, char, *args, **kwargs):
+        '''Rectangle of a glyph in the pixmap, in device pixels.'''
+
+        r = self.rects[char]
+        return QRectF(r.x()*self.dpr, 0, r.width()*self.dpr, r.height()*self.dpr)
+
+def atlas(font, color, chars, dpr=1, *args, **kwargs):
+    '''
+    Get an atlas from the cache, rendering it if needed.
+
+    Parameters
+    ----------
+        font : QFont
+            font used to render the glyphs
+        color : QColor or str
+            color of the glyphs
+        chars : str
+            characters to render
+        dpr : float
+            device pixel ratio
+    '''
+
+    key            = (font.toString(), QColor(color).name(QColor.HexArgb), chars, dpr)
+    if key in _ATLASES:
+        _ATLASES.move_to_end(key)
+    else:
+        _ATLASES[key] = GlyphAtlas(font, color, chars, dpr=dpr)
+        if len(_ATLASES) > MAXATLAS:
+            _ATLASES.popitem(last=False)
+
+    return _ATLASES[key]
+
+def releaseAtlases(*args, **kwargs):
+    '''Drop every cached atlas, e.g. while no clock can be seen for a long time. Texts must also release theirs.'''
+
+    _ATLASES.clear()
+    return
+
+class GlyphText:
+    '''
+    Short text drawn from a glyph atlas, shared by the clock widgets and windows.
+
+    Only the glyphs which changed are repainted and the opacity is applied by the painter. Classes using it must provide
+    width, height, update, devicePixelRatioF, an opacityChanged signal and a glyphsResized method called when the size
+    needed to draw the text changes, and must call initGlyphs.
+    '''
+
+    def initGlyphs(self, text='', *args, **kwargs):
+        '''
+        Initialize the text.
+
+        Parameters
+        ----------
+            text : str
+                text to show
+        '''
+
+        self._text      = text
+        self._color     = QColor('#ffdd1c')
+        self._opacity   = 1
+        self._glyphFont = QFont()
+        self._chars     = BASECHARS
+        self._atlas     = None
+        self._format    = None
+
+        # Scale applied to the glyphs of the current font while a font size change is previewed
+        self._scale     = 1
+        return
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def text(self, *args, **kwargs):
+        '''Text currently shown.'''
+
+        return self._text
+
+    def setText(self, text, *args, **kwargs):
+        '''
+        Change the text and only repaint the glyphs which changed.
+
+        Parameters
+        ----------
+            text : str
+                new text
+        '''
+
+        if text == self._text:
+            return
+
+        old        = self._text
+        self._text = text
+
+        # New characters require a new atlas
+        missing    = ''.join(sorted(set(c for c in text if c not in self._chars)))
+        if missing:
+            self._chars += missing
+            self._atlas  = None
+
+        atlas      = self.atlas()
+        if self._scale != 1 or len(old) != len(text) or atlas.width(old) != atlas.width(text):
+            self.update()
+        else:
+            for pos, (c1, c2) in enumerate(zip(old, text)):
+                if c1 != c2:
+                    self.update(self.glyphRect(pos).toAlignedRect())
+        return
+
+    def setFormat(self, fmt, *args, **kwargs):
+        '''
+        Set the time format the text is produced with, so that the size is the one of the widest possible text.
+
+        Parameters
+        ----------
+            fmt : str
+                time format. If None, the size is the one of the current text.
+        '''
+
+        self._format = fmt
+        if fmt is not None:
+            # Every character the format can produce is rendered at once
+            missing  = ''.join(sorted(set().union(*shapes(fmt)) - set(self._chars)))
+            if missing:
+                self._chars += missing
+                self._atlas  = None
+
+        self.glyphsResized()
+        return
+
+    def color(self, *args, **kwargs):
+        '''Color of the text.'''
+
+        return self._color
+
+    def setColor(self, color, *args, **kwargs):
+        '''
+        Change the color of the text.
+
+        Parameters
+        ----------
+            color : QColor or str
+                new color
+        '''
+
+        self._color = QColor(color)
+        self._atlas = None
+        self.update()
+        return
+
+    def opacity(self, *args, **kwargs):
+        '''Opacity of the text.'''
+
+        return self._opacity
+
+    def setOpacity(self, value, *args, **kwargs):
+        '''
+        Change the opacity of the text.
+
+        Parameters
+        ----------
+            value : float
+                opacity between 0 and 1
+        '''
+
+        if value != self._opacity:
+            self._opacity = value
+            self.update()
+            self.opacityChanged.emit(value)
+        return
+
+    def glyphFont(self, *args, **kwargs):
+        '''Font of the text.'''
+
+        return self._glyphFont
+
+    def setGlyphFont(self, font, *args, **kwargs):
+        '''
+        Change the font of the text.
+
+        Parameters
+        ----------
+            font : QFont
+                new font
+        '''
+
+        self._glyphFont = QFont(font)
+        self._atlas     = None
+        self._scale     = 1
+        self.glyphsResized()
+        self.update()
+        return
+
+    def previewScale(self, *args, **kwargs):
+        '''Scale applied to the glyphs while a font size change is previewed, 1 otherwise.'''
+
+        return self._scale
+
+    def setPreviewScale(self, scale, *args, **kwargs):
+        '''
+        Draw the glyphs of the current font scaled from the top left corner, as a cheap preview of a font size change which
+        neither renders new glyphs nor needs a resize. It is reset when the font is changed.
+
+        Parameters
+        ----------
+            scale : float
+                scale applied to the glyphs, 1 to draw them as they are
+        '''
+
+        if scale != self._scale:
+            self._scale = scale
+            self.update()
+        return
+
+    def releaseAtlas(self, *args, **kwargs):
+        '''Drop the reference to the atlas, which is rendered again (see atlas) the next time it is needed.'''
+
+        self._atlas = None
+        return
+
+    def atlas(self, *args, **kwargs):
+        '''Atlas matching the current font and color.'''
+
+        if self._atlas is None:
+            self._atlas = atlas(self._glyphFont, self._color, self._chars, dpr=self.devicePixelRatioF())
+        return self._atlas
+
+    def glyphRect(self, pos, *args, **kwargs):
+        '''
+        Rectangle where a glyph of the text is drawn, in local coordinates.
+
+        Parameters
+        ----------
+            pos : int
+                position of the glyph in the text
+        '''
+
+        atlas = self.atlas()
+        x     = (self.width() - atlas.width(self._text))/2
+        x    += sum(atlas.advances[c] for c in self._text[:pos])
+        y     = (self.height() - atlas.height)/2
+        return QRectF(x, y, atlas.rects[self._text[pos]].width(), atlas.height)
+
+    def textSize(self, *args, **kwargs):
+        '''Size needed to draw the widest text the format can produce, or the current text if there is no format.'''
+
+        if self._format is not None:
+            index = metrics(self._glyphFont)
+            return QSize(ceil(index.extent(self._format)), ceil(index.height))
+
+        atlas     = self.atlas()
+        return QSize(ceil(atlas.width(self._text)), ceil(atlas.height))
+
+    def paintGlyphs(self, painter, area, *args, **kwargs):
+        '''
+        Draw the glyphs intersecting an area.
+
+        Parameters
+        ----------
+            painter : QPainter
+                painter of the paint device
+            area : QRect
+                area to repaint
+        '''
+
+        if self._opacity <= 0 or not self._text:
+            return
+
+        atlas = self.atlas()
+        painter.setOpacity(self._opacity)
+
+        area  = QRectF(area)
+        if self._scale != 1:
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            painter.scale(self._scale, self._scale)
+            area  = QRectF(area.topLeft()/self._scale, area.size()/self._scale)
+
+        for pos, c in enumerate(self._text):
+            rect = self.glyphRect(pos)
+            if rect.intersects(area):
+                painter.drawPixmap(rect.topLeft(), atlas.pixmap, atlas.source(c))
+        return
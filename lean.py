@@ -0,0 +1,334 @@
+"""
+Mercier Wilfried - IRAP
+
+Lean rendering backend only depending on QtGui, for a minimal memory and import footprint.
+
+The clock is a single QRasterWindow painting glyphs from the shared atlases, without QtWidgets, menu bar nor dialogs. The
+behaviour is the one of the widgets backend (see controller.py). Settings are changed with the keyboard, the context menu
+(lazily created on right click, see leanmenu.py), the setting file or commands sent by other invocations.
+"""
+
+import sys
+import os.path      as     opath
+from   time         import perf_counter
+from   PyQt5.QtGui  import QGuiApplication, QRasterWindow, QSurfaceFormat, QPainter
+from   PyQt5.QtCore import Qt, QObject, QEvent, QTimer, QSize, pyqtSignal
+
+# Own imports
+import setup
+import stats
+from   glyphs       import GlyphText
+from   controller   import Controller
+
+class WindowText(GlyphText, QObject):
+    '''Text drawn from a glyph atlas in a window which paints it itself (see LeanClock.paintEvent).'''
+
+    opacityChanged = pyqtSignal(float)
+
+    def __init__(self, window, text='', *args, **kwargs):
+        '''
+        Initialize the text.
+
+        Parameters
+        ----------
+            window : QPaintDeviceWindow
+                window the text is drawn in
+            text : str
+                text to show
+        '''
+
+        super().__init__(window)
+        self.window = window
+        self.initGlyphs(text)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def width(self, *args, **kwargs):
+        '''Width of the window.'''
+
+        return self.window.width()
+
+    def height(self, *args, **kwargs):
+        '''Height of the window.'''
+
+        return self.window.height()
+
+    def devicePixelRatioF(self, *args, **kwargs):
+        '''Device pixel ratio of the window.'''
+
+        return self.window.devicePixelRatioF()
+
+    def update(self, rect=None, *args, **kwargs):
+        '''
+        Schedule a repaint of the window.
+
+        Parameters
+        ----------
+            rect : QRect
+                area to repaint. If None, the whole window is repainted.
+        '''
+
+        if rect is None:
+            self.window.update()
+        else:
+            self.window.update(rect)
+        return
+
+    def setFont(self, font, *args, **kwargs):
+        '''Change the font of the text.'''
+
+        self.setGlyphFont(font)
+        return
+
+    def sizeHint(self, *args, **kwargs):
+        '''Size needed to draw the widest text the format can produce, or the current text if there is no format.'''
+
+        return self.textSize()
+
+    def glyphsResized(self, *args, **kwargs):
+        '''Nothing to do, the window is resized by the controller (see Controller.updateFont).'''
+
+        return
+
+class LeanClock(Controller, QRasterWindow):
+    '''
+    Clock window only depending on QtGui.
+
+    Additional clocks in other time zones are not shown by this backend, but they are kept in the setting file.
+    '''
+
+    def __init__(self, configuration=None, clock=None, *args, **kwargs):
+        '''
+        Initialize the clock.
+
+        Parameters
+        ----------
+            configuration : dict
+                checked settings (see setup.check). If None, they are read from the setting file.
+            clock : clocksource.SystemClock or clocksource.VirtualClock
+                clock of the schedulers. If None, the system clock is used.
+        '''
+
+        super().__init__()
+        self.setTitle('TopWatch')
+        self.setFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint | Qt.Dialog)
+
+        # Transparent background
+        surface           = QSurfaceFormat()
+        surface.setAlphaBufferSize(8)
+        self.setFormat(surface)
+
+        if configuration is None:
+            configuration, ok = setup.init(opath.dirname(opath.realpath(__file__)))
+
+        self.initState(configuration, clock=clock)
+        self.setPosition(self.xpos, self.ypos)
+
+        # Text drawn from cached glyphs, its opacity being applied when painting
+        self.label        = WindowText(self)
+        self.label.setColor(self.color)
+        self.label.setFont(self.font)
+        self.label.setOpacity(self.opacity)
+        self.label.setFormat(self.timeFormat)
+        self.showTime()
+
+        # Tickers, dragging, autosave and blinking engine
+        self.initEngines()
+
+        # Set dimensions relative to the text dimensions
+        size              = self.label.sizeHint()
+        self.setFixedSize(size.width()+5, size.height()+5)
+        self.show()
+        self.visibility.add(self, self.label, self.showTime)
+
+        # Additional clocks are kept as they are
+        self.clocks       = []
+        self._clocks      = configuration['clocks']
+        if self._clocks:
+            print('Additional clocks are only shown with the widgets backend.')
+
+        # Context menu, created on first use
+        self.menu         = None
+
+        # Everything not needed to show the clock is done once the first frame is shown
+        QTimer.singleShot(0, self.finishStartup)
+
+    def finishStartup(self, *args, **kwargs):
+        '''Set the window icon and start the services. Called once the clock is shown.'''
+
+        from PyQt5.QtGui import QIcon
+
+        self.setIcon(QIcon(opath.join(self.scriptDir, 'icon.png')))
+        self.startServices()
+        return
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def setClocks(self, configurations, *args, **kwargs):
+        '''
+        Keep the configurations of the additional clocks, which are not shown by this backend.
+
+        :param list configurations: clock configurations (see setup.CLOCKKEYS)
+        '''
+
+        self._clocks = configurations
+        return
+
+    def clockConfigurations(self, *args, **kwargs):
+        '''Configurations of the additional clocks as written in the setting file.'''
+
+        return self._clocks
+
+    def pos(self, *args, **kwargs):
+        '''Position of the window, as for widgets.'''
+
+        return self.position()
+
+    def move(self, *args, **kwargs):
+        '''Move the window, as for widgets.'''
+
+        self.setPosition(*args)
+        return
+
+    def activateWindow(self, *args, **kwargs):
+        '''Give the keyboard focus to the window, as for widgets.'''
+
+        self.requestActivate()
+        return
+
+    def setFixedSize(self, width, height, *args, **kwargs):
+        '''Resize the window and forbid resizing it, as for widgets.'''
+
+        size = QSize(width, height)
+        self.setMinimumSize(size)
+        self.setMaximumSize(size)
+        self.resize(size)
+        return
+
+    def toggleBlink(self, *args, **kwargs):
+        '''Stop blinking, or start blinking with the current parameters.'''
+
+        if self.blinkActive:
+            self.stopBlink()
+        else:
+            self.start_blink(self.blinkFreq, self.blinkPeriod, self.blinkNb, fade=self.blinkFade)
+        return
+
+    def showMenu(self, pos, *args, **kwargs):
+        '''
+        Show the context menu.
+
+        :param QPoint pos: global position of the top left corner of the menu
+        '''
+
+        if self.menu is None:
+            from leanmenu import PopupMenu
+
+            self.menu = PopupMenu(self)
+
+        self.menu.popup(pos)
+        return
+
+    ##########################################
+    #               Qt methods               #
+    ##########################################
+
+    def event(self, event, *args, **kwargs):
+        '''Write pending changes before closing.'''
+
+        if event.type() == QEvent.Close:
+            self.shutdown()
+            if self.menu is not None:
+                self.menu.close()
+        return super().event(event)
+
+    def paintEvent(self, event, *args, **kwargs):
+        '''Clear the area to repaint and draw the glyphs intersecting it.'''
+
+        rec     = stats.RECORDER
+        if rec is not None:
+            rec.count('repaints')
+            t0  = perf_counter()
+
+        painter = QPainter(self)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.fillRect(event.rect(), Qt.transparent)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+        self.label.paintGlyphs(painter, event.rect())
+        painter.end()
+
+        if rec is not None:
+            rec.add('paint', (perf_counter() - t0)*1000)
+        return
+
+    def keyPressEvent(self, e, *args, **kwargs):
+        '''Shortcuts of the menu actions of the widgets backend which do not need a dialog.'''
+
+        key       = e.key()
+        modifiers = e.modifiers()
+
+        if   key == Qt.Key_Space:
+            self.toggleTimer()
+        elif key == Qt.Key_R and modifiers & Qt.ControlModifier and modifiers & Qt.AltModifier:
+            self.reset()
+        elif key == Qt.Key_R and modifiers & Qt.ControlModifier:
+            self.resetTimer()
+        elif key == Qt.Key_S and modifiers & Qt.ControlModifier:
+            self.save()
+        elif key == Qt.Key_B and modifiers & Qt.ControlModifier:
+            self.toggleBlink()
+        else:
+            super().keyPressEvent(e)
+        return
+
+    ############################################
+    #               Mouse events               #
+    ############################################
+
+    def mousePressEvent(self, event):
+
+        button = event.button()
+
+        if   button == 1:
+            self.dragger.start(event.globalPos())
+        elif button == 2:
+            self.showMenu(event.globalPos())
+        return
+
+    def mouseMoveEvent(self, event):
+        self.dragger.moveTo(event.globalPos())
+        return
+
+    def mouseReleaseEvent(self, event):
+
+        if event.button() == 1:
+            self.dragger.finish()
+            self.autosave.request()
+        return
+
+def main(command, configuration=None, *args, **kwargs):
+    '''
+    Run the lean backend.
+
+    Parameters
+    ----------
+        command : dict
+            command given on the command line (see control.parse)
+        configuration : dict
+            checked settings (see setup.check). If None, they are read from the setting file.
+
+    Return the exit code of the application.
+    '''
+
+    root  = QGuiApplication(sys.argv[:1])
+    clock = LeanClock(configuration)
+
+    # The command given on the command line is run once the clock is shown
+    if command['command'] != 'show':
+        QTimer.singleShot(0, lambda: print(clock.command(command)))
+
+    return root.exec_()
@@ -0,0 +1,215 @@
+"""
+Mercier Wilfried - IRAP
+
+Context menu of the lean backend (see lean.py), painted in a QRasterWindow so that QtWidgets is never imported.
+
+It is only imported and created the first time it is shown.
+"""
+
+from   PyQt5.QtGui  import QGuiApplication, QRasterWindow, QFontMetrics, QPainter, QColor
+from   PyQt5.QtCore import Qt, QRect
+
+# Own imports
+import timing
+import chrono
+
+# Margins around the text of an item and height of a separator in pixels
+PADDING   = 4
+SEPARATOR = 7
+
+# Colors of the background, of the hovered item, of the text and of separators
+COLORS    = {'background' : QColor(40, 40, 40), 'hover' : QColor(70, 110, 170), 'text' : QColor(230, 230, 230),
+             'separator'  : QColor(90, 90, 90)}
+
+class PopupMenu(QRasterWindow):
+    '''
+    Popup menu with the actions of the widgets backend which do not need a dialog.
+
+    Items are built from the state of the clock every time the menu is shown, so that check marks are always up to date.
+    '''
+
+    def __init__(self, clock, *args, **kwargs):
+        '''
+        Initialize the menu.
+
+        Parameters
+        ----------
+            clock : lean.LeanClock
+                clock window the actions apply to
+        '''
+
+        super().__init__()
+        self.clock   = clock
+        self.setFlags(Qt.Popup | Qt.FramelessWindowHint)
+        self.setTransientParent(clock)
+
+        self.fm      = QFontMetrics(QGuiApplication.font())
+        self.row     = self.fm.height() + 2*PADDING
+        self.check   = self.fm.horizontalAdvance('✓ ')
+
+        # Items as (title, checked state or None, function), None being a separator
+        self.items   = []
+        self.hovered = None
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def actions(self, *args, **kwargs):
+        '''Items matching the current state of the clock.'''
+
+        clock = self.clock
+        items = [('Show seconds',   timing.granularity(clock.timeFormat) <= 1000,
+                  lambda: clock.setTimeFormat('hh:mm' if timing.granularity(clock.timeFormat) <= 1000 else 'hh:mm:ss')),
+                 ('High precision', clock.precise, lambda: clock.setPrecise(not clock.precise)),
+                 ('Snap to edges',  clock.snap,    lambda: clock.setSnap(not clock.snap)),
+                 None
+                ]
+
+        for mode, title in zip(chrono.MODES, ['Clock', 'Countdown', 'Stopwatch', 'Interval timer']):
+            items.append((title, mode == clock.mode, lambda mode=mode: clock.setMode(mode)))
+
+        if clock.chrono is not None:
+            items += [None,
+                      ('Pause timer' if clock.chrono.running else 'Start timer', None, clock.toggleTimer),
+                      ('Reset timer', None, clock.resetTimer)
+                     ]
+
+        items    += [None,
+                     ('Stop blinking' if clock.blinkActive else 'Blink', None, clock.toggleBlink),
+                     ('Save',  None, clock.save),
+                     ('Reset', None, clock.reset),
+                     None,
+                     ('Quit',  None, clock.close)
+                    ]
+        return items
+
+    def popup(self, pos, *args, **kwargs):
+        '''
+        Show the menu.
+
+        :param QPoint pos: global position of the top left corner of the menu
+        '''
+
+        self.items   = self.actions()
+        self.hovered = None
+
+        width        = max(self.fm.horizontalAdvance(item[0]) for item in self.items if item is not None)
+        height       = sum(SEPARATOR if item is None else self.row for item in self.items)
+        self.setGeometry(pos.x(), pos.y(), width + self.check + 4*PADDING, height)
+
+        self.show()
+        self.requestActivate()
+        self.setMouseGrabEnabled(True)
+        self.setKeyboardGrabEnabled(True)
+        self.update()
+        return
+
+    def itemAt(self, y, *args, **kwargs):
+        '''Index of the item at a vertical position, or None if there is none or it is a separator.'''
+
+        top = 0
+        for pos, item in enumerate(self.items):
+            bottom = top + (SEPARATOR if item is None else self.row)
+            if top <= y < bottom:
+                return None if item is None else pos
+            top    = bottom
+        return None
+
+    def trigger(self, pos, *args, **kwargs):
+        '''Close the menu and run the function of an item.'''
+
+        self.close()
+        if pos is not None:
+            self.items[pos][2]()
+        return
+
+    def close(self, *args, **kwargs):
+        '''Release the mouse and keyboard and hide the menu.'''
+
+        self.setMouseGrabEnabled(False)
+        self.setKeyboardGrabEnabled(False)
+        self.hide()
+        return
+
+    ##########################################
+    #               Qt methods               #
+    ##########################################
+
+    def paintEvent(self, event, *args, **kwargs):
+        '''Draw the items.'''
+
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), COLORS['background'])
+
+        top     = 0
+        for pos, item in enumerate(self.items):
+            if item is None:
+                painter.setPen(COLORS['separator'])
+                painter.drawLine(PADDING, top + SEPARATOR//2, self.width() - PADDING, top + SEPARATOR//2)
+                top += SEPARATOR
+                continue
+
+            rect     = QRect(0, top, self.width(), self.row)
+            if pos == self.hovered:
+                painter.fillRect(rect, COLORS['hover'])
+
+            title, checked = item[:2]
+            painter.setPen(COLORS['text'])
+            if checked:
+                painter.drawText(rect.adjusted(PADDING, 0, 0, 0), Qt.AlignVCenter, '✓')
+            painter.drawText(rect.adjusted(PADDING + self.check, 0, 0, 0), Qt.AlignVCenter, title)
+            top     += self.row
+
+        painter.end()
+        return
+
+    def mouseMoveEvent(self, event, *args, **kwargs):
+        '''Highlight the item below the mouse.'''
+
+        hovered = self.itemAt(event.pos().y()) if QRect(0, 0, self.width(), self.height()).contains(event.pos()) else None
+        if hovered != self.hovered:
+            self.hovered = hovered
+            self.update()
+        return
+
+    def mousePressEvent(self, event, *args, **kwargs):
+        '''Close the menu when clicking outside of it.'''
+
+        if not QRect(0, 0, self.width(), self.height()).contains(event.pos()):
+            self.close()
+        return
+
+    def mouseReleaseEvent(self, event, *args, **kwargs):
+        '''Run the function of the item below the mouse.'''
+
+        if QRect(0, 0, self.width(), self.height()).contains(event.pos()):
+            pos = self.itemAt(event.pos().y())
+            if pos is not None:
+                self.trigger(pos)
+        return
+
+    def keyPressEvent(self, event, *args, **kwargs):
+        '''Move between items with the arrows, run one with Return and close the menu with Escape.'''
+
+        key        = event.key()
+        if key == Qt.Key_Escape:
+            self.close()
+        elif key in (Qt.Key_Return, Qt.Key_Enter):
+            self.trigger(self.hovered)
+        elif key in (Qt.Key_Up, Qt.Key_Down):
+            step       = -1 if key == Qt.Key_Up else 1
+            positions  = [pos for pos, item in enumerate(self.items) if item is not None]
+            if self.hovered is None:
+                self.hovered = positions[0 if step > 0 else -1]
+            else:
+                index        = (positions.index(self.hovered) + step)%len(positions)
+                self.hovered = positions[index]
+            self.update()
+        return
+
+    def focusOutEvent(self, event, *args, **kwargs):
+        '''Close the menu when another window is activated.'''
+
+        self.close()
+        return
@@ -0,0 +1,54 @@
+"""
+Mercier Wilfried - IRAP
+
+Memory of the process: resident size, and giving the free heap back to the system.
+
+Freed memory usually stays in the heap of the process, so releasing caches alone does not lower its resident size. With
+glibc, malloc_trim returns the free pages to the system.
+"""
+
+import os
+import sys
+import ctypes
+
+_LIBC = None
+
+def _libc(*args, **kwargs):
+    '''C library if it provides malloc_trim (glibc), or None.'''
+
+    global _LIBC
+    if _LIBC is None:
+        _LIBC = False
+        if sys.platform.startswith('linux'):
+            try:
+                libc = ctypes.CDLL(None)
+                libc.malloc_trim.argtypes = [ctypes.c_size_t]
+                libc.malloc_trim.restype  = ctypes.c_int
+                _LIBC = libc
+            except (OSError, AttributeError):
+                pass
+
+    return _LIBC or None
+
+def trim(*args, **kwargs):
+    '''
+    Give the free memory of the heap back to the system.
+
+    Return whether it could be done on this system.
+    '''
+
+    libc = _libc()
+    if libc is None:
+        return False
+
+    libc.malloc_trim(0)
+    return True
+
+def rss(*args, **kwargs):
+    '''Current resident set size of the process in kB, or None if it cannot be read.'''
+
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')//1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
@@ -0,0 +1,347 @@
+"""
+Mercier Wilfried - IRAP
+
+Reminders making the clock blink at given times of the day, kept in a priority queue so that a single timer is needed
+however many there are.
+
+A reminder is given by when it fires:
+
+    hh:mm[:ss]              every day at this time
+    :mm[:ss]                every hour at this minute
+    yyyy-mm-dd hh:mm[:ss]   once (a T can be used instead of the space)
+
+and optionally by the number of blinks, the duration of a blink and the duration of its fading in ms. Only the next
+occurrence of a recurring reminder is in the queue, the following one being computed when it fires.
+"""
+
+import re
+import time
+import heapq
+from   itertools import count
+
+# Time specifications, as (kind, regular expression)
+_RULES = [('daily',  re.compile(r'(\d{1,2}):(\d{2})(?::(\d{2}))?')),
+          ('hourly', re.compile(r':(\d{2})(?::(\d{2}))?')),
+          ('once',   re.compile(r'(\d{4})-(\d{2})-(\d{2})[T ](\d{1,2}):(\d{2})(?::(\d{2}))?'))
+         ]
+
+class Reminder:
+    '''A time specification with the blinking to show when it fires.'''
+
+    def __init__(self, at, nb=3, duration=100, fade=0, *args, **kwargs):
+        '''
+        Parse the time specification.
+
+        Parameters
+        ----------
+            at : str
+                time specification (see module documentation)
+            nb : int
+                number of blinks
+            duration : int
+                duration of a single blink in ms
+            fade : int
+                duration of the fade in and fade out of a blink in ms
+        '''
+
+        self.at       = ' '.join(str(at).split())
+        self.nb       = nb
+        self.duration = duration
+        self.fade     = fade
+
+        for kind, regex in _RULES:
+            match     = regex.fullmatch(self.at)
+            if match is not None:
+                self.kind   = kind
+                self.fields = tuple(int(i or 0) for i in match.groups())
+                break
+        else:
+            raise ValueError('Reminder time %s is not in format hh:mm[:ss], :mm[:ss] or yyyy-mm-dd hh:mm[:ss]' %at)
+
+        if self.kind == 'once':
+            hms       = self.fields[3:]
+            if not 1 <= self.fields[1] <= 12 or not 1 <= self.fields[2] <= 31:
+                raise ValueError('Reminder date in %s is not a valid date' %at)
+        else:
+            hms       = self.fields if self.kind == 'daily' else (0,) + self.fields
+
+        if hms[0] > 23 or hms[1] > 59 or hms[2] > 59:
+            raise ValueError('Reminder time in %s is not a valid time of the day' %at)
+
+        for name, value in [('number of blinks', nb), ('blink duration', duration)]:
+            if not isinstance(value, int) or value <= 0:
+                raise ValueError('Reminder %s must be a positive int (current value is %s)' %(name, value))
+
+        if not isinstance(fade, int) or fade < 0:
+            raise ValueError('Reminder fade duration must be a positive int or 0 (current value is %s)' %fade)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def recurring(self, *args, **kwargs):
+        '''Whether the reminder fires more than once.'''
+
+        return self.kind != 'once'
+
+    def next(self, now, *args, **kwargs):
+        '''
+        Next time the reminder fires, in local time.
+
+        Parameters
+        ----------
+            now : float
+                POSIX time in s, the reminder firing strictly after it
+
+        Return the POSIX time in s or None if the reminder will not fire anymore.
+        '''
+
+        lt = time.localtime(now)
+        if self.kind == 'once':
+            y, mo, d, h, mi, s = self.fields
+            due = time.mktime((y, mo, d, h, mi, s, 0, 0, -1))
+            return due if due > now else None
+
+        if self.kind == 'daily':
+            h, mi, s = self.fields
+            due      = time.mktime((lt.tm_year, lt.tm_mon, lt.tm_mday, h, mi, s, 0, 0, -1))
+            if due <= now:
+                due  = time.mktime((lt.tm_year, lt.tm_mon, lt.tm_mday+1, h, mi, s, 0, 0, -1))
+            return due
+
+        mi, s        = self.fields
+        due          = time.mktime((lt.tm_year, lt.tm_mon, lt.tm_mday, lt.tm_hour, mi, s, 0, 0, -1))
+        if due <= now:
+            due      = time.mktime((lt.tm_year, lt.tm_mon, lt.tm_mday, lt.tm_hour+1, mi, s, 0, 0, -1))
+        return due
+
+    def configuration(self, *args, **kwargs):
+        '''Reminder as written in the setting file.'''
+
+        return {'at' : self.at, 'nb' : self.nb, 'duration' : self.duration, 'fade' : self.fade}
+
+def parse(spec, nb=3, duration=100, fade=0, *args, **kwargs):
+    '''
+    Create a reminder from a setting or from a line of a reminder file.
+
+    Parameters
+    ----------
+        spec : dict or str
+            dictionnary with the keys 'at', 'nb', 'duration' and 'fade', or string 'at [nb [duration [fade]]]'
+        nb : int
+            number of blinks if not given
+        duration : int
+            duration of a single blink in ms if not given
+        fade : int
+            duration of the fading in ms if not given
+
+    Raise a ValueError if the reminder is not valid.
+    '''
+
+    if isinstance(spec, dict):
+        return Reminder(spec.get('at'), nb=spec.get('nb', nb), duration=spec.get('duration', duration), fade=spec.get('fade', fade))
+
+    # The time of a reminder firing once contains a space
+    words       = str(spec).split()
+    size        = 2 if len(words) > 1 and '-' in words[0] else 1
+    at          = ' '.join(words[:size])
+    try:
+        values  = [int(i) for i in words[size:]]
+    except ValueError:
+        raise ValueError('Reminder %s must be given as time [nb [duration [fade]]] with integer values' %spec)
+
+    if len(values) > 3:
+        raise ValueError('Reminder %s has too many values' %spec)
+
+    values     += [nb, duration, fade][len(values):]
+    return Reminder(at, *values)
+
+def load(fname, nb=3, duration=100, fade=0, *args, **kwargs):
+    '''
+    Read reminders from a text file with one reminder per line given as 'at [nb [duration [fade]]]'. Empty lines and
+    lines starting with # are skipped.
+
+    Parameters
+    ----------
+        fname : str
+            name of the file
+        nb : int
+            number of blinks if not given
+        duration : int
+            duration of a single blink in ms if not given
+        fade : int
+            duration of the fading in ms if not given
+
+    Raise a ValueError giving the line of the first invalid reminder.
+    '''
+
+    reminders = []
+    with open(fname, 'r') as f:
+        for num, line in enumerate(f, start=1):
+            line  = line.split('#')[0].strip()
+            if not line:
+                continue
+
+            try:
+                reminders.append(parse(line, nb=nb, duration=duration, fade=fade))
+            except ValueError as e:
+                raise ValueError('%s, line %d: %s' %(fname, num, e))
+    return reminders
+
+class ReminderQueue:
+    '''
+    Pending reminders ordered by the time they fire next.
+
+    Adding a reminder and finding the next one to fire are O(log n). Cancelled reminders are left in the heap and skipped
+    when they reach its top, the heap being rebuilt when they make up more than half of it.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        '''Initialize an empty queue.'''
+
+        # Heap of (due time, reminder number), and reminders with their due time by number
+        self._heap     = []
+        self.reminders = {}
+        self._due      = {}
+        self._ids      = count(1)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def __len__(self, *args, **kwargs):
+        '''Number of pending reminders.'''
+
+        return len(self.reminders)
+
+    def add(self, reminder, now=None, *args, **kwargs):
+        '''
+        Add a reminder.
+
+        Parameters
+        ----------
+            reminder : Reminder
+                reminder to add
+            now : float
+                POSIX time in s. If None, the current time is used.
+
+        Return the reminder number, or None if it will never fire.
+        '''
+
+        due          = reminder.next(time.time() if now is None else now)
+        if due is None:
+            return None
+
+        num          = next(self._ids)
+        self.reminders[num] = reminder
+        self._push(num, due)
+        return num
+
+    def cancel(self, num, *args, **kwargs):
+        '''
+        Cancel a reminder.
+
+        Parameters
+        ----------
+            num : int
+                reminder number given by add
+
+        Return whether the reminder was pending.
+        '''
+
+        if self.reminders.pop(num, None) is None:
+            return False
+
+        del self._due[num]
+        if len(self._heap) > 2*len(self.reminders) + 16:
+            self._heap = [(due, num) for num, due in self._due.items()]
+            heapq.heapify(self._heap)
+        return True
+
+    def clear(self, *args, **kwargs):
+        '''Cancel every reminder.'''
+
+        self._heap.clear()
+        self.reminders.clear()
+        self._due.clear()
+        return
+
+    def due(self, num, *args, **kwargs):
+        '''Time a reminder fires next as a POSIX time in s.'''
+
+        return self._due[num]
+
+    def next(self, *args, **kwargs):
+        '''Time the earliest reminder fires as a POSIX time in s, or None if there is none.'''
+
+        self._clean()
+        return self._heap[0][0] if self._heap else None
+
+    def pop(self, now=None, *args, **kwargs):
+        '''
+        Remove the reminders due at a given time, recurring ones being added back with their next occurrence. Occurrences
+        missed while the machine was suspended are only given once.
+
+        Parameters
+        ----------
+            now : float
+                POSIX time in s. If None, the current time is used.
+
+        Return the list of due reminders, the earliest first.
+        '''
+
+        now      = time.time() if now is None else now
+        fired    = []
+
+        self._clean()
+        while self._heap and self._heap[0][0] <= now:
+            due, num = heapq.heappop(self._heap)
+            reminder = self.reminders[num]
+            fired.append(reminder)
+
+            nxt      = reminder.next(now) if reminder.recurring() else None
+            if nxt is None:
+                del self.reminders[num]
+                del self._due[num]
+            else:
+                self._push(num, nxt)
+            self._clean()
+        return fired
+
+    def reschedule(self, now=None, *args, **kwargs):
+        '''
+        Compute again the time every reminder fires next, e.g. after the wall clock or the time zone changed.
+
+        Parameters
+        ----------
+            now : float
+                POSIX time in s. If None, the current time is used.
+        '''
+
+        now            = time.time() if now is None else now
+        self._heap     = []
+        for num, reminder in list(self.reminders.items()):
+            due        = reminder.next(now)
+            if due is None:
+                del self.reminders[num]
+                del self._due[num]
+            else:
+                self._due[num] = due
+                self._heap.append((due, num))
+
+        heapq.heapify(self._heap)
+        return
+
+    def _push(self, num, due, *args, **kwargs):
+        '''Put a reminder in the heap.'''
+
+        self._due[num] = due
+        heapq.heappush(self._heap, (due, num))
+        return
+
+    def _clean(self, *args, **kwargs):
+        '''Drop cancelled reminders and outdated entries from the top of the heap.'''
+
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return
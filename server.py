@@ -0,0 +1,90 @@
+"""
+Mercier Wilfried - IRAP
+
+Local socket server receiving the commands sent by later TopWatch invocations (see control.py).
+"""
+
+import os
+import json
+from   PyQt5.QtCore    import QObject
+from   PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+class ControlServer(QObject):
+    '''
+    Server listening on the control socket. Each connection sends a single JSON command and receives a reply, which can
+    span several lines, the connection being closed once it is sent.
+    '''
+
+    def __init__(self, path, handler, parent=None, *args, **kwargs):
+        '''
+        Start listening.
+
+        Parameters
+        ----------
+            path : str
+                path of the control socket
+            handler : function
+                function taking a command dictionnary and returning the reply
+            parent : QObject
+                parent object
+        '''
+
+        super().__init__(parent)
+
+        self.path    = path
+        self.handler = handler
+
+        self.server  = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self._connection)
+
+        # The socket of a running instance is left untouched, whereas one left by an instance which did not quit properly is removed
+        sock         = QLocalSocket()
+        sock.connectToServer(path)
+        if sock.waitForConnected(100):
+            sock.abort()
+            print('Control socket %s is used by another instance.' %path)
+            return
+
+        QLocalServer.removeServer(path)
+        if not self.server.listen(path):
+            print('Control socket %s could not be opened: %s' %(path, self.server.errorString()))
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def close(self, *args, **kwargs):
+        '''Stop listening and remove the socket.'''
+
+        if self.server.isListening():
+            self.server.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        return
+
+    def _connection(self, *args, **kwargs):
+        '''Handle new connections.'''
+
+        while self.server.hasPendingConnections():
+            sock = self.server.nextPendingConnection()
+            sock.readyRead.connect(lambda sock=sock: self._read(sock))
+            sock.disconnected.connect(sock.deleteLater)
+        return
+
+    def _read(self, sock, *args, **kwargs):
+        '''Run the command once it has been fully received and send the reply.'''
+
+        if not sock.canReadLine():
+            return
+
+        # A command sent by another process must never take the clock down, whatever goes wrong while running it
+        try:
+            reply = self.handler(json.loads(bytes(sock.readLine()).decode()))
+        except Exception as e:
+            reply = 'error: %s' %e
+
+        sock.write(reply.encode() + b'\n')
+        sock.flush()
+        sock.disconnectFromServer()
+        return
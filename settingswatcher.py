@@ -0,0 +1,137 @@
+"""
+Mercier Wilfried - IRAP
+
+Watching of the setting file so that changes made while running are applied without restarting.
+"""
+
+import os
+import threading
+import os.path      as     opath
+from   PyQt5.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+
+# Own imports
+import setup
+
+class SettingsWatcher(QObject):
+    '''
+    Watch the setting file and emit the new settings when its content changes.
+
+    The directory is watched as well since files replaced atomically (as done by the autosave) get a new inode and are no
+    longer watched. Changes are coalesced, and the file is read, parsed and checked by a worker thread so that reloading
+    never stalls the interface. Contents written by the application itself are ignored.
+    '''
+
+    # Checked settings dictionnary (see setup.check)
+    changed = pyqtSignal(object)
+
+    # Result of the worker thread, delivered in the GUI thread
+    _result = pyqtSignal(object)
+
+    def __init__(self, fname, ignore=None, delay=200, parent=None, *args, **kwargs):
+        '''
+        Start watching.
+
+        Parameters
+        ----------
+            fname : str
+                name of the YAML setting file
+            ignore : function
+                function taking the content of the file and returning whether it must be ignored. If None, nothing is.
+            delay : int
+                time in ms without changes after which the file is read
+            parent : QObject
+                parent object
+        '''
+
+        super().__init__(parent)
+
+        self.fname   = opath.abspath(fname)
+        self.ignore  = ignore
+
+        # Identity of the latest file read, as (inode, size, modification time in ns)
+        self._stat   = self._identity()
+        self._thread = None
+        self._again  = False
+
+        self.timer   = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self._read)
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.addPath(opath.dirname(self.fname))
+        if opath.isfile(self.fname):
+            self.watcher.addPath(self.fname)
+        self.watcher.fileChanged.connect(self._changed)
+        self.watcher.directoryChanged.connect(self._changed)
+
+        self._result.connect(self._done)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def _identity(self, *args, **kwargs):
+        '''Inode, size and modification time of the file, or None if it does not exist.'''
+
+        try:
+            st = os.stat(self.fname)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _changed(self, *args, **kwargs):
+        '''Wait for the changes to settle before reading the file.'''
+
+        # A file replaced by another one is no longer watched
+        if self.fname not in self.watcher.files() and opath.isfile(self.fname):
+            self.watcher.addPath(self.fname)
+
+        self.timer.start()
+        return
+
+    def _read(self, *args, **kwargs):
+        '''Start reading the file in a worker thread if it changed.'''
+
+        if self._thread is not None:
+            self._again  = True
+            return
+
+        identity         = self._identity()
+        if identity is None or identity == self._stat:
+            return
+
+        self._stat       = identity
+        self._thread     = threading.Thread(target=self._run, name='TopWatch settings reload', daemon=True)
+        self._thread.start()
+        return
+
+    def _run(self, *args, **kwargs):
+        '''Worker thread reading, parsing and checking the file.'''
+
+        settings = None
+        try:
+            with open(self.fname, 'r') as f:
+                text = f.read()
+        except OSError as e:
+            print('Setting file %s could not be read: %s' %(self.fname, e))
+        else:
+            if self.ignore is None or not self.ignore(text):
+                settings = setup.parse(text, self.fname)
+
+        self._result.emit(settings)
+        return
+
+    def _done(self, settings, *args, **kwargs):
+        '''Emit the new settings and read the file again if it changed while it was read.'''
+
+        self._thread.join()
+        self._thread = None
+
+        if settings is not None:
+            self.changed.emit(settings)
+
+        if self._again:
+            self._again = False
+            self._read()
+        return
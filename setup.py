@@ -5,9 +5,118 @@ Setting up the program at startup.
 """
 
 import os
+import re
+import marshal
 import os.path      as     opath
-from   PyQt5.QtCore import QTime
-from   yaml         import load, dump, Loader, Dumper
+
+# Own imports
+import timing
+import chrono
+import control
+import reminder
+
+# PyYAML is imported when a file is read or written so that importing this module is cheap, and Qt is not imported at all
+# so that the terminal backend can use it (see terminal.py)
+
+# Version of the cache of checked settings, to increase when check or the content of the settings change
+CACHEVERSION = 1
+
+# Default configuration
+DEFAULT = {'font'          : 'fixed,30,-1,5,75,0,0,0,0,0',
+           'color'         : '#ffdd1c',
+           'x'             : 0,
+           'y'             : 0,
+           'opacity'       : 1,
+           'blinkPeriod'   : '00:00:01',
+           'blinkFreq'     : 100,
+           'blinkNb'       : 3,
+           'blinkFade'     : 0,
+           'snap'          : False,
+           'format'        : 'hh:mm',
+           'precise'       : False,
+           'clocks'        : [],
+           'mode'          : 'clock',
+           'timerDuration' : '00:05:00',
+           'timerFormat'   : 'hh:mm:ss',
+           'backend'       : 'widgets',
+           'reminders'     : []
+          }
+
+# Keys which must be in a setting file, other ones being given their default value if missing
+REQUIRED  = ['font', 'color', 'x', 'y', 'opacity', 'blinkPeriod', 'blinkFreq', 'blinkNb']
+
+# Keys of an additional clock (see 'clocks' key). Missing ones are taken from the main clock, except the time zone.
+CLOCKKEYS = ['timezone', 'format', 'font', 'color', 'x', 'y', 'opacity']
+
+def _yaml(*args, **kwargs):
+   '''Fastest safe YAML loader and dumper available, the C ones needing PyYAML to be built with libyaml.'''
+
+   try:
+      from yaml import CSafeLoader as Loader, CSafeDumper as Dumper
+   except ImportError:
+      from yaml import SafeLoader  as Loader, SafeDumper  as Dumper
+   return Loader, Dumper
+
+def fileKey(fname, *args, **kwargs):
+   '''Modification time, size and inode of a file, which change whenever it is written or replaced.'''
+
+   st = os.stat(fname)
+   return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def cachePath(fname, *args, **kwargs):
+   '''Path of the cache of the checked settings of a setting file.'''
+
+   path, name = opath.split(fname)
+   return opath.join(path, '.%s.cache' %name)
+
+def readCache(fname, key, *args, **kwargs):
+   '''
+   Read the checked settings of a setting file from its cache.
+
+   Parameters
+   ----------
+      fname : str
+         name of the setting file
+      key : tuple
+         identity of the setting file (see fileKey)
+
+   Return the checked settings dictionnary, or None if there is no cache or it does not match the file.
+   '''
+
+   try:
+      with open(cachePath(fname), 'rb') as f:
+         version, cached, settings = marshal.load(f)
+   except (OSError, EOFError, ValueError, TypeError):
+      return None
+
+   if version != CACHEVERSION or cached != key:
+      return None
+
+   return settings
+
+def writeCache(fname, key, settings, *args, **kwargs):
+   '''
+   Write the checked settings of a setting file into its cache. Failing to do so is not an error.
+
+   Parameters
+   ----------
+      fname : str
+         name of the setting file
+      key : tuple
+         identity of the setting file when it was read (see fileKey)
+      settings : dict
+         checked settings dictionnary (see check)
+   '''
+
+   outname = cachePath(fname)
+   tmp     = '%s.tmp' %outname
+   try:
+      with open(tmp, 'wb') as f:
+         marshal.dump((CACHEVERSION, key, settings), f)
+      os.replace(tmp, outname)
+   except (OSError, ValueError):
+      pass
+   return
 
 def default(outname, *args, **kwargs):
    '''
@@ -19,40 +128,64 @@ def default(outname, *args, **kwargs):
          name of the output YAML file
    '''
 
-   configuration = {'font'        : 'fixed,30,-1,5,75,0,0,0,0,0',
-                    'color'       : '#ffdd1c',
-                    'x'           : 0,
-                    'y'           : 0,
-                    'opacity'     : 1,
-                    'blinkPeriod' : '00:00:01',
-                    'blinkFreq'   : 100,
-                    'blinkNb'     : 3
-                   }
-
-   writeConfiguration(outname, configuration)
+   writeConfiguration(outname, dict(DEFAULT))
    return
 
 def writeConfiguration(outname, configuration, *args, **kwargs):
    '''
    Utility function to write the YAML configuration file with the given parameters.
 
+   The file is written atomically: the configuration is written and synced into a temporary file which then replaces the
+   previous one, so that a crash never leaves a truncated file behind. The cache of the checked settings is updated so
+   that the next start does not need to parse the file.
+
    Parameters
    ----------
       configuration : dict
          dictionnary to be converted into a YAML file
       outname : str
          name of the output YAML file
+
+   Return the content written in the file.
    '''
 
-   output = dump(configuration, Dumper=Dumper)
-   with open(outname, 'w') as f:
-      f.write(output)
-   return
+   from yaml import dump
+
+   output = dump(configuration, Dumper=_yaml()[1])
+   tmp    = '%s.tmp' %outname
+
+   try:
+      with open(tmp, 'w') as f:
+         f.write(output)
+         f.flush()
+         os.fsync(f.fileno())
+      os.replace(tmp, outname)
+   except BaseException:
+      if opath.isfile(tmp):
+         os.remove(tmp)
+      raise
+
+   # Make the rename itself durable (not supported on every platform)
+   try:
+      fd  = os.open(opath.dirname(opath.abspath(outname)), os.O_RDONLY)
+      try:
+         os.fsync(fd)
+      finally:
+         os.close(fd)
+   except OSError:
+      pass
+
+   writeCache(outname, fileKey(outname), check(dict(configuration)))
+   return output
 
 def init(scriptDir, *args, **kwargs):
    '''
    Initialise code parameters at startup.
 
+   Settings are taken from the cache if the setting file did not change since it was last read or written, so that neither
+   YAML parsing nor validation is needed. Otherwise, the file is parsed, checked and the cache is updated. A file which
+   cannot be parsed or misses required keys is kept as ~settings.yaml and replaced by a default one.
+
    Parameters
    ---------
       sriptDir : str
@@ -67,74 +200,253 @@ def init(scriptDir, *args, **kwargs):
    if not opath.isfile(file):
       default(file)
 
+   # The identity is taken before reading so that a change made meanwhile is noticed at the next start
+   key            = fileKey(file)
+   settings       = readCache(file, key)
+   if settings is not None:
+      return settings, 0
+
+   from yaml import load, YAMLError
+
    # Load configuration option from setting file
    with open(file, 'r') as f:
-      settings    = load(f, Loader=Loader)
-
-   # If a key is missing, the setting file is saved and a new one is created with default value
-   errCode        = 0
-   for i in ['font', 'color', 'x', 'y', 'opacity', 'blinkPeriod', 'blinkFreq', 'blinkNb']:
-      if i not in settings.keys():
-         print('Error in setting file %s. The key %s was missing. Generating a new default configuration file instead.' %(file, i))
-
-         # Save copy
-         path, newname = opath.split(file)
-         newname       = opath.join(path, r'~%s' %newname)
-         os.rename(file, newname)
-
-         # Generate and load new default settings
-         default(file)
-         settings = load(file, Loader=Loader)
-         errCode  = -1
-
-   ################################################
-   #               Check parameters               #
-   ################################################
-
-   # X coordinate
-   if not isinstance(settings['x'], int) or settings['x'] < 0:
-      print('Given x coordinate is < 0 or is not an int. Using 0 as default value instead.')
-      settings['x'] = 0
-   else:
-      settings['x'] = int(settings['x'])
-
-   # Y coordinate
-   if not isinstance(settings['y'], int) or settings['y'] < 0:
-      print('Given y coordinate is < 0 or is not an int. Using 0 as default value instead.')
-      settings['y'] = 0
-   else:
-      settings['y'] = int(settings['y'])
-
-   # Opacity
-   if not isinstance(settings['opacity'], (int, float)) or settings['opacity'] < 0 or settings['opacity'] > 1:
-      print('Given opacity is not in the range [0, 1] or is not an int/float. Using 1 as default value instead.')
-      settings['opacity']      = 1
-
-   # Period is changed from a string to a PyQt Qtime object
-   period = QTime().fromString(settings['blinkPeriod'])
-   if period.isNull():
-      print('Given blinking period could not be broadcasted to a valid PyQt QTime object. Using 1s as default value instead.')
-      settings['blinkPeriod']  = Qtime(0, 0, 1)
-   else:
-      settings['blinkPeriod']  = period
-
-   # Blinking frequency
-   if not isinstance(settings['blinkFreq'], (int, float)):
-      print('Given bliking frequency is not an int/float. Using 100ms as default value instead.')
-      settings['blinkFreq']    = 100
-   else:
-      if settings['blinkFreq'] < 50:
-         print('Given blinking frequency is below minimum value. Clipping to 50ms as default value instead.')
-         settings['blinkFreq'] = 50
-      elif settings['blinkFreq'] > 10000:
-         print('Given bliking frequency is above maximum value. Clipping to 10s as default value instead.')
-         settings['blinkFreq'] = 10000
-      else:
-         settings['blinkFreq'] = int(settings['blinkFreq'])
-
-   # Blinking number
-   if not isinstance(settings['blinkNb'], int) or settings['blinkNb'] <= 0:
-      print('Given blinking number is <= 0 or is not an int. Using 3 as default value instead.')
-      settings['blinkNb']      = 3
-
-   return settings, errCode
+      text        = f.read()
+
+   try:
+      settings    = load(text, Loader=_yaml()[0])
+   except YAMLError as e:
+      print('Error in setting file %s. It could not be parsed: %s' %(file, e))
+      settings    = None
+
+   missing        = REQUIRED if not isinstance(settings, dict) else [i for i in REQUIRED if i not in settings]
+   if settings is None or missing:
+      if settings is not None:
+         print('Error in setting file %s. The keys %s were missing.' %(file, ', '.join(missing)))
+
+      # Save copy, then generate and use new default settings without parsing them again
+      path, newname = opath.split(file)
+      os.replace(file, opath.join(path, r'~%s' %newname))
+      print('Generating a new default configuration file instead.')
+
+      default(file)
+      return check(dict(DEFAULT)), -1
+
+   settings       = check(settings)
+   writeCache(file, key, settings)
+   return settings, 0
+
+def parse(text, file='settings.yaml', *args, **kwargs):
+   '''
+   Parse and check the content of a setting file without modifying the file, e.g. when it is changed while running.
+
+   Parameters
+   ----------
+      text : str
+         content of the YAML setting file
+      file : str
+         name of the setting file, only used in messages
+
+   Return the settings dictionnary, or None if the content cannot be parsed or misses required keys.
+   '''
+
+   from yaml import load, YAMLError
+
+   try:
+      settings = load(text, Loader=_yaml()[0])
+   except YAMLError as e:
+      print('Setting file %s could not be parsed: %s' %(file, e))
+      return None
+
+   if not isinstance(settings, dict) or any(key not in settings for key in REQUIRED):
+      print('Setting file %s misses some of the keys %s. It is ignored.' %(file, ', '.join(REQUIRED)))
+      return None
+
+   return check(settings)
+
+def check(settings, *args, **kwargs):
+   '''
+   Give missing optional keys their default value and check the parameters, invalid ones being replaced by default values.
+
+   Checking is done once, on settings as written in a setting file: the blinking period and the timer duration are
+   changed from strings into ints in ms, which are not valid as input, so checking checked settings again replaces them
+   by their default value. Ints are not accepted since YAML reads an unquoted h:mm:ss with h > 0 as a number in base 60.
+   Settings are modified in place, so a copy must be given if the original ones are still needed.
+
+   Parameters
+   ----------
+      settings : dict
+         settings read from a setting file, with at least the keys in REQUIRED
+
+   Return the checked settings dictionnary.
+   '''
+
+   # Keys added in later versions are given their default value so that older setting files remain valid
+   for key, (validate, message) in SCHEMA.items():
+      value             = settings.get(key, DEFAULT[key])
+      try:
+         settings[key]  = validate(value, settings)
+      except (TypeError, ValueError):
+         print(message)
+         settings[key]  = validate(DEFAULT[key], settings)
+
+   return settings
+
+##################################################
+#               Parameter checkers               #
+##################################################
+
+def _coordinate(value, settings, *args, **kwargs):
+   '''Position on screen, as a positive int.'''
+
+   if not isinstance(value, int) or value < 0:
+      raise ValueError(value)
+   return int(value)
+
+def _opacity(value, settings, *args, **kwargs):
+   '''Opacity, as an int or a float in [0, 1].'''
+
+   if not isinstance(value, (int, float)) or value < 0 or value > 1:
+      raise ValueError(value)
+   return value
+
+def _period(value, settings, *args, **kwargs):
+   '''Blinking period, changed from a string hh:mm[:ss[.zzz]] to a time in ms.'''
+
+   match      = re.fullmatch(r'(\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,3}))?)?\s*', value)
+   if match is None:
+      raise ValueError(value)
+
+   h, m, s, z = match.groups()
+   if int(h) > 23 or int(m) > 59 or int(s or 0) > 59:
+      raise ValueError(value)
+   return ((int(h)*60 + int(m))*60 + int(s or 0))*1000 + int((z or '0').ljust(3, '0'))
+
+def _blinkFreq(value, settings, *args, **kwargs):
+   '''Duration of a blink in ms, clipped to [50, 10000].'''
+
+   if not isinstance(value, (int, float)):
+      raise TypeError(value)
+
+   if value < 50:
+      print('Given blinking frequency is below minimum value. Clipping to 50ms as default value instead.')
+      return 50
+
+   if value > 10000:
+      print('Given bliking frequency is above maximum value. Clipping to 10s as default value instead.')
+      return 10000
+
+   return int(value)
+
+def _blinkNb(value, settings, *args, **kwargs):
+   '''Number of blinks, as a positive int.'''
+
+   if not isinstance(value, int) or value <= 0:
+      raise ValueError(value)
+   return value
+
+def _fade(value, settings, *args, **kwargs):
+   '''Fading duration in ms, as a positive int or 0.'''
+
+   if not isinstance(value, (int, float)) or value < 0:
+      raise ValueError(value)
+   return int(value)
+
+def _bool(value, settings, *args, **kwargs):
+   '''Boolean option.'''
+
+   if not isinstance(value, bool):
+      raise TypeError(value)
+   return value
+
+def _format(value, settings, *args, **kwargs):
+   '''Time or timer format, which must depend on time.'''
+
+   if not isinstance(value, str) or timing.granularity(value) is None:
+      raise ValueError(value)
+   return value
+
+def _mode(value, settings, *args, **kwargs):
+   '''Clock or timer mode.'''
+
+   if value not in chrono.MODES:
+      raise ValueError(value)
+   return value
+
+def _duration(value, settings, *args, **kwargs):
+   '''Timer duration, changed from a string to a duration in ms.'''
+
+   duration = chrono.parseDuration(value)
+   if duration is None or duration <= 0:
+      raise ValueError(value)
+   return duration
+
+def _backend(value, settings, *args, **kwargs):
+   '''Rendering backend.'''
+
+   if value not in control.BACKENDS:
+      raise ValueError(value)
+   return value
+
+def _clocks(value, settings, *args, **kwargs):
+   '''Additional clocks, invalid ones being dropped and missing keys being taken from the main clock.'''
+
+   if not isinstance(value, list):
+      raise TypeError(value)
+
+   clocks = []
+   for clock in value:
+      if not isinstance(clock, dict) or not isinstance(clock.get('timezone'), str):
+         print('Additional clock %s has no time zone. It will not be shown.' %clock)
+         continue
+
+      clock = {key : clock.get(key, settings.get(key)) for key in CLOCKKEYS}
+      if clock['format'] is None:
+         clock['format']  = 'hh:mm'
+
+      if not isinstance(clock['opacity'], (int, float)) or clock['opacity'] < 0 or clock['opacity'] > 1:
+         print('Given opacity of clock %s is not in the range [0, 1] or is not an int/float. Using 1 as default value instead.' %clock['timezone'])
+         clock['opacity'] = 1
+
+      for key in ['x', 'y']:
+         if not isinstance(clock[key], int) or clock[key] < 0:
+            print('Given %s coordinate of clock %s is < 0 or is not an int. Using 0 as default value instead.' %(key, clock['timezone']))
+            clock[key]    = 0
+
+      clocks.append(clock)
+   return clocks
+
+def _reminders(value, settings, *args, **kwargs):
+   '''Reminders, invalid ones being dropped and missing blinking parameters being taken from the main clock.'''
+
+   if not isinstance(value, list):
+      raise TypeError(value)
+
+   reminders = []
+   for spec in value:
+      try:
+         reminders.append(reminder.parse(spec, nb=settings['blinkNb'], duration=settings['blinkFreq'],
+                                         fade=settings['blinkFade']).configuration())
+      except ValueError as e:
+         print('Reminder %s is ignored: %s' %(spec, e))
+   return reminders
+
+# Checked keys, in the order they are checked, with their checker and the message printed when the value is invalid.
+# Checkers raise a TypeError or a ValueError for invalid values, the default value being used instead. Keys depending on
+# other ones (clocks and reminders) come last. The font and the color are used as they are.
+SCHEMA = {'x'             : (_coordinate, 'Given x coordinate is < 0 or is not an int. Using 0 as default value instead.'),
+          'y'             : (_coordinate, 'Given y coordinate is < 0 or is not an int. Using 0 as default value instead.'),
+          'opacity'       : (_opacity,    'Given opacity is not in the range [0, 1] or is not an int/float. Using 1 as default value instead.'),
+          'blinkPeriod'   : (_period,     'Given blinking period is not a time in format hh:mm:ss. Using 1s as default value instead.'),
+          'blinkFreq'     : (_blinkFreq,  'Given bliking frequency is not an int/float. Using 100ms as default value instead.'),
+          'blinkNb'       : (_blinkNb,    'Given blinking number is <= 0 or is not an int. Using 3 as default value instead.'),
+          'blinkFade'     : (_fade,       'Given blinking fade duration is < 0 or is not an int/float. Using 0ms (no fading) as default value instead.'),
+          'snap'          : (_bool,       'Given snapping option is not a bool. Using False as default value instead.'),
+          'format'        : (_format,     'Given time format is not a string or does not depend on time. Using hh:mm as default value instead.'),
+          'precise'       : (_bool,       'Given precise mode is not a bool. Using False as default value instead.'),
+          'mode'          : (_mode,       'Given mode is not one of %s. Using clock as default value instead.' %', '.join(chrono.MODES)),
+          'timerDuration' : (_duration,   'Given timer duration is not a positive duration in format hh:mm:ss. Using 5min as default value instead.'),
+          'timerFormat'   : (_format,     'Given timer format is not a string or does not depend on time. Using hh:mm:ss as default value instead.'),
+          'backend'       : (_backend,    'Given backend is not one of %s. Using widgets as default value instead.' %', '.join(control.BACKENDS)),
+          'clocks'        : (_clocks,     'Given additional clocks are not a list. No additional clock will be shown.'),
+          'reminders'     : (_reminders,  'Given reminders are not a list. No reminder will fire.')
+         }
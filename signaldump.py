@@ -0,0 +1,52 @@
+"""
+Mercier Wilfried - IRAP
+
+Signal handling for the instrumentation (see stats.py), usable without QtWidgets.
+"""
+
+import signal
+import socket
+from   PyQt5.QtCore import QSocketNotifier
+
+class SignalDump(QSocketNotifier):
+    '''
+    Call a function when SIGUSR1 is received.
+
+    Python signal handlers only run when the interpreter gets control back, so the signal is written by Python into a
+    socket watched by the Qt event loop.
+    '''
+
+    def __init__(self, callback, parent=None, *args, **kwargs):
+        '''
+        Install the signal handler.
+
+        Parameters
+        ----------
+            callback : function
+                function called when SIGUSR1 is received
+            parent : QObject
+                parent object
+        '''
+
+        self._read, self._write = socket.socketpair()
+        self._read.setblocking(False)
+        self._write.setblocking(False)
+
+        super().__init__(self._read.fileno(), QSocketNotifier.Read, parent)
+        self.callback = callback
+        self.activated.connect(self._activated)
+
+        signal.signal(signal.SIGUSR1, lambda *args: None)
+        signal.set_wakeup_fd(self._write.fileno())
+
+    def _activated(self, *args, **kwargs):
+        '''Call the function if SIGUSR1 was received.'''
+
+        try:
+            data = self._read.recv(64)
+        except OSError:
+            return
+
+        if signal.SIGUSR1 in data:
+            self.callback()
+        return
@@ -0,0 +1,168 @@
+"""
+Mercier Wilfried - IRAP
+
+Opt-in instrumentation recording timer lateness, repaints and blinking drift.
+
+Instrumentation is enabled by setting the environment variable TOPWATCH_STATS to 1 (or to 'overlay' to also show the
+statistics on screen). When it is disabled, RECORDER is None and instrumented code only pays for this check.
+"""
+
+import os
+import json
+import time
+import tempfile
+from   bisect      import bisect_right
+from   collections import deque
+
+# Upper edges (in ms) of the histogram bins, the last bin collecting everything above
+EDGES    = [0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+# Number of values kept in each ring buffer
+SIZE     = 256
+
+# Global recorder, None when instrumentation is disabled
+RECORDER = None
+
+class Series:
+    '''
+    Values (in ms) of a given measurement, the latest ones being kept in a ring buffer and all of them in a histogram.
+    '''
+
+    def __init__(self, size=SIZE, *args, **kwargs):
+        '''
+        Initialize the series.
+
+        Parameters
+        ----------
+            size : int
+                number of values kept in the ring buffer
+        '''
+
+        self.ring   = deque(maxlen=size)
+        self.counts = [0]*(len(EDGES) + 1)
+        self.nb     = 0
+        self.total  = 0
+        self.max    = None
+
+    def add(self, value, *args, **kwargs):
+        '''
+        Add a value.
+
+        Parameters
+        ----------
+            value : float
+                value in ms
+        '''
+
+        self.ring.append(value)
+        self.counts[bisect_right(EDGES, value)] += 1
+        self.nb    += 1
+        self.total += value
+        if self.max is None or value > self.max:
+            self.max = value
+        return
+
+    def summary(self, *args, **kwargs):
+        '''Dictionnary with the number of values, their mean, maximum and median, and the histogram.'''
+
+        ring = sorted(self.ring)
+        return {'nb'        : self.nb,
+                'mean_ms'   : self.total/self.nb if self.nb else None,
+                'max_ms'    : self.max,
+                'median_ms' : ring[len(ring)//2] if ring else None,
+                'last_ms'   : list(self.ring),
+                'histogram' : {'edges_ms' : EDGES, 'counts' : self.counts}
+               }
+
+class Recorder:
+    '''Collection of named series and counters.'''
+
+    def __init__(self, *args, **kwargs):
+        '''Initialize the recorder.'''
+
+        self.t0       = time.monotonic()
+        self.series   = {}
+        self.counters = {}
+
+    def add(self, name, value, *args, **kwargs):
+        '''
+        Add a value to a series, creating it if needed.
+
+        Parameters
+        ----------
+            name : str
+                name of the series
+            value : float
+                value in ms
+        '''
+
+        if name not in self.series:
+            self.series[name] = Series()
+
+        self.series[name].add(value)
+        return
+
+    def count(self, name, *args, **kwargs):
+        '''
+        Increment a counter, creating it if needed.
+
+        Parameters
+        ----------
+            name : str
+                name of the counter
+        '''
+
+        self.counters[name] = self.counters.get(name, 0) + 1
+        return
+
+    def dump(self, *args, **kwargs):
+        '''Dictionnary with every series and counter.'''
+
+        return {'uptime_s' : time.monotonic() - self.t0,
+                'counters' : dict(self.counters),
+                'series'   : {name : series.summary() for name, series in self.series.items()}
+               }
+
+    def save(self, fname=None, *args, **kwargs):
+        '''
+        Write the dump into a JSON file.
+
+        Parameters
+        ----------
+            fname : str
+                name of the file. If None, a file named after the process id is written in the temporary directory.
+
+        Return the name of the file.
+        '''
+
+        if fname is None:
+            fname = os.path.join(tempfile.gettempdir(), 'topwatch-stats-%d.json' %os.getpid())
+
+        with open(fname, 'w') as f:
+            json.dump(self.dump(), f, indent=2)
+        return fname
+
+    def text(self, *args, **kwargs):
+        '''Short text summary, one line per series and counter.'''
+
+        lines = ['%s: %d' %(name, nb) for name, nb in sorted(self.counters.items())]
+        for name, series in sorted(self.series.items()):
+            if series.nb:
+                lines.append('%s: mean %.2f ms, max %.2f ms (%d)' %(name, series.total/series.nb, series.max, series.nb))
+        return '\n'.join(lines)
+
+def enable(*args, **kwargs):
+    '''Enable instrumentation.'''
+
+    global RECORDER
+    if RECORDER is None:
+        RECORDER = Recorder()
+    return RECORDER
+
+def mode(*args, **kwargs):
+    '''Instrumentation mode asked through the TOPWATCH_STATS environment variable: None, 'on' or 'overlay'.'''
+
+    value = os.environ.get('TOPWATCH_STATS', '').strip().lower()
+    if value in ['', '0', 'no', 'off', 'false']:
+        return None
+    return 'overlay' if value == 'overlay' else 'on'
@@ -0,0 +1,37 @@
+"""
+Mercier Wilfried - IRAP
+
+On-screen overlay for the instrumentation (see stats.py).
+"""
+
+from   PyQt5.QtWidgets import QLabel
+from   PyQt5.QtCore    import Qt, QTimer
+
+# Own imports
+import stats
+
+class StatsOverlay(QLabel):
+    '''Small window showing a summary of the instrumentation, updated every second.'''
+
+    def __init__(self, *args, **kwargs):
+        '''Initialize the overlay.'''
+
+        super().__init__()
+        self.setWindowTitle('TopWatch - Statistics')
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint | Qt.Dialog)
+        self.setStyleSheet('QLabel { color: #00ff00; background-color: rgba(0, 0, 0, 160); font-family: monospace; padding: 4px }')
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+
+        self.refresh()
+        self.show()
+
+    def refresh(self, *args, **kwargs):
+        '''Update the summary.'''
+
+        if stats.RECORDER is not None:
+            self.setText(stats.RECORDER.text() or 'No data yet')
+            self.adjustSize()
+        return
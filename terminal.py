@@ -0,0 +1,617 @@
+"""
+Mercier Wilfried - IRAP
+
+Terminal backend drawing the clock with large block digits, e.g. in a tmux pane or on a machine without display server.
+
+The clock follows the setting file (format, mode, color, opacity, blinking parameters and reminders) and is only drawn
+when the displayed text, the blinking level or the size of the terminal changes. Each new screen is compared cell by cell
+with the previous one and only the cells which changed are written, so that a clock showing seconds mostly rewrites a
+single digit. The text, the blinking levels, the timers and the reminders are computed by the same modules as the Qt
+backends (see timing.py, blink.py, chrono.py and reminder.py).
+
+Keys: space starts or pauses the timer, r resets it, b starts or stops blinking and q quits.
+
+This module does not depend on Qt so that it can be used without display server, or without PyQt5 installed.
+"""
+
+import os
+import sys
+import time
+import signal
+import selectors
+import os.path  as     opath
+
+# Own imports
+import setup
+import stats
+import timing
+import chrono
+import reminder
+from   blink    import BlinkSchedule, Blinking
+
+# Glyphs drawn with full blocks, each block being two cells wide so that it is roughly square. Lowercase letters are drawn
+# with the uppercase glyphs.
+FONT   = {'0' : ['███', '█ █', '█ █', '█ █', '███'],
+          '1' : [' █ ', '██ ', ' █ ', ' █ ', '███'],
+          '2' : ['███', '  █', '███', '█  ', '███'],
+          '3' : ['███', '  █', '███', '  █', '███'],
+          '4' : ['█ █', '█ █', '███', '  █', '  █'],
+          '5' : ['███', '█  ', '███', '  █', '███'],
+          '6' : ['███', '█  ', '███', '█ █', '███'],
+          '7' : ['███', '  █', '  █', '  █', '  █'],
+          '8' : ['███', '█ █', '███', '█ █', '███'],
+          '9' : ['███', '█ █', '███', '  █', '███'],
+          ':' : [' ',   '█',   ' ',   '█',   ' '],
+          '.' : [' ',   ' ',   ' ',   ' ',   '█'],
+          ',' : [' ',   ' ',   ' ',   '█',   '█'],
+          '-' : ['   ', '   ', '███', '   ', '   '],
+          '/' : ['  █', '  █', ' █ ', '█  ', '█  '],
+          ' ' : [' ',   ' ',   ' ',   ' ',   ' '],
+          'A' : ['███', '█ █', '███', '█ █', '█ █'],
+          'P' : ['███', '█ █', '███', '█  ', '█  '],
+          'M' : ['█   █', '██ ██', '█ █ █', '█   █', '█   █']
+         }
+
+# Height of the glyphs in blocks
+HEIGHT = 5
+
+# Number of unchanged cells in a row below which they are written again rather than skipped with a cursor move
+GAP    = 6
+
+# SGR codes of the basic color names, other names using the default color of the terminal
+COLORS = {'black' : 30, 'red' : 31, 'green' : 32, 'yellow' : 33, 'blue' : 34, 'magenta' : 35, 'cyan' : 36, 'white' : 37,
+          'gray'  : 90, 'grey' : 90}
+
+# Escape sequences entering and leaving the alternate screen with a hidden cursor
+ENTER  = '\x1b[?1049h\x1b[?25l'
+LEAVE  = '\x1b[0m\x1b[?25h\x1b[?1049l'
+
+def colorCode(color, dim=False, *args, **kwargs):
+    '''
+    Escape sequence selecting a color.
+
+    Parameters
+    ----------
+        color : str
+            color name or code (#rgb, #rrggbb or #aarrggbb)
+        dim : bool
+            whether to use the faint intensity
+    '''
+
+    color     = str(color).strip().lower()
+    code      = '\x1b[0;2m' if dim else '\x1b[0m'
+    if color in COLORS:
+        return code + '\x1b[%dm' %COLORS[color]
+
+    digits    = color[1:]
+    if not color.startswith('#') or len(digits) not in (3, 6, 8):
+        return code
+
+    if len(digits) == 3:
+        digits = ''.join(2*c for c in digits)
+
+    try:
+        r, g, b = (int(digits[-6:][i:i+2], 16) for i in range(0, 6, 2))
+    except ValueError:
+        return code
+    return code + '\x1b[38;2;%d;%d;%dm' %(r, g, b)
+
+def render(text, columns, rows, *args, **kwargs):
+    '''
+    Screen showing a text centered with the largest block glyphs fitting in the terminal.
+
+    The text is written as it is if it has characters without glyph or if the glyphs do not fit.
+
+    Parameters
+    ----------
+        text : str
+            text to show
+        columns : int
+            width of the terminal in cells
+        rows : int
+            height of the terminal in cells
+
+    Return the rows of the screen as strings of the width of the terminal.
+    '''
+
+    glyphs    = [FONT.get(c.upper()) for c in text]
+    scale     = 0
+    if text and None not in glyphs:
+        width = sum(len(glyph[0]) for glyph in glyphs) + len(glyphs) - 1
+        scale = min(columns//(2*width), rows//HEIGHT)
+
+    if scale > 0:
+        lines = []
+        for row in range(HEIGHT):
+            line   = ''.join(c*2*scale for c in ' '.join(glyph[row] for glyph in glyphs))
+            lines += [line]*scale
+    else:
+        lines = [text[:columns]] if text else []
+
+    blank     = ' '*columns
+    screen    = [blank]*rows
+    if lines:
+        top   = max(0, (rows - len(lines))//2)
+        left  = ' '*((columns - len(lines[0]))//2)
+        for pos, line in enumerate(lines[:rows]):
+            screen[top + pos] = (left + line).ljust(columns)
+    return screen
+
+def diff(old, new, *args, **kwargs):
+    '''
+    Escape sequences rewriting the cells of a screen which differ from the previous one.
+
+    Changed cells are written in runs starting with a cursor move, runs separated by less than GAP unchanged cells being
+    merged.
+
+    Parameters
+    ----------
+        old : list of str
+            rows shown in the terminal
+        new : list of str
+            rows to show, with the same dimensions
+    '''
+
+    out             = []
+    for y, (a, b) in enumerate(zip(old, new)):
+        if a == b:
+            continue
+
+        x           = 0
+        while x < len(b):
+            if a[x] == b[x]:
+                x  += 1
+                continue
+
+            start   = x
+            end     = x + 1
+            while x < len(b) and x - end < GAP:
+                if a[x] != b[x]:
+                    end = x + 1
+                x  += 1
+
+            out.append('\x1b[%d;%dH%s' %(y + 1, start + 1, b[start:end]))
+            x       = end
+    return ''.join(out)
+
+class TerminalClock:
+    '''
+    Clock drawn in a terminal.
+
+    It wakes up at the next change of the displayed text or of the blinking level, or when a reminder fires, whichever
+    comes first, and sleeps through the hidden blinking phases. The setting file belongs to the visible clock, so it is
+    only read, changes being applied at the next wakeup.
+    '''
+
+    def __init__(self, configuration=None, out=None, *args, **kwargs):
+        '''
+        Initialize the clock.
+
+        Parameters
+        ----------
+            configuration : dict
+                checked settings (see setup.check). If None, they are read from the setting file.
+            out : file
+                terminal the clock is drawn in. If None, the standard output is used.
+        '''
+
+        self.scriptDir     = opath.dirname(opath.realpath(__file__))
+        self.settings      = opath.join(self.scriptDir, 'settings.yaml')
+
+        if configuration is None:
+            configuration, ok = setup.init(self.scriptDir)
+
+        try:
+            self.settingsKey = setup.fileKey(self.settings)
+        except OSError:
+            self.settingsKey = None
+
+        self.out           = out or sys.stdout
+        self.running       = False
+
+        # Rows currently shown, empty when everything must be drawn again
+        self.screen        = []
+
+        # Blinking sequence, and single blinking cycle of the reminder being shown which takes over until it is over
+        self.blinking      = None
+        self.flash         = None
+        self.chrono        = None
+        self.queue         = reminder.ReminderQueue()
+
+        self.configuration = {}
+        self.mode          = None
+        self.applyConfiguration(configuration)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def applyConfiguration(self, configuration, *args, **kwargs):
+        '''
+        Apply a configuration, only changing what differs from the current one.
+
+        Parameters
+        ----------
+            configuration : dict
+                checked settings (see setup.check)
+        '''
+
+        changed            = {key for key, value in configuration.items() if self.configuration.get(key) != value}
+        self.configuration = configuration
+
+        if changed & {'color', 'opacity'}:
+            self.color     = configuration['color']
+            self.opacity   = configuration['opacity']
+            self.screen    = []
+
+        self.timeFormat    = configuration['format']
+        self.blinkPeriod   = configuration['blinkPeriod']
+        self.blinkFreq     = configuration['blinkFreq']
+        self.blinkNb       = configuration['blinkNb']
+        self.blinkFade     = configuration['blinkFade']
+
+        if changed & {'blinkPeriod', 'blinkFreq', 'blinkNb', 'blinkFade'} and self.blinking is not None:
+            self.startBlink(self.blinkFreq, self.blinkPeriod, self.blinkNb, fade=self.blinkFade)
+
+        if changed & {'mode', 'timerDuration', 'timerFormat'}:
+            self.timerDuration = configuration['timerDuration']
+            self.timerFormat   = configuration['timerFormat']
+            self.setMode(configuration['mode'])
+
+        if 'reminders' in changed:
+            self.queue.clear()
+            for spec in configuration['reminders']:
+                self.queue.add(reminder.parse(spec))
+        return
+
+    def readSettings(self, *args, **kwargs):
+        '''Apply the setting file if it changed since it was last read.'''
+
+        try:
+            key      = setup.fileKey(self.settings)
+        except OSError:
+            return
+
+        if key == self.settingsKey:
+            return
+
+        self.settingsKey = key
+        with open(self.settings, 'r') as f:
+            settings = setup.parse(f.read(), file=self.settings)
+
+        # Messages about invalid settings may have been written over the clock
+        self.screen  = []
+        if settings is not None:
+            self.applyConfiguration(settings)
+        return
+
+    def setMode(self, mode, duration=None, *args, **kwargs):
+        '''
+        Show the time, or a countdown, stopwatch or interval timer. Timers start paused at zero.
+
+        Parameters
+        ----------
+            mode : str
+                one of chrono.MODES
+            duration : int
+                duration of the countdown or of an interval in ms. If None, the current one is used.
+        '''
+
+        if duration is not None:
+            self.timerDuration = duration
+
+        self.mode   = mode
+        self.chrono = None if mode == 'clock' else chrono.Chrono(mode, self.timerDuration)
+        return
+
+    def toggleTimer(self, *args, **kwargs):
+        '''Start or pause the countdown, stopwatch or interval timer.'''
+
+        if self.chrono is None:
+            return
+
+        if self.chrono.running:
+            self.chrono.pause()
+        else:
+            # A finished countdown starts again
+            if self.chrono.finished():
+                self.chrono.reset()
+            self.chrono.start()
+        return
+
+    def resetTimer(self, *args, **kwargs):
+        '''Reset the countdown, stopwatch or interval timer.'''
+
+        if self.chrono is not None:
+            self.chrono.reset()
+        return
+
+    def startBlink(self, duration, period, nb, fade=0, *args, **kwargs):
+        '''
+        Start blinking.
+
+        Parameters
+        ----------
+            duration : int
+                duration of a single blink in ms
+            period : int
+                time between two blink phases in ms
+            nb : int
+                number of blinks per blink phase
+            fade : int
+                duration of the fade in and fade out of a blink in ms
+
+        Raise a ValueError if the parameters are not valid.
+        '''
+
+        self.blinking = Blinking(BlinkSchedule(period, duration, nb, fade=fade), chrono.boottime_ns())
+        return
+
+    def stopBlink(self, *args, **kwargs):
+        '''Stop blinking.'''
+
+        self.blinking = None
+        return
+
+    def toggleBlink(self, *args, **kwargs):
+        '''Start blinking with the parameters of the setting file, or stop it.'''
+
+        if self.blinking is not None:
+            self.stopBlink()
+        else:
+            self.startBlink(self.blinkFreq, self.blinkPeriod, self.blinkNb, fade=self.blinkFade)
+        return
+
+    def command(self, command, *args, **kwargs):
+        '''
+        Run a command given on the command line. Only commands changing what is shown are supported.
+
+        Parameters
+        ----------
+            command : dict
+                command dictionnary (see control.parse)
+
+        Return the reply, as the one of the running instance.
+        '''
+
+        name = command['command']
+        if name == 'show':
+            self.stopBlink()
+
+        elif name == 'blink':
+            if command.get('stop'):
+                self.stopBlink()
+                return 'ok'
+
+            period     = self.blinkPeriod
+            if command.get('period') is not None:
+                period = chrono.parseDuration(command['period'])
+                if period is None:
+                    return 'error: period %s is not in format hh:mm:ss' %command['period']
+
+            duration   = self.blinkFreq if command.get('duration') is None else command['duration']
+            nb         = self.blinkNb   if command.get('nb')       is None else command['nb']
+            fade       = self.blinkFade if command.get('fade')     is None else command['fade']
+            try:
+                self.startBlink(duration, period, nb, fade=fade)
+            except (TypeError, ValueError) as e:
+                return 'error: %s' %e
+
+        elif name == 'mode':
+            duration = None
+            if command.get('duration') is not None:
+                duration = chrono.parseDuration(command['duration'])
+                if duration is None or duration <= 0:
+                    return 'error: duration %s is not a positive duration in format hh:mm:ss' %command['duration']
+
+            self.setMode(command['mode'], duration=duration)
+            if command.get('start'):
+                self.toggleTimer()
+
+        elif name == 'timer':
+            if self.chrono is None:
+                return 'error: no timer in clock mode, change the mode first'
+
+            if command['action'] == 'reset':
+                self.resetTimer()
+            elif (command['action'] == 'start') != self.chrono.running:
+                self.toggleTimer()
+
+        elif name == 'remind' and command['action'] == 'add':
+            try:
+                item = reminder.Reminder(command['value'],
+                                         nb       = self.blinkNb   if command.get('nb')       is None else command['nb'],
+                                         duration = self.blinkFreq if command.get('duration') is None else command['duration'],
+                                         fade     = self.blinkFade if command.get('fade')     is None else command['fade'])
+            except ValueError as e:
+                return 'error: %s' %e
+
+            if self.queue.add(item) is None:
+                return 'error: reminder %s is in the past' %item.at
+
+        else:
+            return 'error: %s is not supported by the terminal backend' %name
+
+        return 'ok'
+
+    def text(self, *args, **kwargs):
+        '''Displayed text, formatted as by the Qt backends.'''
+
+        if self.chrono is not None:
+            return self.chrono.text(self.timerFormat)
+        return timing.formatTime(self.timeFormat, timing.localMs())
+
+    def update(self, *args, **kwargs):
+        '''
+        Fire the due reminders, draw the cells which changed and compute when to wake up.
+
+        Return the delay in s until the next update, or None if nothing will change.
+        '''
+
+        rec         = stats.RECORDER
+        if rec is not None:
+            t0      = time.perf_counter()
+
+        delays      = []
+        fired       = self.queue.pop()
+        if fired:
+            item    = fired[-1]
+            self.flash  = Blinking(BlinkSchedule(2*item.nb*item.duration, item.duration, item.nb, fade=item.fade),
+                                   chrono.boottime_ns(), once=True)
+
+        due         = self.queue.next()
+        if due is not None:
+            delays.append(max(1, (due - time.time())*1000))
+
+        # A reminder being shown takes over the blinking until it is over
+        now         = chrono.boottime_ns()
+        if self.flash is not None and self.flash.finished(now):
+            self.flash = None
+
+        level       = 1
+        blinking    = self.flash or self.blinking
+        if blinking is not None:
+            level, delay = blinking.at(now)
+            delays.append(delay)
+
+        # Nothing is formatted while the clock is hidden
+        text        = ''
+        if level >= 0.5 and self.opacity > 0:
+            text    = self.text()
+            if self.chrono is not None:
+                delay = self.chrono.msToNextChange(self.timerFormat)
+            else:
+                delay = timing.msToNextChange(self.timeFormat)
+
+            if delay is not None:
+                delays.append(delay)
+
+        size        = os.get_terminal_size(self.out.fileno()) if self.out.isatty() else os.terminal_size((80, 24))
+        screen      = render(text, size.columns, size.lines)
+        out         = ''
+        if len(self.screen) != size.lines or len(self.screen[0]) != size.columns:
+            out     = '\x1b[H\x1b[2J' + colorCode(self.color, dim=self.opacity < 0.5)
+            self.screen = [' '*size.columns]*size.lines
+
+        out        += diff(self.screen, screen)
+        self.screen = screen
+        if out:
+            self.out.write(out)
+            self.out.flush()
+
+            if rec is not None:
+                rec.count('frames')
+                rec.add('frame', (time.perf_counter() - t0)*1000)
+
+        return min(delays)/1000 if delays else None
+
+    def key(self, char, *args, **kwargs):
+        '''Run the action of a key.'''
+
+        if char == ' ':
+            self.toggleTimer()
+        elif char == 'r':
+            self.resetTimer()
+        elif char == 'b':
+            self.toggleBlink()
+        elif char == 'q':
+            self.running = False
+        return
+
+    def stop(self, *args, **kwargs):
+        '''Quit at the next wakeup, e.g. when a signal is received.'''
+
+        self.running = False
+        return
+
+    def run(self, *args, **kwargs):
+        '''
+        Draw the clock until q is pressed or the process is interrupted.
+
+        The loop waits on the keyboard and on a pipe written when a signal is received (resize, interruption), with the
+        delay given by update as timeout.
+
+        Return the exit code.
+        '''
+
+        selector    = selectors.DefaultSelector()
+        rfd, wfd    = os.pipe()
+        os.set_blocking(rfd, False)
+        os.set_blocking(wfd, False)
+        selector.register(rfd, selectors.EVENT_READ)
+
+        # Signal handlers only set state, the wakeup pipe making the loop notice them at once
+        wakeup      = signal.set_wakeup_fd(wfd, warn_on_full_buffer=False)
+        handlers    = {}
+        for sig in [signal.SIGINT, signal.SIGTERM, signal.SIGHUP]:
+            handlers[sig] = signal.signal(sig, self.stop)
+        handlers[signal.SIGWINCH] = signal.signal(signal.SIGWINCH, lambda *args: None)
+
+        # Keys are read one by one without being echoed
+        stdin       = sys.stdin.fileno()
+        attributes  = None
+        if os.isatty(stdin):
+            import termios
+            import tty
+
+            attributes = termios.tcgetattr(stdin)
+            tty.setcbreak(stdin)
+            selector.register(stdin, selectors.EVENT_READ)
+
+        self.running = True
+        self.screen  = []
+        self.out.write(ENTER)
+        try:
+            while self.running:
+                self.readSettings()
+                for key, events in selector.select(self.update()):
+                    data = os.read(key.fd, 64)
+                    if key.fd == stdin:
+                        for char in data.decode(errors='ignore'):
+                            self.key(char)
+        finally:
+            self.out.write(LEAVE)
+            self.out.flush()
+
+            if attributes is not None:
+                termios.tcsetattr(stdin, termios.TCSADRAIN, attributes)
+
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+            signal.set_wakeup_fd(wakeup)
+
+            selector.close()
+            os.close(rfd)
+            os.close(wfd)
+
+        if stats.RECORDER is not None:
+            print('Statistics written in %s' %stats.RECORDER.save())
+        return 0
+
+def main(command, configuration=None, *args, **kwargs):
+    '''
+    Run the terminal backend.
+
+    Parameters
+    ----------
+        command : dict
+            command given on the command line (see control.parse)
+        configuration : dict
+            checked settings (see setup.check). If None, they are read from the setting file.
+
+    Return the exit code.
+    '''
+
+    if stats.mode() is not None:
+        stats.enable()
+
+    clock     = TerminalClock(configuration)
+
+    # The command given on the command line is run before the clock is shown
+    if command['command'] != 'show':
+        reply = clock.command(command)
+        if reply != 'ok':
+            print(reply)
+            return 1
+
+    return clock.run()
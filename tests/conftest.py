@@ -0,0 +1,33 @@
+"""
+Mercier Wilfried - IRAP
+
+Configuration of the tests: modules are imported from the parent directory and Qt runs without display.
+"""
+
+import os
+import sys
+import time
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+@pytest.fixture(scope='session')
+def qapp():
+    '''Qt application shared by every test.'''
+
+    from PyQt5.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+@pytest.fixture
+def timezone(monkeypatch):
+    '''Function setting the local time zone for the duration of a test.'''
+
+    def setZone(zone):
+        monkeypatch.setenv('TZ', zone)
+        time.tzset()
+
+    yield setZone
+    monkeypatch.undo()
+    time.tzset()
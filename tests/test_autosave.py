@@ -0,0 +1,91 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the automatic saving of the configuration.
+"""
+
+import os
+import pytest
+from   PyQt5.QtTest import QTest
+
+import setup
+from   autosave import AutoSaver
+
+class Configuration:
+    '''Configuration with a color changing at each call, counting the calls.'''
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return dict(setup.DEFAULT, color='#%06x' %self.calls)
+
+def read(fname):
+    with open(fname) as f:
+        return setup.parse(f.read())
+
+@pytest.fixture
+def saver(qapp, tmp_path):
+    configuration = Configuration()
+    saver         = AutoSaver(str(tmp_path / 'settings.yaml'), configuration, delay=50)
+    yield saver, configuration
+    saver.flush()
+
+def test_requests_are_coalesced(saver):
+    saver, configuration = saver
+    for _ in range(5):
+        saver.request()
+        QTest.qWait(10)
+
+    assert configuration.calls == 0
+    QTest.qWait(200)
+    saver.flush()
+
+    # A single configuration is gathered once no change happened for the delay
+    assert configuration.calls == 1
+    assert read(saver.fname)['color'] == '#000001'
+
+def test_flush_saves_pending_changes(saver):
+    saver, configuration = saver
+    saver.request()
+    saver.flush()
+
+    assert not saver.timer.isActive()
+    with open(saver.fname) as f:
+        text = f.read()
+    assert saver.written(text)
+    assert read(saver.fname)['color'] == '#000001'
+
+    # The cache matches the file written, so that the next start does not parse it
+    assert setup.readCache(saver.fname, setup.fileKey(saver.fname)) == read(saver.fname)
+
+def test_disabled_saver_writes_nothing(saver):
+    saver, configuration = saver
+    saver.enabled = False
+    saver.request()
+    saver.saveNow()
+    saver.flush()
+
+    assert configuration.calls == 0
+    assert not os.path.exists(saver.fname)
+
+def test_failed_write_keeps_the_previous_file(saver, monkeypatch):
+    saver, configuration = saver
+    saver.saveNow()
+    saver.flush()
+    with open(saver.fname) as f:
+        before = f.read()
+
+    def fail(fd):
+        raise OSError('disk full')
+
+    # The file is only replaced once the new content is on disk
+    monkeypatch.setattr(setup.os, 'fsync', fail)
+    saver.saveNow()
+    saver.flush()
+
+    with open(saver.fname) as f:
+        assert f.read() == before
+    assert saver.written(before)
+    assert sorted(os.listdir(os.path.dirname(saver.fname))) == ['.settings.yaml.cache', 'settings.yaml']
@@ -0,0 +1,28 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the benchmarks which must leave the setting file alone.
+"""
+
+import os
+import pytest
+
+import benchmark
+
+def fileState(path):
+    '''Content and modification time of a file, or None if it does not exist.'''
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as f:
+        return f.read(), os.stat(path).st_mtime_ns
+
+@pytest.mark.parametrize('backend', ['widgets', 'lean'])
+def test_startup_leaves_the_setting_file(backend):
+    paths  = [os.path.join(benchmark.scriptDir, name) for name in ['settings.yaml', '.settings.yaml.cache']]
+    before = [fileState(path) for path in paths]
+    result = benchmark.startup(nb=1, backend=backend)
+
+    assert all(value > 0 for value in result.values())
+    assert [fileState(path) for path in paths] == before
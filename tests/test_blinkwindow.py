@@ -0,0 +1,30 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the window used to setup blinking.
+"""
+
+from   PyQt5.QtCore import QTime
+
+import setup
+import clocksource
+
+def test_zero_period_is_not_accepted(qapp, tmp_path, monkeypatch):
+    import TopWatch
+    from   blinkwindow import BlinkWindow
+
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    app    = TopWatch.App(setup.check(dict(setup.DEFAULT)), clock=clocksource.VirtualClock(1700000000))
+    app.autosave.enabled = False
+    qapp.processEvents()
+
+    window = BlinkWindow(app)
+    window.tedit.setTime(QTime(0, 0, 0))
+    assert window.tedit.time() == QTime(0, 0, 1)
+
+    window.ok()
+    assert app.blinkActive
+    assert app.blinkPeriod == QTime(0, 0, 1)
+
+    app.stopBlink()
+    app.close()
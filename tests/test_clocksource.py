@@ -0,0 +1,50 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the wall clock timers.
+"""
+
+import os
+import pytest
+
+import clocksource
+from   ticker import Ticker, ReminderTicker
+
+@pytest.mark.skipif(not clocksource.supported(), reason='timerfd is not available')
+def test_timerfd_is_released(qapp):
+    timer = clocksource.TimerFdTimer()
+    fd    = timer.fd
+    timer.start(clocksource.SYSTEM.time() + 60)
+    timer.close()
+
+    with pytest.raises(OSError):
+        os.fstat(fd)
+
+    # Closing twice or stopping a closed timer does nothing
+    timer.close()
+    timer.stop()
+    assert not timer.isActive()
+
+def test_schedulers_release_their_timer(qapp):
+    ticker   = Ticker('hh:mm:ss')
+    reminder = ReminderTicker()
+    ticker.start()
+    for engine in [ticker, reminder]:
+        fd = getattr(engine.timer, 'fd', None)
+        engine.close()
+        assert not engine.timer.isActive()
+        if fd is not None:
+            with pytest.raises(OSError):
+                os.fstat(fd)
+
+def test_timerfd_is_probed_once(monkeypatch):
+    calls = []
+    def timerfdCreate(*args, **kwargs):
+        calls.append(1)
+        return os.open(os.devnull, os.O_RDONLY)
+
+    monkeypatch.setattr(clocksource, '_SUPPORTED', None)
+    monkeypatch.setattr(clocksource, 'timerfdCreate', timerfdCreate)
+    results = [clocksource.supported() for _ in range(3)]
+    assert results == [clocksource.sys.platform.startswith('linux')]*3
+    assert len(calls) <= 1
@@ -0,0 +1,102 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the commands sent to a running instance through the control socket.
+"""
+
+import os
+import socket
+import threading
+import pytest
+
+import control
+
+@pytest.fixture
+def runtime(tmp_path, monkeypatch):
+    '''Directory of the control socket, empty at first.'''
+
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    return tmp_path
+
+def inThread(qapp, function):
+    '''Run a function in a thread while the Qt event loop runs the server, and return its result.'''
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function()))
+    thread.start()
+    while thread.is_alive():
+        qapp.processEvents()
+        thread.join(0.01)
+    return result[0]
+
+def request(qapp, path, line):
+    '''Send a raw line to the server and return the reply.'''
+
+    def run():
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(control.TIMEOUT)
+            sock.connect(path)
+            sock.sendall(line)
+            return b''.join(iter(lambda: sock.recv(4096), b'')).decode().strip()
+
+    return inThread(qapp, run)
+
+##############################################
+#                Command line                #
+##############################################
+
+def test_parse():
+    assert control.parse([])['command'] == 'show'
+
+    command = control.parse(['blink', '--period', '00:15:00', '--nb', '3'])
+    assert (command['command'], command['period'], command['nb'], command['stop']) == ('blink', '00:15:00', 3, False)
+
+    # Files are given to the running instance with an absolute path
+    command = control.parse(['remind', 'import', 'meetings.txt'])
+    assert command['value'] == os.path.abspath('meetings.txt')
+
+    assert control.parse(['--backend', 'lean'])['backend'] == 'lean'
+
+@pytest.mark.parametrize('argv', [['font-size', 'big'], ['mode', 'hourglass'], ['--backend', 'gtk'], ['unknown']])
+def test_parse_rejects_invalid_commands(argv, capsys):
+    with pytest.raises(SystemExit):
+        control.parse(argv)
+
+def test_forward_without_running_instance(runtime, capsys):
+    assert control.send({'command' : 'show'}) is None
+    assert control.forward(['color', 'red'])['color'] == 'red'
+
+    # A terminal clock or a frame server is started next to the running instance
+    assert control.forward(['--backend', 'tty'])['backend'] == 'tty'
+    assert control.forward(['--frames'])['frames'] == ''
+
+    with pytest.raises(SystemExit) as e:
+        control.forward(['quit'])
+    assert e.value.code == 1
+
+##############################################
+#                   Server                   #
+##############################################
+
+def test_server_survives_failing_commands(qapp, runtime):
+    from server import ControlServer
+
+    def handler(command):
+        if command['command'] == 'quit':
+            raise AttributeError('no window')
+        return 'ok %s' %command['command']
+
+    path   = control.socketPath()
+    server = ControlServer(path, handler)
+
+    assert request(qapp, path, b'{"command": "show"}\n') == 'ok show'
+    assert request(qapp, path, b'{"command": "quit"}\n') == 'error: no window'
+    assert request(qapp, path, b'not json\n').startswith('error: ')
+    assert request(qapp, path, b'["show"]\n').startswith('error: ')
+
+    # The server still answers afterwards
+    assert request(qapp, path, b'{"command": "show"}\n') == 'ok show'
+    assert inThread(qapp, lambda: control.send(control.parse(['color', 'red']))) == 'ok color'
+
+    server.close()
+    assert not os.path.exists(path)
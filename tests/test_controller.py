@@ -0,0 +1,40 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the behaviour shared by the backends, run with the QtWidgets window.
+"""
+
+import os
+import sys
+import subprocess
+
+import setup
+import clocksource
+
+def test_reset_saves_the_state_shown(qapp, tmp_path, monkeypatch):
+    import TopWatch
+
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    configuration = setup.check(dict(setup.DEFAULT, color='#00ff00', format='hh:mm:ss', precise=True, blinkNb=7))
+    app           = TopWatch.App(configuration, clock=clocksource.VirtualClock(1700000000))
+    qapp.processEvents()
+
+    app.autosave.fname = str(tmp_path / 'settings.yaml')
+    app.reset()
+    app.autosave.flush()
+
+    with open(app.autosave.fname) as f:
+        saved = setup.parse(f.read())
+
+    default = setup.check(dict(setup.DEFAULT))
+    assert setup.check(app.configuration()) == default
+    assert saved == default
+
+    app.autosave.enabled = False
+    app.close()
+
+def test_lean_backend_never_imports_widgets():
+    code = 'import sys, lean; print(any(name.startswith("PyQt5.QtWidgets") for name in sys.modules))'
+    out  = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
+                          capture_output=True, text=True, check=True).stdout
+    assert out.strip() == 'False'
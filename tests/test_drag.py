@@ -0,0 +1,61 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the window dragging.
+"""
+
+import pytest
+from   PyQt5.QtCore import QPoint, QRect
+from   PyQt5.QtTest import QTest
+
+from   drag import DragMover
+
+class Window:
+    '''Window recording its moves.'''
+
+    def __init__(self):
+        self.position = QPoint(100, 100)
+        self.moves    = []
+
+    def pos(self):
+        return self.position
+
+    def move(self, pos):
+        self.position = pos
+        self.moves.append(pos)
+
+    def frameGeometry(self):
+        return QRect(self.position, QPoint(self.position.x() + 199, self.position.y() + 49))
+
+def test_moves_are_coalesced(qapp):
+    window = Window()
+    mover  = DragMover(window)
+    mover._frame = 30
+    mover.start(QPoint(110, 110))
+
+    # The first move is applied at once, the next ones once a frame has elapsed, only the last one being kept
+    for i in range(1, 6):
+        mover.moveTo(QPoint(110 + i, 110 + 2*i))
+    assert window.moves == [QPoint(101, 102)]
+
+    QTest.qWait(100)
+    assert window.moves == [QPoint(101, 102), QPoint(105, 110)]
+
+    # Finishing applies the pending position at once
+    mover.moveTo(QPoint(150, 150))
+    mover.finish()
+    assert window.moves[-1] == QPoint(140, 140)
+    assert not mover.timer.isActive()
+
+@pytest.mark.parametrize('pos, snapped', [(QPoint(7, 500), QPoint(0, 500)),
+                                          (QPoint(1715, 1025), QPoint(1720, 1030)),
+                                          (QPoint(500, -8), QPoint(500, 0)),
+                                          (QPoint(500, 500), QPoint(500, 500)),
+                                          (QPoint(1925, 500), QPoint(1920, 500))])
+def test_snap_to_screen_edges(qapp, pos, snapped):
+    # Two screens side by side, the window being 200x50
+    window = Window()
+    mover  = DragMover(window, snap=True)
+    mover._geometries = [QRect(0, 0, 1920, 1080), QRect(1920, 0, 1280, 1024)]
+
+    assert mover.snapped(pos) == snapped
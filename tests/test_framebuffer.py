@@ -0,0 +1,118 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the ring buffer of frames shared with consumers.
+"""
+
+import os
+import struct
+import pytest
+
+import framebuffer
+from   framebuffer import FrameRing, FrameReader
+
+@pytest.fixture
+def ring(tmp_path):
+    ring = FrameRing(str(tmp_path / 'frames'), 10, 3)
+    yield ring
+    ring.close()
+
+def draw(ring, value, time_ns):
+    '''Fill the next frame with a byte value and publish it.'''
+
+    slot                   = ring.begin()
+    pixels                 = ring.pixels(slot)
+    pixels[:]              = bytes([value])*len(pixels)
+    pixels.release()
+    ring.commit(slot, time_ns)
+    return slot
+
+def latest(reader):
+    '''Latest frame of a reader with its pixels copied, so that the mapping can be closed.'''
+
+    sequence, time_ns, pixels = reader.latest()
+    data                      = bytes(pixels)
+    pixels.release()
+    return sequence, time_ns, data
+
+###############################################
+#                   Layout                    #
+###############################################
+
+def test_header_layout(ring):
+    with open(ring.path, 'rb') as f:
+        data = f.read()
+
+    stride = framebuffer._align(10*4)
+    assert stride == 64
+    assert len(data) == framebuffer.HEADERSIZE + 3*(framebuffer.SLOTSIZE + framebuffer._align(stride*3))
+    assert data[:4] == b'TWFB'
+    assert struct.unpack_from('<7I', data, 4) == (framebuffer.VERSION, framebuffer.RGBA8888_PREMULTIPLIED, 10, 3, stride,
+                                                  framebuffer.SLOTS, 0)
+    assert struct.unpack_from('<Q', data, 32) == (0,)
+    assert struct.unpack_from('<I', data, 40) == (os.getpid(),)
+
+    # Offsets of the fields consumers poll, and header sizes, are part of the format
+    assert (framebuffer.FLAGS, framebuffer.LATEST, framebuffer.PID) == (28, 32, 40)
+    assert framebuffer.HEADER.size <= framebuffer.PID < framebuffer.HEADERSIZE == 64
+    assert framebuffer.SLOT.size <= framebuffer.SLOTSIZE == 64
+    assert ring.offset(1) - ring.offset(0) == ring.slotSize
+    assert ring.offset(0) % framebuffer.ALIGN == 0
+
+def test_invalid_file_is_rejected(tmp_path):
+    path = tmp_path / 'frames'
+    path.write_bytes(b'\0'*framebuffer.HEADERSIZE)
+    with pytest.raises(ValueError):
+        FrameReader(str(path))
+
+###############################################
+#                 Round trip                  #
+###############################################
+
+def test_frames_round_trip(ring):
+    reader = FrameReader(ring.path)
+    assert (reader.width, reader.height, reader.stride, reader.slots) == (10, 3, ring.stride, ring.slots)
+    assert reader.latest() is None
+
+    for n in range(1, 5):
+        slot = draw(ring, n, 1000*n)
+        assert slot == (n - 1)%ring.slots
+        assert latest(reader) == (n, 1000*n, bytes([n])*ring.stride*ring.height)
+
+    # A frame is no longer valid once its slot is reused
+    assert reader.valid(4)
+    for n in range(5, 5 + ring.slots):
+        draw(ring, n, 1000*n)
+    assert not reader.valid(4)
+    assert reader.valid(4 + ring.slots)
+    reader.close()
+
+def test_frame_is_invalid_while_its_slot_is_written(ring):
+    reader = FrameReader(ring.path)
+    draw(ring, 1, 1000)
+    for _ in range(ring.slots - 1):
+        draw(ring, 2, 2000)
+
+    # Starting the next frame clears the slot of the oldest one before any pixel is drawn, the latest one is untouched
+    assert reader.valid(1)
+    ring.begin()
+    assert not reader.valid(1)
+    assert latest(reader)[0] == ring.slots
+    reader.close()
+
+def test_reader_follows_new_geometry(ring):
+    reader = FrameReader(ring.path)
+    draw(ring, 1, 1000)
+    ring.create(20, 5)
+    draw(ring, 2, 2000)
+
+    # The previous file is flagged as stale and the new one is mapped
+    assert latest(reader) == (2, 2000, bytes([2])*ring.stride*5)
+    assert (reader.width, reader.height, reader.stride) == (20, 5, framebuffer._align(80))
+    reader.close()
+
+def test_close_removes_the_file(tmp_path):
+    ring = FrameRing(str(tmp_path / 'frames'), 1, 1)
+    ring.close()
+    assert not os.path.exists(ring.path)
+    assert ring.map is None
@@ -0,0 +1,22 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the shapes of the strings produced by the time formats, used to size the clock.
+"""
+
+import pytest
+
+import glyphs
+import timing
+
+@pytest.mark.parametrize('fmt', ['hh:mm', 'h:mm:ss', 'hh:mm:ss.z', 'hh:mm:ss.zzz', 'h:mm:ss.T AP', 'H:m:s.z'])
+def test_shapes_cover_formatted_times(qapp, fmt):
+    table  = str.maketrans(glyphs.DIGITS, '0'*len(glyphs.DIGITS))
+    shapes = glyphs.shapes(fmt)
+    for ms in range(0, 86400000, 7919):
+        assert timing.formatTime(fmt, ms).translate(table) in shapes
+
+def test_shapes_have_three_digit_milliseconds(qapp):
+    # z drops trailing zeroes, so 123 ms gives the widest string
+    assert '00:00:00.000' in glyphs.shapes('hh:mm:ss.z')
+    assert '00:00:00.0'   in glyphs.shapes('hh:mm:ss.z')
@@ -0,0 +1,110 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the parsing and of the queue of reminders.
+"""
+
+import pytest
+
+import reminder
+from   reminder import Reminder, ReminderQueue
+
+# 2023-11-14 22:13:20 UTC
+NOW = 1700000000
+
+###############################################
+#                   Parsing                   #
+###############################################
+
+@pytest.mark.parametrize('spec, kind, fields, values', [
+    ('12:30',                        'daily',  (12, 30, 0),               (3, 100, 0)),
+    ('7:05:09 5',                    'daily',  (7, 5, 9),                 (5, 100, 0)),
+    (':45 2 50 10',                  'hourly', (45, 0),                   (2, 50, 10)),
+    ('2023-11-15T08:00',             'once',   (2023, 11, 15, 8, 0, 0),   (3, 100, 0)),
+    ('2023-11-15  8:00:30 1 200',    'once',   (2023, 11, 15, 8, 0, 30),  (1, 200, 0)),
+    ({'at' : '12:30', 'nb' : 4},     'daily',  (12, 30, 0),               (4, 100, 0)),
+    ])
+def test_parse(spec, kind, fields, values):
+    item = reminder.parse(spec)
+    assert (item.kind, item.fields, (item.nb, item.duration, item.fade)) == (kind, fields, values)
+
+    # The configuration of a reminder gives it back
+    assert reminder.parse(item.configuration()).configuration() == item.configuration()
+
+@pytest.mark.parametrize('spec', ['', 'noon', '24:00', '12:60', '12:00:60', ':60', '2023-13-01 12:00',
+                                  '2023-11-32 12:00', '12:00 x', '12:00 1 2 3 4', '12:00 0', '12:00 3 0',
+                                  '12:00 3 100 -1', {'nb' : 3}, {'at' : '12:00', 'nb' : '3'}])
+def test_parse_invalid(spec):
+    with pytest.raises(ValueError):
+        reminder.parse(spec)
+
+def test_load(tmp_path):
+    fname = tmp_path / 'reminders.txt'
+    fname.write_text('# Meetings\n\n12:30\n:15 5   # every hour\n   \n2023-11-15 08:00 1 200 50\n')
+
+    items = reminder.load(str(fname), nb=2)
+    assert [item.configuration() for item in items] == [
+        {'at' : '12:30',            'nb' : 2, 'duration' : 100, 'fade' : 0},
+        {'at' : ':15',              'nb' : 5, 'duration' : 100, 'fade' : 0},
+        {'at' : '2023-11-15 08:00', 'nb' : 1, 'duration' : 200, 'fade' : 50}]
+
+def test_load_gives_the_invalid_line(tmp_path):
+    fname = tmp_path / 'reminders.txt'
+    fname.write_text('12:30\n\n25:00\n')
+
+    with pytest.raises(ValueError, match='line 3'):
+        reminder.load(str(fname))
+
+###############################################
+#                    Queue                    #
+###############################################
+
+def once(hour, minute=0):
+    return Reminder('2023-11-15 %02d:%02d' %(hour, minute))
+
+def test_queue_order(timezone):
+    timezone('UTC')
+    queue = ReminderQueue()
+    late  = queue.add(once(10), now=NOW)
+    early = queue.add(once(9), now=NOW)
+    assert queue.add(Reminder('2023-11-14 08:00'), now=NOW) is None
+
+    daily = queue.add(Reminder('9:30'), now=NOW)
+    assert len(queue) == 3
+    assert queue.next() == queue.due(early)
+
+    # Recurring reminders are added back with their next occurrence
+    fired = queue.pop(now=queue.due(daily))
+    assert [item.at for item in fired] == ['2023-11-15 09:00', '9:30']
+    assert set(queue.reminders) == {late, daily}
+    assert queue.due(daily) - queue.due(late) == 23.5*3600
+
+def test_queue_cancel_is_lazy(timezone):
+    timezone('UTC')
+    queue = ReminderQueue()
+    nums  = [queue.add(once(hour, minute), now=NOW) for hour in range(10) for minute in range(0, 60, 10)]
+    assert queue.cancel(nums[0])
+    assert not queue.cancel(nums[0])
+
+    # Cancelled reminders stay in the heap until they reach its top
+    assert len(queue) == 59
+    assert len(queue._heap) == 60
+    assert queue.next() == queue.due(nums[1])
+    assert len(queue._heap) == 59
+
+    queue.cancel(nums[2])
+    fired = queue.pop(now=queue.due(nums[3]))
+    assert [item.at for item in fired] == ['2023-11-15 00:10', '2023-11-15 00:30']
+    assert len(queue._heap) == len(queue) == 56
+
+    # The heap is rebuilt when cancelled reminders make up most of it
+    for num in nums[4:40]:
+        queue.cancel(num)
+    assert (len(queue), len(queue._heap)) == (20, 56)
+
+    queue.cancel(nums[40])
+    assert sorted(queue._heap) == sorted((queue.due(num), num) for num in nums[41:])
+
+    queue.clear()
+    assert len(queue) == 0
+    assert queue.next() is None
@@ -0,0 +1,89 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the reloading of the setting file while running.
+"""
+
+import pytest
+from   PyQt5.QtTest import QTest
+
+import setup
+import clocksource
+from   autosave        import AutoSaver
+from   settingswatcher import SettingsWatcher
+
+@pytest.fixture
+def fname(tmp_path):
+    fname = str(tmp_path / 'settings.yaml')
+    setup.writeConfiguration(fname, dict(setup.DEFAULT))
+    return fname
+
+def watch(fname, ignore=None, delay=100):
+    '''Watcher of a file and list of the settings it emitted.'''
+
+    emitted = []
+    watcher = SettingsWatcher(fname, ignore=ignore, delay=delay)
+    watcher.changed.connect(emitted.append)
+    return watcher, emitted
+
+def waitFor(condition, timeout=2000):
+    '''Process events until a condition is true or a timeout in ms is reached, and return the condition.'''
+
+    for _ in range(timeout//10):
+        if condition():
+            break
+        QTest.qWait(10)
+    return condition()
+
+def test_changes_are_debounced(qapp, fname):
+    watcher, emitted = watch(fname)
+    for color in ['#000001', '#000002', '#000003']:
+        setup.writeConfiguration(fname, dict(setup.DEFAULT, color=color))
+        QTest.qWait(20)
+
+    # Writes closer than the delay are read once, with the latest content
+    assert waitFor(lambda: emitted)
+    QTest.qWait(300)
+    assert [settings['color'] for settings in emitted] == ['#000003']
+    assert emitted[0] == setup.check(dict(setup.DEFAULT, color='#000003'))
+
+def test_own_writes_are_ignored(qapp, fname):
+    saver            = AutoSaver(fname, lambda: dict(setup.DEFAULT, color='#0000ff'), delay=0)
+    watcher, emitted = watch(fname, ignore=saver.written)
+
+    saver.request()
+    saver.flush()
+    QTest.qWait(400)
+    assert emitted == []
+
+    # The same file changed by someone else is reloaded
+    setup.writeConfiguration(fname, dict(setup.DEFAULT, color='#ff0000'))
+    assert waitFor(lambda: emitted)
+    assert emitted[0]['color'] == '#ff0000'
+
+def test_only_changed_keys_are_applied(qapp, tmp_path, monkeypatch, fname):
+    import TopWatch
+
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    app                  = TopWatch.App(setup.check(dict(setup.DEFAULT)), clock=clocksource.VirtualClock(1700000000))
+    app.autosave.enabled = False
+    qapp.processEvents()
+
+    calls                = []
+    for name in ['updateFont', 'setClocks', 'setReminders', 'setMode', 'setSnap', 'setPrecise', 'setTimeFormat',
+                 'move']:
+        monkeypatch.setattr(app, name, lambda *args, name=name, **kwargs: calls.append(name))
+
+    watcher, emitted     = watch(fname)
+    watcher.changed.connect(app.applyConfiguration)
+    setup.writeConfiguration(fname, dict(app.configuration(), color='#00ff00', opacity=0.5))
+    assert waitFor(lambda: emitted)
+
+    assert app.color == '#00ff00'
+    assert app.configuration()['opacity'] == 0.5
+    assert calls == []
+
+    # Settings equal to the current ones change nothing
+    app.applyConfiguration(setup.check(app.configuration()))
+    assert calls == []
+    app.close()
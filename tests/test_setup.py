@@ -0,0 +1,154 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the reading, checking and caching of the setting file.
+"""
+
+import os
+import shutil
+import pytest
+
+import setup
+
+MARKER  = {'cached' : True}
+
+def content(fname):
+    with open(fname) as f:
+        return f.read()
+
+###############################################
+#                    Init                     #
+###############################################
+
+def test_init_creates_a_default_file(tmp_path):
+    settings, ok = setup.init(str(tmp_path))
+    assert ok == 0
+    assert settings == setup.check(dict(setup.DEFAULT))
+    assert setup.parse(content(tmp_path / 'settings.yaml')) == settings
+    assert os.path.isfile(setup.cachePath(str(tmp_path / 'settings.yaml')))
+
+@pytest.mark.parametrize('text', ['font: [unclosed\ncolor: "#ffffff"\n', 'color: "#00ff00"\nx: 10\n', '- a list\n'])
+def test_init_recovers_from_an_invalid_file(tmp_path, text):
+    fname        = tmp_path / 'settings.yaml'
+    fname.write_text(text)
+
+    # The invalid file is kept aside and replaced by a default one, which is used
+    settings, ok = setup.init(str(tmp_path))
+    assert ok == -1
+    assert settings == setup.check(dict(setup.DEFAULT))
+    assert content(tmp_path / '~settings.yaml') == text
+    assert setup.parse(content(fname)) == settings
+
+    # The new file is valid
+    assert setup.init(str(tmp_path)) == (settings, 0)
+
+###############################################
+#                    Cache                    #
+###############################################
+
+@pytest.fixture
+def cached(tmp_path):
+    '''Setting file whose cache holds a marker instead of its checked settings.'''
+
+    fname = str(tmp_path / 'settings.yaml')
+    setup.writeConfiguration(fname, dict(setup.DEFAULT, color='#00ff00'))
+    setup.writeCache(fname, setup.fileKey(fname), MARKER)
+    assert setup.init(str(tmp_path)) == (MARKER, 0)
+    return fname
+
+def test_writing_updates_the_cache(tmp_path):
+    fname = str(tmp_path / 'settings.yaml')
+    setup.writeConfiguration(fname, dict(setup.DEFAULT, color='#00ff00'))
+    assert setup.readCache(fname, setup.fileKey(fname)) == setup.check(dict(setup.DEFAULT, color='#00ff00'))
+
+def changeTime(fname):
+    st = os.stat(fname)
+    os.utime(fname, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+
+def changeSize(fname):
+    with open(fname, 'a') as f:
+        f.write('\n')
+
+def changeInode(fname):
+    '''Replace a file by a copy with the same content and modification time.'''
+
+    shutil.copy2(fname, fname + '.copy')
+    os.replace(fname + '.copy', fname)
+
+@pytest.mark.parametrize('change', [changeTime, changeSize, changeInode])
+def test_cache_is_invalidated(tmp_path, cached, change):
+    key          = setup.fileKey(cached)
+    change(cached)
+    assert setup.fileKey(cached) != key
+
+    # The file is read again and the cache updated
+    settings, ok = setup.init(str(tmp_path))
+    assert ok == 0
+    assert settings == setup.check(dict(setup.DEFAULT, color='#00ff00'))
+    assert setup.readCache(cached, setup.fileKey(cached)) == settings
+
+def test_invalid_cache_is_ignored(tmp_path, cached, monkeypatch):
+    with open(setup.cachePath(cached), 'wb') as f:
+        f.write(b'not marshal data')
+    assert setup.readCache(cached, setup.fileKey(cached)) is None
+
+    setup.writeCache(cached, setup.fileKey(cached), MARKER)
+    monkeypatch.setattr(setup, 'CACHEVERSION', setup.CACHEVERSION + 1)
+    assert setup.readCache(cached, setup.fileKey(cached)) is None
+    assert setup.init(str(tmp_path))[0]['color'] == '#00ff00'
+
+###############################################
+#                    Check                    #
+###############################################
+
+def test_check_converts_and_fills_settings():
+    required = {key : setup.DEFAULT[key] for key in setup.REQUIRED}
+    settings = setup.check(dict(required, blinkPeriod='00:01:30.5'))
+
+    assert set(settings) == set(setup.DEFAULT)
+    assert settings['blinkPeriod'] == 90500
+    assert settings['timerDuration'] == 300000
+    assert settings['reminders'] == []
+
+@pytest.mark.parametrize('key, value', [
+    ('x',             -1),
+    ('y',             1.5),
+    ('opacity',       2),
+    ('blinkPeriod',   '24:00:00'),
+    ('blinkPeriod',   45000),
+    ('blinkFreq',     'fast'),
+    ('blinkNb',       0),
+    ('blinkFade',     -10),
+    ('snap',          'yes'),
+    ('format',        "'text'"),
+    ('precise',       1),
+    ('mode',          'alarm'),
+    ('timerDuration', '00:00:00'),
+    ('timerDuration', 5400),
+    ('timerFormat',   42),
+    ('backend',       'curses'),
+    ('clocks',        'Europe/Paris'),
+    ('reminders',     '12:00'),
+    ])
+def test_check_replaces_invalid_values(key, value):
+    default = setup.check(dict(setup.DEFAULT))
+    assert setup.check(dict(setup.DEFAULT, **{key : value})) == default
+
+def test_check_clips_and_drops_values():
+    settings = setup.check(dict(setup.DEFAULT, blinkFreq=10, clocks=[{'format' : 'hh'}, {'timezone' : 'UTC', 'x' : -5}],
+                                reminders=['12:00', '25:00', {'at' : ':30', 'nb' : 1}]))
+
+    assert settings['blinkFreq'] == 50
+    assert settings['clocks'] == [{'timezone' : 'UTC', 'format' : 'hh:mm', 'font' : setup.DEFAULT['font'],
+                                   'color' : setup.DEFAULT['color'], 'x' : 0, 'y' : 0, 'opacity' : 1}]
+    assert [item['at'] for item in settings['reminders']] == ['12:00', ':30']
+    assert settings['reminders'][0]['duration'] == 50
+
+def test_check_round_trip(tmp_path):
+    '''Checked settings must not be checked again, the ones read back from a written file are the same.'''
+
+    configuration = dict(setup.DEFAULT, blinkPeriod='00:00:02.5', timerDuration='1:30:00', reminders=['8:00 2'])
+    fname         = str(tmp_path / 'settings.yaml')
+    written       = setup.writeConfiguration(fname, configuration)
+    assert setup.parse(written) == setup.check(dict(configuration))
+    assert setup.check(dict(configuration))['timerDuration'] == 5400000
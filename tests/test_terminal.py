@@ -0,0 +1,115 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the drawing of the terminal backend.
+"""
+
+import re
+import pytest
+
+import terminal
+from   terminal import render, diff, colorCode
+
+def apply(screen, out):
+    '''Screen shown after writing escape sequences given by diff, and the cells written as (row, column).'''
+
+    screen  = [list(row) for row in screen]
+    written = []
+    for y, x, text in re.findall(r'\x1b\[(\d+);(\d+)H([^\x1b]*)', out):
+        y, x = int(y) - 1, int(x) - 1
+        for pos, c in enumerate(text):
+            screen[y][x + pos] = c
+            written.append((y, x + pos))
+    return [''.join(row) for row in screen], written
+
+###############################################
+#                   Render                    #
+###############################################
+
+def test_render_glyphs():
+    # Blocks are two cells wide
+    assert render('1', 6, 5) == ['  ██  ',
+                                 '████  ',
+                                 '  ██  ',
+                                 '  ██  ',
+                                 '██████']
+
+def test_render_scales_and_centers():
+    screen = render('12', 80, 24)
+
+    # Glyphs of 7 blocks in width fit 4 times in height, and are centered
+    assert len(screen) == 24
+    assert all(len(row) == 80 for row in screen)
+    assert screen[:2] == [' '*80]*2 and screen[22:] == [' '*80]*2
+    assert screen[2] == ' '*12 + ' '*8 + '█'*8 + ' '*8 + ' '*8 + '█'*24 + ' '*12
+    assert screen[2:6] == [screen[2]]*4
+
+@pytest.mark.parametrize('text, columns, rows, screen', [
+    ('12',   5,  5, ['     ', '     ', ' 12  ', '     ', '     ']),
+    ('a?',   6,  3, ['      ', '  a?  ', '      ']),
+    ('ab',   1,  1, ['a']),
+    ('',     4,  2, ['    ', '    ']),
+    ])
+def test_render_text_as_it_is(text, columns, rows, screen):
+    # Texts without glyphs, or whose glyphs do not fit, are written as they are
+    assert render(text, columns, rows) == screen
+
+###############################################
+#                    Diff                     #
+###############################################
+
+def test_diff_of_same_screens():
+    screen = render('12:34', 80, 24)
+    assert diff(screen, screen) == ''
+
+@pytest.mark.parametrize('new, out', [
+    ('aXcdefghijkl', '\x1b[1;2HX'),
+    ('aXcdYfghijkl', '\x1b[1;2HXcdY'),
+    ('aXcdefgYijkl', '\x1b[1;2HXcdefgY'),
+    ('aXcdefghYjkl', '\x1b[1;2HX\x1b[1;9HY'),
+    ('abcdefghijkZ', '\x1b[1;12HZ'),
+    ])
+def test_diff_runs(new, out):
+    # Runs separated by less than GAP unchanged cells are merged
+    assert terminal.GAP == 6
+    assert diff(['abcdefghijkl', 'abcdefghijkl'], ['abcdefghijkl', new]) == out.replace('[1;', '[2;')
+
+def test_diff_only_rewrites_the_changed_digit():
+    old          = render('12:34:56', 120, 30)
+    new          = render('12:34:57', 120, 30)
+    shown, cells = apply(old, diff(old, new))
+    assert shown == new
+
+    # Unchanged cells are only written between changed ones of the same row
+    changed      = {(y, x) for y in range(30) for x in range(120) if old[y][x] != new[y][x]}
+    assert changed <= set(cells)
+    for y, x in cells:
+        row      = [cx for cy, cx in changed if cy == y]
+        assert row and min(row) <= x <= max(row)
+
+    # Glyphs are drawn twice as large in 108 cells, the last digit being in the 12 cells on the right
+    assert {x for _, x in cells} <= set(range(102, 114))
+
+def test_diff_after_a_new_text():
+    old          = render('09:59', 80, 24)
+    new          = render('10:00', 80, 24)
+    assert apply(old, diff(old, new))[0] == new
+
+###############################################
+#                   Colors                    #
+###############################################
+
+@pytest.mark.parametrize('color, dim, code', [
+    ('red',        False, '\x1b[0m\x1b[31m'),
+    (' Grey ',     False, '\x1b[0m\x1b[90m'),
+    ('red',        True,  '\x1b[0;2m\x1b[31m'),
+    ('#f80',       False, '\x1b[0m\x1b[38;2;255;136;0m'),
+    ('#FFDD1C',    True,  '\x1b[0;2m\x1b[38;2;255;221;28m'),
+    ('#80ff8800',  False, '\x1b[0m\x1b[38;2;255;136;0m'),
+    ('orange',     False, '\x1b[0m'),
+    ('#zzz',       False, '\x1b[0m'),
+    ('#12345',     True,  '\x1b[0;2m'),
+    (None,         False, '\x1b[0m'),
+    ])
+def test_color_code(color, dim, code):
+    assert colorCode(color, dim=dim) == code
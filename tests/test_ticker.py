@@ -0,0 +1,312 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the schedulers driven by a virtual clock.
+"""
+
+import calendar
+import pytest
+
+import chrono
+import timing
+import reminder
+import clocksource
+from   ticker import Ticker, Blinker, ChronoTicker, ReminderTicker
+from   blink  import BlinkSchedule
+
+# A time which is not on a second boundary, 2023-11-14 22:13:20.250 UTC
+START = 1700000000.25
+
+def utc(year, month, day, hour=0, minute=0, second=0):
+    '''POSIX time of a UTC date and time, the seconds possibly having a fractional part.'''
+
+    return calendar.timegm((year, month, day, hour, minute, 0)) + second
+
+def ticks(ticker, clock, fmt):
+    '''List filled with the wall clock time and the local string of each tick.'''
+
+    result = []
+    ticker.tick.connect(lambda: result.append((clock.time(), timing.formatTime(fmt, timing.localMs(clock.time())))))
+    return result
+
+##############################################
+#                   Ticker                   #
+##############################################
+
+def test_ticker_midnight_rollover(qapp, timezone):
+    timezone('UTC')
+    clock  = clocksource.VirtualClock(utc(2023, 12, 31, 23, 58, 30.25))
+    ticker = Ticker('dd/MM/yyyy hh:mm', clock=clock)
+    result = ticks(ticker, clock, ticker.fmt)
+    ticker.start()
+    clock.advance(180)
+
+    assert result == [(utc(2023, 12, 31, 23, 59), '31/12/2023 23:59'),
+                      (utc(2024, 1, 1, 0, 0),     '01/01/2024 00:00'),
+                      (utc(2024, 1, 1, 0, 1),     '01/01/2024 00:01')]
+
+@pytest.mark.parametrize('day, texts', [(26, ['01:59', '03:00', '03:01']), (29, ['02:59', '02:00', '02:01'])])
+def test_ticker_follows_dst_changes(qapp, timezone, day, texts):
+    # Paris changes its offset at 01:00 UTC, forward in March and backward in October
+    timezone('Europe/Paris')
+    month  = 3 if day == 26 else 10
+    clock  = clocksource.VirtualClock(utc(2023, month, day, 0, 58, 30))
+    ticker = Ticker('hh:mm', clock=clock)
+    result = ticks(ticker, clock, ticker.fmt)
+    ticker.start()
+    clock.advance(180)
+
+    assert [text for _, text in result] == texts
+    assert [t for t, _ in result] == [utc(2023, month, day, 0, 59), utc(2023, month, day, 1, 0), utc(2023, month, day, 1, 1)]
+
+def test_ticker_catches_up_after_setTime(qapp, timezone):
+    timezone('UTC')
+    clock   = clocksource.VirtualClock(START)
+    ticker  = Ticker('hh:mm', clock=clock)
+    result  = ticks(ticker, clock, ticker.fmt)
+    changes = []
+    ticker.clockChanged.connect(lambda: changes.append(clock.time()))
+    ticker.start()
+
+    # The string is shown again at once when the wall clock jumps, forward or backward, then on the new minute boundaries
+    for jump in [5*3600 + 17, -86400]:
+        del result[:]
+        now = clock.time() + jump
+        clock.setTime(now)
+        assert changes[-1] == now
+        assert result == [(now, timing.formatTime('hh:mm', timing.localMs(now)))]
+
+        clock.advance(120)
+        assert [t%60 for t, _ in result[1:]] == [0, 0]
+
+    assert len(changes) == 2
+
+def test_ticker_watched_zones(qapp, timezone):
+    # A zone with a 30 min offset changes its hour at half past in UTC
+    timezone('UTC')
+    clock  = clocksource.VirtualClock(utc(2023, 11, 14, 22, 0, 0.25))
+    ticker = Ticker(None, clock=clock)
+    times  = []
+    ticker.tick.connect(lambda: times.append(clock.time()))
+    ticker.watch('hh', b'Asia/Kolkata')
+    ticker.start()
+    clock.advance(3*3600)
+
+    assert times == [utc(2023, 11, 14, h, 30) for h in [22, 23]] + [utc(2023, 11, 15, 0, 30)]
+
+def test_ticker_unwatch_rearms(qapp, timezone):
+    timezone('UTC')
+    clock  = clocksource.VirtualClock(utc(2023, 11, 14, 22, 0, 0.25))
+    ticker = Ticker('hh', clock=clock)
+    times  = []
+    ticker.tick.connect(lambda: times.append(clock.time()))
+    ticker.watch('hh', b'Asia/Kolkata')
+    ticker.start()
+
+    # The wakeup at half past, only needed by the removed zone, is dropped
+    ticker.unwatch('hh', b'Asia/Kolkata')
+    clock.advance(3600)
+    assert times == [utc(2023, 11, 14, 23)]
+
+    # With no format left the timer is stopped, and watching a format arms it again
+    ticker.setFormat(None)
+    clock.advance(3600)
+    assert times == [utc(2023, 11, 14, 23)]
+    assert ticker.isActive() and not ticker.timer.isActive()
+
+    ticker.watch('hh:mm')
+    clock.advance(60)
+    assert times == [utc(2023, 11, 14, 23), utc(2023, 11, 15, 0, 1)]
+
+##############################################
+#                  Blinker                   #
+##############################################
+
+def test_blinker_levels(qapp):
+    clock   = clocksource.VirtualClock(START)
+    blinker = Blinker(clock=clock)
+    levels  = []
+    blinker.level.connect(lambda level: levels.append((clock.boottime_ns()//1000000, level)))
+    blinker.finished.connect(lambda: levels.append((clock.boottime_ns()//1000000, None)))
+
+    # A single cycle starts at once and finishes at the end of the period
+    blinker.start(BlinkSchedule(1000, 100, 3), once=True)
+    clock.advance(5)
+    assert levels == [(0, 1), (100, 0), (200, 1), (300, 0), (400, 1), (500, 0), (1000, None)]
+    assert not blinker.isActive()
+
+def test_blinker_phase_does_not_drift(qapp):
+    # Flashes stay on the monotonic grid for a day, whatever happens to the wall clock
+    clock   = clocksource.VirtualClock(START)
+    blinker = Blinker(clock=clock)
+    shown   = []
+    blinker.level.connect(lambda level: level and shown.append(clock.boottime_ns()//1000000))
+    blinker.start(BlinkSchedule(60000, 100, 3))
+
+    clock.advance(12*3600)
+    clock.setTime(START - 86400)
+    blinker.resync()
+    clock.advance(12*3600 - 1)
+
+    assert len(shown) == 3*(24*60 - 1)
+    assert {t%60000 for t in shown} == {0, 200, 400}
+
+##############################################
+#                ChronoTicker                #
+##############################################
+
+def test_chrono_ticker_countdown(qapp):
+    clock  = clocksource.VirtualClock(START)
+    timer  = chrono.Chrono('countdown', 5000, clock=clock.boottime_ns)
+    ticker = ChronoTicker(clock=clock)
+    texts  = []
+    ticker.tick.connect(lambda: texts.append((clock.boottime_ns()//1000000, timer.text('hh:mm:ss'))))
+    ticker.setChrono(timer, 'hh:mm:ss')
+
+    clock.advance(0.3)
+    timer.start()
+    ticker.start()
+    clock.advance(10)
+
+    # Remaining times are rounded up, so zero is only shown when the time is over, after which the scheduler stops
+    assert texts == [(1300 + 1000*i, '00:00:%02d' %(4 - i)) for i in range(5)]
+    assert not ticker.isActive()
+
+def test_chrono_ticker_pause(qapp):
+    clock  = clocksource.VirtualClock(START)
+    timer  = chrono.Chrono('stopwatch', clock=clock.boottime_ns)
+    ticker = ChronoTicker(clock=clock)
+    ticker.setChrono(timer, 'mm:ss')
+    timer.start()
+    ticker.start()
+
+    assert clock.advance(3.5) == 3
+    timer.pause()
+    clock.advance(0.7)
+    assert not ticker.isActive()
+
+    # The value goes on from where it was paused
+    clock.advance(60)
+    timer.start()
+    ticker.start()
+    clock.advance(0.6)
+    assert timer.text('mm:ss') == '00:04'
+
+##############################################
+#               ReminderTicker               #
+##############################################
+
+def test_reminders_fire_on_time(qapp, timezone):
+    timezone('Europe/Paris')
+    clock   = clocksource.VirtualClock(utc(2023, 3, 25, 10, 0))
+    ticker  = ReminderTicker(clock=clock)
+    fired   = []
+    ticker.fired.connect(lambda item: fired.append((item.at, clock.time())))
+
+    # Daily reminders are given in local time, across the DST change
+    ticker.add(reminder.parse('12:00'))
+    ticker.add(reminder.parse('2023-03-25 12:30:00'))
+    num     = ticker.add(reminder.parse(':45'))
+    clock.advance(3000)
+    ticker.cancel(num)
+    clock.advance(2*86400)
+
+    assert fired == [(':45', utc(2023, 3, 25, 10, 45)),
+                     ('12:00', utc(2023, 3, 25, 11, 0)),
+                     ('2023-03-25 12:30:00', utc(2023, 3, 25, 11, 30)),
+                     ('12:00', utc(2023, 3, 26, 10, 0)),
+                     ('12:00', utc(2023, 3, 27, 10, 0))]
+
+def test_reminders_after_setTime(qapp, timezone):
+    timezone('UTC')
+    clock   = clocksource.VirtualClock(utc(2023, 11, 14, 10, 0))
+    ticker  = ReminderTicker(clock=clock)
+    fired   = []
+    ticker.fired.connect(lambda item: fired.append((item.at, clock.time())))
+    ticker.add(reminder.parse(':30'))
+    ticker.add(reminder.parse('12:00'))
+
+    # Reminders missed by a forward jump fire once at once
+    clock.setTime(utc(2023, 11, 14, 12, 10))
+    assert fired == [(':30', utc(2023, 11, 14, 12, 10)), ('12:00', utc(2023, 11, 14, 12, 10))]
+
+    # After a backward jump the next occurrences are computed again
+    del fired[:]
+    clock.setTime(utc(2023, 11, 14, 8, 50))
+    clock.advance(3600)
+    assert fired == [(':30', utc(2023, 11, 14, 9, 30))]
+
+##############################################
+#                   Speed                    #
+##############################################
+
+def test_simulated_timers(qapp, tmp_path, monkeypatch):
+    # Guards against changes waking the clock up more often: 24 timers/h for the blinking and the minutes, and one more for
+    # each of the 4 hidden phases per hour to wake up before the clock is shown. The simulated hours per second depend on
+    # the machine, they are measured by benchmark.run instead.
+    import benchmark
+
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    results = benchmark.simulate(hours=200)
+
+    assert results['simulated_timers_per_h'] == pytest.approx(28, abs=0.05)
+
+##############################################
+#                Hibernation                 #
+##############################################
+
+def blinkLevels(hibernate, hours=1):
+    '''Levels emitted by a blinker with a 2 min period, with the monotonic time in ms at which they are emitted.'''
+
+    clock   = clocksource.VirtualClock(START)
+    blinker = Blinker(clock=clock, hibernate=hibernate)
+    levels  = []
+    events  = []
+    blinker.level.connect(lambda level: levels.append((clock.boottime_ns()//1000000, level)))
+    blinker.hibernating.connect(lambda: events.append('hibernating'))
+    blinker.waking.connect(lambda: events.append('waking'))
+
+    blinker.start(BlinkSchedule(120000, 100, 3, fade=40))
+    fired   = clock.advance(hours*3600)
+    blinker.stop()
+    return levels, events, fired
+
+def test_hibernation_keeps_the_blinking_levels(qapp):
+    levels, events, fired   = blinkLevels(True)
+    ref, refEvents, refFired = blinkLevels(False)
+
+    assert levels == ref
+    assert events == ['hibernating', 'waking']*30
+    assert refEvents == []
+
+    # Each long hidden phase costs one more wakeup, shortly before the clock is shown
+    assert fired == refFired + 30
+
+def test_opacity_across_hibernation(qapp, tmp_path, monkeypatch):
+    import setup
+    import TopWatch
+    from   PyQt5.QtCore import QTime
+
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+
+    def opacities(hibernate):
+        clock   = clocksource.VirtualClock(START)
+        app     = TopWatch.App(setup.check(dict(setup.DEFAULT)), clock=clock)
+        app.autosave.enabled  = False
+        app.blinker.hibernate = hibernate
+        qapp.processEvents()
+
+        result  = []
+        sleeps  = []
+        app.blinker.level.connect(lambda level: result.append((clock.boottime_ns(), app.label.opacity())))
+        app.blinker.hibernating.connect(lambda: sleeps.append(clock.boottime_ns()))
+        app.start_blink(100, QTime(0, 2, 0), 3)
+        clock.advance(600)
+        app.stopBlink()
+        app.close()
+        assert len(sleeps) == (5 if hibernate else 0)
+        return result
+
+    result  = opacities(True)
+    assert result == opacities(False)
+    assert {opacity for _, opacity in result} == {0, 1}
@@ -0,0 +1,69 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the time format utilities and of the number of wakeups of the scheduler.
+"""
+
+import pytest
+
+import timing
+import clocksource
+from   ticker import Ticker
+
+# A time which is not on a second boundary, 2023-11-14 22:13:20.250 UTC
+START = 1700000000.25
+
+@pytest.mark.parametrize('fmt, step', [('hh:mm', 60000), ('hh:mm:ss', 1000), ('hh:mm:ss.T', 100), ('hh:mm:ss.zzz', 1),
+                                       ('h AP', 3600000), ('dd/MM/yyyy', 86400000), ("hh:mm 'ss'", 60000),
+                                       ("'hh:mm'", None)])
+def test_granularity(fmt, step):
+    assert timing.granularity(fmt) == step
+
+def test_msToNextChange_at_boundaries():
+    # Exactly on a boundary, the next change is a whole step later
+    assert timing.msToNextChange('hh:mm', 1700000040.0, offset=0) == 60000
+    assert timing.msToNextChange('hh:mm:ss', 1700000040.0, offset=0) == 1000
+
+    # The local time is floored to the ms, so the boundary is never reached early
+    assert timing.msToNextChange('hh:mm', 1700000039.9995, offset=0) == 1
+    assert timing.msToNextChange('hh:mm', 1700000039.001, offset=0) == 999
+    assert timing.msToNextChange("'text'", 1700000040.0, offset=0) is None
+
+def test_msToNextChange_follows_offset():
+    # With a 30 min offset, hours change at half past in UTC
+    assert timing.msToNextChange('hh', 1700000000.0, offset=1800) == 3600000 - (1700000000 + 1800)%3600*1000
+    assert timing.nextChange('hh', 1700000000.0, offset=1800)%3600 == 1800
+
+@pytest.mark.parametrize('fmt, rate', [('hh:mm', 1), ('hh:mm:ss', 60), ("hh:mm 'ss'", 1), ("'hh:mm:ss'", 0)])
+def test_wakeupsPerMinute(fmt, rate):
+    assert timing.wakeupsPerMinute(fmt, start=START) == pytest.approx(rate)
+
+def test_wakeupsPerMinute_just_after_boundary():
+    # Waking up 0.1 ms after a boundary must not count the same change twice
+    assert timing.wakeupsPerMinute('hh:mm', start=1700000040.0001, duration=600) == pytest.approx(1)
+
+def test_ticker_wakes_up_once_per_minute(qapp, timezone):
+    timezone('UTC')
+    clock  = clocksource.VirtualClock(START)
+    ticker = Ticker('hh:mm', clock=clock)
+    ticks  = []
+    ticker.tick.connect(lambda: ticks.append(clock.time()))
+    ticker.start()
+
+    clock.advance(3600)
+    assert ticker.wakeups == 60
+    assert ticker.wakeupRate() == pytest.approx(1)
+
+    # Every tick is on a minute boundary, each one showing a new minute
+    assert all(t%60 == 0 for t in ticks)
+    texts  = [timing.formatTime('hh:mm', timing.localMs(t)) for t in ticks]
+    assert len(set(texts)) == len(texts)
+
+def test_ticker_follows_seconds(qapp, timezone):
+    timezone('UTC')
+    clock  = clocksource.VirtualClock(START)
+    ticker = Ticker('hh:mm:ss', clock=clock)
+    ticker.start()
+
+    clock.advance(60)
+    assert ticker.wakeups == 60
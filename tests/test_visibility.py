@@ -0,0 +1,69 @@
+"""
+Mercier Wilfried - IRAP
+
+Tests of the tracking of whether clocks can be seen.
+"""
+
+from   PyQt5.QtCore import QObject, pyqtSignal
+
+from   visibility import Visibility
+
+class Clock(QObject):
+    '''Clock with an opacity, as glyphs.GlyphText.'''
+
+    opacityChanged = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self._opacity = 1
+
+    def opacity(self):
+        return self._opacity
+
+    def setOpacity(self, value):
+        self._opacity = value
+        self.opacityChanged.emit()
+
+def test_exposed_and_hidden_transitions(qapp):
+    from   PyQt5.QtWidgets import QWidget
+
+    window     = QWidget()
+    window.show()
+    qapp.processEvents()
+
+    clock      = Clock()
+    refreshes  = []
+    changes    = []
+    visibility = Visibility()
+    visibility.exposedChanged.connect(lambda exposed: changes.append(('exposed', exposed)))
+    visibility.seenChanged.connect(lambda seen: changes.append(('seen', seen)))
+    visibility.add(window, clock, lambda: refreshes.append(visibility.seen(window)))
+    assert visibility.exposed(window) and visibility.seen(window)
+
+    # A transparent clock is exposed but not seen
+    clock.setOpacity(0)
+    assert visibility.exposed(window) and not visibility.seen(window)
+    clock.setOpacity(1)
+    assert refreshes == [True]
+
+    # A hidden window is neither exposed nor seen, and catches up once when shown again
+    window.hide()
+    qapp.processEvents()
+    assert not visibility.anyExposed() and not visibility.anySeen()
+    window.show()
+    qapp.processEvents()
+    assert visibility.anyExposed() and visibility.anySeen()
+    assert refreshes == [True, True]
+
+    # The screen saver hides every window
+    visibility._screenSaverActive(True)
+    assert not visibility.exposed(window)
+    visibility._screenSaverActive(False)
+
+    assert changes == [('seen', False), ('seen', True), ('exposed', False), ('seen', False), ('exposed', True),
+                       ('seen', True), ('exposed', False), ('seen', False), ('exposed', True), ('seen', True)]
+
+    # Windows not tracked are considered seen
+    visibility.remove(window)
+    assert visibility.seen(window)
+    window.close()
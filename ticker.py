@@ -0,0 +1,689 @@
+"""
+Mercier Wilfried - IRAP
+
+Schedulers waking the application up only when what is displayed changes.
+"""
+
+import time
+from   math         import ceil
+from   collections  import deque
+from   PyQt5.QtCore import QObject, QTimeZone, QDateTime, pyqtSignal
+
+# Own imports
+import timing
+import stats
+import clocksource
+from   reminder     import ReminderQueue
+from   blink        import Blinking
+
+
+class Ticker(QObject):
+    '''
+    Single shot timer armed at the next instant the time string, formatted with a given Qt format, changes.
+
+    The timer is re-armed from the wall clock after each fire, so that timer drifts never accumulate. Other clocks, possibly
+    in other time zones, can share the same scheduler by watching their own format, the timer being armed at the earliest
+    change among all of them.
+
+    In precise mode, the timer is armed slightly before the change and the remaining time is slept, so that the tick is
+    emitted within a fraction of a ms of the change. The sleep blocks the GUI thread for up to LEAD ms at every tick, that is
+    up to 0.2% of the time when showing seconds and 2% when showing tenths of second, during which input and repaints wait.
+    This is why the mode is off by default.
+
+    The timer is armed at the wall clock time of the change (see clocksource.py), and a tick is emitted at once when the
+    wall clock is set or the machine resumes from suspend.
+    '''
+
+    tick         = pyqtSignal()
+
+    # Emitted when the wall clock was set or the machine resumed from suspend
+    clockChanged = pyqtSignal()
+
+    # Time in ms by which the timer is armed before the change in precise mode
+    LEAD = 2
+
+    def __init__(self, fmt='hh:mm', precise=False, parent=None, clock=None, *args, **kwargs):
+        '''
+        Initialize the scheduler.
+
+        Parameters
+        ----------
+            fmt : str
+                Qt time format of the displayed string. If None, only the watched formats are followed.
+            precise : bool
+                whether to use the precise mode
+            parent : QObject
+                parent object
+            clock : clocksource.SystemClock or clocksource.VirtualClock
+                clock giving the time and the timers. If None, the system clock is used.
+        '''
+
+        super().__init__(parent)
+
+        self.clock    = clock or clocksource.SYSTEM
+        self.fmt      = fmt
+        self.precise  = precise
+
+        # Latest measured lateness of the ticks with respect to the changes, in ms
+        self.lateness = deque(maxlen=100)
+
+        # Formats watched by other clocks, as (format, time zone id) with the number of clocks watching them
+        self.watched = {}
+        self._zones  = {}
+
+        # Number of wakeups and time of the first one, used to compute the wakeup rate
+        self.wakeups = 0
+        self._t0     = None
+
+        # Wall clock time of the next change
+        self._due    = None
+
+        # Whether the scheduler follows the formats, the timer being stopped while none of them depends on time
+        self.running = False
+
+        self.timer   = self.clock.wallTimer(self)
+        self.timer.timeout.connect(self._fire)
+        self.timer.clockChanged.connect(self._clockChanged)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def start(self, *args, **kwargs):
+        '''Start the scheduler.'''
+
+        self.wakeups = 0
+        self._t0     = self.clock.boottime_ns()
+        self.running = True
+        self._arm()
+        return
+
+    def stop(self, *args, **kwargs):
+        '''Stop the scheduler.'''
+
+        self.running = False
+        self.timer.stop()
+        return
+
+    def close(self, *args, **kwargs):
+        '''Stop the scheduler for good, releasing its timer.'''
+
+        self.timer.close()
+        return
+
+    def isActive(self, *args, **kwargs):
+        '''Whether the scheduler is running.'''
+
+        return self.running
+
+    def pause(self, *args, **kwargs):
+        '''Stop waking up until resume is called, e.g. while nothing can be seen.'''
+
+        self.running = False
+        self.timer.stop()
+        self._due    = None
+        return
+
+    def resume(self, *args, **kwargs):
+        '''Re-arm the timer from the wall clock after a pause, without resetting the wakeup count.'''
+
+        if not self.running:
+            self.running = True
+            self._arm()
+        return
+
+    def setFormat(self, fmt, *args, **kwargs):
+        '''
+        Change the format of the displayed string and re-arm the timer accordingly.
+
+        Parameters
+        ----------
+            fmt : str
+                Qt time format. If None, only the watched formats are followed.
+        '''
+
+        self.fmt = fmt
+        if self.running:
+            self._arm()
+        return
+
+    def setPrecise(self, precise, *args, **kwargs):
+        '''
+        Enable or disable the precise mode.
+
+        Parameters
+        ----------
+            precise : bool
+                whether to use the precise mode
+        '''
+
+        self.precise = precise
+        self.lateness.clear()
+        if self.running:
+            self._arm()
+        return
+
+    def latenessSummary(self, *args, **kwargs):
+        '''Mean and maximum lateness in ms of the latest ticks, and the number of ticks they are computed from.'''
+
+        if not self.lateness:
+            return None, None, 0
+
+        return sum(self.lateness)/len(self.lateness), max(self.lateness), len(self.lateness)
+
+    def watch(self, fmt, zone=None, *args, **kwargs):
+        '''
+        Also wake up when a string formatted with another format, possibly in another time zone, changes.
+
+        Parameters
+        ----------
+            fmt : str
+                Qt time format
+            zone : bytes
+                IANA time zone id (e.g. b'Europe/Paris'). If None, the local time zone is used.
+        '''
+
+        key               = (fmt, zone)
+        self.watched[key] = self.watched.get(key, 0) + 1
+
+        if zone is not None and zone not in self._zones:
+            self._zones[zone] = QTimeZone(zone)
+
+        if self.running:
+            self._arm()
+        return
+
+    def unwatch(self, fmt, zone=None, *args, **kwargs):
+        '''
+        Stop watching a format given with watch.
+
+        Parameters
+        ----------
+            fmt : str
+                Qt time format
+            zone : bytes
+                IANA time zone id. If None, the local time zone is used.
+        '''
+
+        key                   = (fmt, zone)
+        if key in self.watched:
+            self.watched[key] -= 1
+            if self.watched[key] <= 0:
+                del self.watched[key]
+
+                # The timer may have been armed for this format only
+                if self.running:
+                    self._arm()
+        return
+
+    def wakeupRate(self, *args, **kwargs):
+        '''Measured number of wakeups per minute since the scheduler was started.'''
+
+        if self._t0 is None:
+            return 0
+
+        elapsed = (self.clock.boottime_ns() - self._t0)/1000000000
+        if elapsed <= 0:
+            return 0
+
+        return 60*self.wakeups/elapsed
+
+    def _arm(self, *args, **kwargs):
+        '''Arm the timer at the next change of the displayed string.'''
+
+        now   = self.clock.time()
+        dues  = [] if self.fmt is None else [timing.nextChange(self.fmt, now)]
+
+        if self.watched:
+            utc   = QDateTime.fromMSecsSinceEpoch(int(now*1000))
+            for fmt, zone in self.watched:
+                offset = None if zone is None else self._zones[zone].offsetFromUtc(utc)
+                dues.append(timing.nextChange(fmt, now, offset=offset))
+
+        dues  = [d for d in dues if d is not None]
+        if not dues:
+            self.timer.stop()
+            self._due = None
+            return
+
+        self._due = min(dues)
+        if self.precise:
+            self.timer.start(self._due - self.LEAD/1000)
+        else:
+            self.timer.start(self._due)
+        return
+
+    def _fire(self, *args, **kwargs):
+        '''Emit the tick signal and re-arm the timer.'''
+
+        self.wakeups += 1
+
+        if self._due is not None:
+            if self.precise:
+                remaining = self._due - self.clock.time()
+                if remaining > 0:
+                    self.clock.sleep(remaining)
+
+            late = (self.clock.time() - self._due)*1000
+            self.lateness.append(late)
+            if stats.RECORDER is not None:
+                stats.RECORDER.add('ticker.lateness', late)
+
+        self.tick.emit()
+        self._arm()
+        return
+
+    def _clockChanged(self, *args, **kwargs):
+        '''Catch up with the new wall clock time and re-arm the timer, or keep it stopped if it was.'''
+
+        # The time zone may have changed as well
+        time.tzset()
+
+        if stats.RECORDER is not None:
+            stats.RECORDER.count('clock.changes')
+
+        self.clockChanged.emit()
+        if self.running:
+            self._due = None
+            self.tick.emit()
+            self._arm()
+        else:
+            self.timer.stop()
+        return
+
+class Blinker(QObject):
+    '''
+    Single shot timer following a blinking schedule.
+
+    Levels are computed by a blink.Blinking anchored to a clock which keeps running during suspend, so that the blinking
+    phase never drifts, however long it runs. Call resync after the machine resumed from suspend.
+
+    When the clock stays hidden for a long time, hibernating is emitted so that resources can be released, and waking is
+    emitted shortly before it is shown again so that they are ready in time.
+    '''
+
+    level       = pyqtSignal(float)
+
+    # Emitted when a single cycle is over (see start)
+    finished    = pyqtSignal()
+
+    # Emitted at the start of a long hidden phase, and shortly before its end or when blinking stops during it
+    hibernating = pyqtSignal()
+    waking      = pyqtSignal()
+
+    # Duration in ms of a hidden phase from which hibernating is emitted, and time in ms before its end waking is emitted
+    HIBERNATE   = 30000
+    PREWARM     = 1000
+
+    def __init__(self, parent=None, clock=None, hibernate=True, *args, **kwargs):
+        '''
+        Initialize the blinking engine.
+
+        Parameters
+        ----------
+            parent : QObject
+                parent object
+            clock : clocksource.SystemClock or clocksource.VirtualClock
+                clock giving the time and the timer. If None, the system clock is used.
+            hibernate : bool
+                whether hibernating and waking are emitted around long hidden phases
+        '''
+
+        super().__init__(parent)
+
+        self.clock     = clock or clocksource.SYSTEM
+        self.blinking  = None
+        self._level    = None
+
+        self.hibernate = hibernate
+
+        # Whether a long hidden phase is going on
+        self.asleep    = False
+
+        # Monotonic time in ns at which the timer is expected to fire, only used by the instrumentation
+        self._due      = None
+
+        self.timer     = self.clock.timer(self)
+        self.timer.timeout.connect(self._fire)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def start(self, schedule, once=False, *args, **kwargs):
+        '''
+        Start blinking. The first cycle starts one period later, or at once if a single cycle is run.
+
+        Parameters
+        ----------
+            schedule : blink.BlinkSchedule
+                compiled blinking schedule
+            once : bool
+                whether to only run a single cycle, starting at once, and emit finished when it is over
+        '''
+
+        self.blinking = Blinking(schedule, self.clock.boottime_ns(), once=once)
+        self._level   = None
+        self._due     = None
+        self._fire()
+        return
+
+    def stop(self, *args, **kwargs):
+        '''Stop blinking.'''
+
+        self.timer.stop()
+        self.blinking = None
+        self._wake()
+        return
+
+    def isActive(self, *args, **kwargs):
+        '''Whether blinking is running.'''
+
+        return self.timer.isActive()
+
+    def pause(self, *args, **kwargs):
+        '''Stop waking up until resume is called. The blinking phase is kept since it is anchored to the monotonic clock.'''
+
+        self.timer.stop()
+        return
+
+    def resync(self, *args, **kwargs):
+        '''Emit the level at the current time if blinking is running, e.g. after the machine resumed from suspend.'''
+
+        if self.timer.isActive():
+            self.timer.stop()
+            self._due = None
+            self._fire()
+        return
+
+    def refresh(self, *args, **kwargs):
+        '''Emit the level at the current time even if it did not change, e.g. after the opacity was set by something else.'''
+
+        if self.timer.isActive():
+            self.timer.stop()
+            self._level = None
+            self._due   = None
+            self._fire()
+        return
+
+    def resume(self, *args, **kwargs):
+        '''Emit the level at the current time and follow the schedule again after a pause.'''
+
+        if self.blinking is not None and not self.timer.isActive():
+            self._level = None
+            self._due   = None
+            self._fire()
+        return
+
+    def _fire(self, *args, **kwargs):
+        '''Emit the current opacity level if it changed and re-arm the timer.'''
+
+        now          = self.clock.boottime_ns()
+        if self.blinking.finished(now):
+            self.stop()
+            self.finished.emit()
+            return
+
+        level, delay = self.blinking.at(now)
+
+        rec          = stats.RECORDER
+        if rec is not None and self._due is not None:
+            rec.add('blinker.lateness', (now - self._due)/1000000)
+
+            # Lateness of a flash being shown or hidden is the drift of the blinking phase
+            if level != self._level and level in (0, 1):
+                rec.add('blink.drift', (now - self._due)/1000000)
+
+        if level != self._level:
+            self._level = level
+            self.level.emit(level)
+
+        # Long hidden phases are slept through in two steps, the last one ending shortly before the clock is shown
+        if self.hibernate and level == 0 and not self.blinking.once and delay > self.HIBERNATE:
+            if not self.asleep:
+                self.asleep = True
+                self.hibernating.emit()
+            delay   -= self.PREWARM
+        else:
+            self._wake()
+
+        # Rounding up ensures the timer never fires before the next keyframe
+        delay        = max(1, ceil(delay))
+        self.timer.start(delay)
+        if rec is not None:
+            self._due = now + delay*1000000
+        return
+
+    def _wake(self, *args, **kwargs):
+        '''Emit waking if a long hidden phase was going on.'''
+
+        if self.asleep:
+            self.asleep = False
+            self.waking.emit()
+        return
+
+class ChronoTicker(QObject):
+    '''
+    Single shot timer armed at the next change of the value shown by a countdown, stopwatch or interval timer.
+
+    The delay is computed from the start point of the timer after each fire, so that timer drifts never accumulate.
+    '''
+
+    tick = pyqtSignal()
+
+    def __init__(self, parent=None, clock=None, *args, **kwargs):
+        '''
+        Initialize the scheduler.
+
+        Parameters
+        ----------
+            parent : QObject
+                parent object
+            clock : clocksource.SystemClock or clocksource.VirtualClock
+                clock giving the timer, the time being given by the followed timer. If None, the system clock is used.
+        '''
+
+        super().__init__(parent)
+
+        self.clock  = clock or clocksource.SYSTEM
+        self.chrono = None
+        self.fmt    = None
+
+        # Time in ns at which the timer is expected to fire, only used by the instrumentation
+        self._due   = None
+
+        self.timer  = self.clock.timer(self)
+        self.timer.timeout.connect(self._fire)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def setChrono(self, chrono, fmt, *args, **kwargs):
+        '''
+        Follow a timer. The scheduler is stopped and must be started again.
+
+        Parameters
+        ----------
+            chrono : chrono.Chrono
+                timer to follow, or None
+            fmt : str
+                format of the displayed value
+        '''
+
+        self.timer.stop()
+        self.chrono = chrono
+        self.fmt    = fmt
+        return
+
+    def start(self, *args, **kwargs):
+        '''Start the scheduler. It stops by itself when the timer is paused or finished.'''
+
+        self._arm()
+        return
+
+    def stop(self, *args, **kwargs):
+        '''Stop the scheduler.'''
+
+        self.timer.stop()
+        return
+
+    def isActive(self, *args, **kwargs):
+        '''Whether the scheduler is running.'''
+
+        return self.timer.isActive()
+
+    def resync(self, *args, **kwargs):
+        '''Emit a tick and re-arm the timer if the scheduler is running, e.g. after the machine resumed from suspend.'''
+
+        if self.timer.isActive():
+            self.timer.stop()
+            self.tick.emit()
+            self._arm()
+        return
+
+    def _arm(self, *args, **kwargs):
+        '''Arm the timer at the next change of the displayed value.'''
+
+        if self.chrono is None:
+            return
+
+        now   = self.chrono.clock()
+        delay = self.chrono.msToNextChange(self.fmt, now)
+        if delay is None:
+            return
+
+        self.timer.start(delay)
+        if stats.RECORDER is not None:
+            self._due = now + delay*1000000
+        return
+
+    def _fire(self, *args, **kwargs):
+        '''Emit the tick signal and re-arm the timer.'''
+
+        if stats.RECORDER is not None and self._due is not None:
+            stats.RECORDER.add('chrono.lateness', (self.chrono.clock() - self._due)/1000000)
+
+        self.tick.emit()
+        self._arm()
+        return
+
+class ReminderTicker(QObject):
+    '''
+    Single timer armed at the time the earliest reminder fires (see reminder.ReminderQueue).
+
+    The timer is armed at the wall clock time of the reminder (see clocksource.py). When the wall clock is set or the
+    machine resumes from suspend, missed reminders are fired once and the next occurrences are computed again.
+    '''
+
+    # Reminder which fired
+    fired = pyqtSignal(object)
+
+    def __init__(self, parent=None, clock=None, *args, **kwargs):
+        '''
+        Initialize the scheduler.
+
+        Parameters
+        ----------
+            parent : QObject
+                parent object
+            clock : clocksource.SystemClock or clocksource.VirtualClock
+                clock giving the time and the timer. If None, the system clock is used.
+        '''
+
+        super().__init__(parent)
+
+        self.clock = clock or clocksource.SYSTEM
+        self.queue = ReminderQueue()
+
+        # Wall clock time at which the timer is expected to fire, only used by the instrumentation
+        self._due  = None
+
+        self.timer = self.clock.wallTimer(self)
+        self.timer.timeout.connect(self._fire)
+        self.timer.clockChanged.connect(self._clockChanged)
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def add(self, reminder, *args, **kwargs):
+        '''
+        Add a reminder.
+
+        Parameters
+        ----------
+            reminder : reminder.Reminder
+                reminder to add
+
+        Return the reminder number, or None if it will never fire.
+        '''
+
+        num = self.queue.add(reminder, now=self.clock.time())
+        self._arm()
+        return num
+
+    def cancel(self, num, *args, **kwargs):
+        '''
+        Cancel a reminder.
+
+        Parameters
+        ----------
+            num : int
+                reminder number given by add
+
+        Return whether the reminder was pending.
+        '''
+
+        ok = self.queue.cancel(num)
+        self._arm()
+        return ok
+
+    def clear(self, *args, **kwargs):
+        '''Cancel every reminder.'''
+
+        self.queue.clear()
+        self._arm()
+        return
+
+    def close(self, *args, **kwargs):
+        '''Stop firing reminders for good, releasing the timer.'''
+
+        self.timer.close()
+        return
+
+    def _arm(self, *args, **kwargs):
+        '''Arm the timer at the time the earliest reminder fires, or stop it if there is none.'''
+
+        self._due = self.queue.next()
+        if self._due is None:
+            self.timer.stop()
+        else:
+            self.timer.start(self._due)
+        return
+
+    def _fire(self, *args, **kwargs):
+        '''Emit the due reminders and re-arm the timer.'''
+
+        now = self.clock.time()
+        rec = stats.RECORDER
+        if rec is not None and self._due is not None:
+            rec.add('reminder.lateness', (now - self._due)*1000)
+
+        for reminder in self.queue.pop(now):
+            self.fired.emit(reminder)
+        self._arm()
+        return
+
+    def _clockChanged(self, *args, **kwargs):
+        '''Fire missed reminders once and compute the next occurrences again after a wall clock discontinuity.'''
+
+        time.tzset()
+        self._due = None
+        now       = self.clock.time()
+        for reminder in self.queue.pop(now):
+            self.fired.emit(reminder)
+
+        self.queue.reschedule(now)
+        self._arm()
+        return
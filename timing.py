@@ -0,0 +1,220 @@
+"""
+Mercier Wilfried - IRAP
+
+Time format utilities used to know when the displayed time string will change.
+"""
+
+import re
+import time
+import calendar
+
+# Token, in addition to the Qt ones, replaced by the tenth of second
+TENTHS = 'T'
+
+# Step (in ms) associated to each format character, from the smallest to the largest
+_STEPS = [('z', 1),
+          (TENTHS, 100),
+          ('s', 1000),
+          ('m', 60000),
+          ('hHaA', 3600000),
+          ('dMy', 86400000)
+         ]
+
+def granularity(fmt, *args, **kwargs):
+    '''
+    Smallest amount of time (in ms) after which a string formatted with the given Qt format can change.
+
+    Parameters
+    ----------
+        fmt : str
+            Qt time format (e.g. 'hh:mm', 'hh:mm:ss', 'hh:mm:ss.T' or 'h:mm AP')
+
+    Return the step in ms or None if the format does not depend on time.
+    '''
+
+    # Quoted text is displayed as is
+    fmt = re.sub(r"'[^']*'", '', fmt)
+
+    for chars, step in _STEPS:
+        if any(c in fmt for c in chars):
+            return step
+    return None
+
+def expand(fmt, ms, *args, **kwargs):
+    '''
+    Replace the tenth of second token (outside quoted text) by its value so that the format can be given to Qt.
+
+    Parameters
+    ----------
+        fmt : str
+            time format
+        ms : int
+            milliseconds of the time to format
+    '''
+
+    if TENTHS not in fmt:
+        return fmt
+
+    parts = re.split(r"('[^']*')", fmt)
+    return ''.join(p if p.startswith("'") else p.replace(TENTHS, "'%d'" %(ms//100)) for p in parts)
+
+# Tokens of a Qt time format, quoted text being displayed as is
+_FIELDS = re.compile(r"'(?:[^']|'')*'?|dddd|ddd|dd|d|MMMM|MMM|MM|M|yyyy|yy|hh|h|HH|H|mm|m|ss|s|zzz|z|[Aa][Pp]?|" + TENTHS)
+
+def formatTime(fmt, ms, *args, **kwargs):
+    '''
+    Format a local time with a Qt time format, giving the same string as QDateTime.toString without depending on Qt.
+
+    Tokens are those of Qt (d, dd, ddd, dddd, M, MM, MMM, MMMM, yy, yyyy, h, hh, H, HH, m, mm, s, ss, z, zzz, AP, A, ap and
+    a) plus T for the tenth of second, z being the fraction of second without trailing zeroes. Day and month names are those of the current locale.
+
+    Parameters
+    ----------
+        fmt : str
+            Qt time format
+        ms : int
+            local wall clock time in ms since the epoch (see localMs)
+    '''
+
+    date     = time.gmtime(ms//1000)
+    ms      %= 1000
+    hour     = date.tm_hour
+
+    # Hours are shown from 1 to 12 with h and hh when the format has an AM/PM marker
+    if any(token[0] in 'aA' for token in _FIELDS.findall(fmt)):
+        hour = hour%12 or 12
+
+    def replace(match):
+        token = match.group(0)
+        char  = token[0]
+        if char == "'":
+            text = token[1:-1] if len(token) > 1 and token.endswith("'") else token[1:]
+            return text.replace("''", "'") if text else "'"
+
+        if char in 'aA':
+            text = 'am' if date.tm_hour < 12 else 'pm'
+            return text.upper() if char == 'A' else text
+
+        if token == 'ddd':
+            return calendar.day_abbr[date.tm_wday]
+        if token == 'dddd':
+            return calendar.day_name[date.tm_wday]
+        if token == 'MMM':
+            return calendar.month_abbr[date.tm_mon]
+        if token == 'MMMM':
+            return calendar.month_name[date.tm_mon]
+        if token == 'yy':
+            return '%02d' %(date.tm_year%100)
+        if token == 'zzz':
+            return '%03d' %ms
+        if token == 'z':
+            return ('%03d' %ms).rstrip('0') or '0'
+
+        value = {'d' : date.tm_mday, 'M' : date.tm_mon, 'y' : date.tm_year, 'h' : hour, 'H' : date.tm_hour,
+                 'm' : date.tm_min, 's' : date.tm_sec, TENTHS : ms//100}[char]
+        return '%0*d' %(len(token), value)
+
+    return _FIELDS.sub(replace, fmt)
+
+def localMs(now=None, offset=None, *args, **kwargs):
+    '''
+    Local wall clock time in ms since the epoch, that is UTC time shifted by the UTC offset of the time zone.
+
+    Parameters
+    ----------
+        now : float
+            POSIX time in s. If None, the current time is used.
+        offset : int
+            UTC offset of the time zone in s. If None, the offset of the local time zone is used.
+    '''
+
+    if now is None:
+        now    = time.time()
+
+    if offset is None:
+        offset = time.localtime(now).tm_gmtoff
+
+    return int((now + offset) * 1000)
+
+def nextChange(fmt, now=None, offset=None, *args, **kwargs):
+    '''
+    POSIX time of the next change of a string formatted with the given Qt format.
+
+    Parameters
+    ----------
+        fmt : str
+            Qt time format
+        now : float
+            POSIX time in s. If None, the current time is used.
+        offset : int
+            UTC offset of the time zone in s. If None, the offset of the local time zone is used.
+
+    Return the time in s or None if the format does not depend on time.
+    '''
+
+    if now is None:
+        now    = time.time()
+
+    if offset is None:
+        offset = time.localtime(now).tm_gmtoff
+
+    step = granularity(fmt)
+    if step is None:
+        return None
+
+    return ((localMs(now, offset=offset)//step + 1)*step)/1000 - offset
+
+def msToNextChange(fmt, now=None, offset=None, *args, **kwargs):
+    '''
+    Time (in ms) until a string formatted with the given Qt format changes.
+
+    Parameters
+    ----------
+        fmt : str
+            Qt time format
+        now : float
+            POSIX time in s. If None, the current time is used.
+        offset : int
+            UTC offset of the time zone in s. If None, the offset of the local time zone is used.
+
+    Return the delay in ms (always >= 1) or None if the format does not depend on time.
+    '''
+
+    step = granularity(fmt)
+    if step is None:
+        return None
+
+    # Local time is floored to the ms so the boundary is never reached early
+    local = localMs(now, offset=offset)
+    return (local//step + 1)*step - local
+
+def wakeupsPerMinute(fmt, start=None, duration=3600, *args, **kwargs):
+    '''
+    Number of wakeups per minute needed to follow a given format when the scheduler always wakes up at the next change.
+
+    Parameters
+    ----------
+        fmt : str
+            Qt time format
+        start : float
+            POSIX time in s at which the simulation starts. If None, the current time is used.
+        duration : float
+            duration of the simulation in s
+    '''
+
+    if start is None:
+        start = time.time()
+
+    now     = start
+    nb      = 0
+    while True:
+        due = nextChange(fmt, now)
+        if due is None or due > start + duration:
+            break
+
+        # Timers fire with a ms resolution, so the wakeup happens just after the boundary. It is taken from the boundary
+        # itself so that these 0.1 ms never add up.
+        now = due + 1e-4
+        nb += 1
+
+    return 60*nb/duration
@@ -0,0 +1,230 @@
+"""
+Mercier Wilfried - IRAP
+
+Tracking of whether clocks can be seen, so that nothing is formatted nor repainted while they cannot.
+"""
+
+from   PyQt5        import sip
+from   PyQt5.QtGui  import QGuiApplication, QWindow
+from   PyQt5.QtCore import Qt, QObject, QEvent, pyqtSignal, pyqtSlot
+
+# Screen savers notifying when they are activated (screen locked or blanked), as (service, path, interface)
+SCREENSAVERS = [('org.freedesktop.ScreenSaver', '/org/freedesktop/ScreenSaver', 'org.freedesktop.ScreenSaver'),
+                ('org.gnome.ScreenSaver',       '/org/gnome/ScreenSaver',       'org.gnome.ScreenSaver')
+               ]
+
+def _handle(window, *args, **kwargs):
+    '''Native window of a top level widget, or the window itself if it is a QWindow.'''
+
+    if isinstance(window, QWindow):
+        return window
+    return window.windowHandle()
+
+class Visibility(QObject):
+    '''
+    Track whether windows showing a clock can be seen.
+
+    A window is exposed when it is shown, not minimized, exposed by the window system, on a screen, and the screen is not
+    locked or blanked by the screen saver. It is seen when it is exposed and its clock is not fully transparent.
+
+    When a window becomes seen again, its refresh function is called once so that it catches up with the current time.
+    '''
+
+    # Whether at least one window is seen, and whether at least one window is exposed
+    seenChanged    = pyqtSignal(bool)
+    exposedChanged = pyqtSignal(bool)
+
+    def __init__(self, parent=None, *args, **kwargs):
+        '''
+        Initialize the tracker.
+
+        Parameters
+        ----------
+            parent : QObject
+                parent object
+        '''
+
+        super().__init__(parent)
+
+        # Tracked windows with their clock widget, refresh function and last state as [exposed, seen]
+        self.windows      = {}
+        self._handles     = {}
+
+        self.screenSaver  = False
+        self._anySeen     = True
+        self._anyExposed  = True
+
+        app               = QGuiApplication.instance()
+        app.screenRemoved.connect(self.update)
+        self._watchScreenSaver()
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def add(self, window, clock, refresh, *args, **kwargs):
+        '''
+        Track a window. It should already be shown.
+
+        Parameters
+        ----------
+            window : QWidget or QWindow
+                top level window
+            clock : glyphs.GlyphText
+                widget showing the time in this window
+            refresh : function
+                function called when the window becomes seen again
+        '''
+
+        handle                = _handle(window)
+        if handle is None:
+            window.winId()
+            handle            = _handle(window)
+
+        self.windows[window]  = [clock, refresh, True, True]
+        self._handles[handle] = window
+
+        handle.installEventFilter(self)
+        handle.visibilityChanged.connect(self.update)
+        handle.screenChanged.connect(self.update)
+        clock.opacityChanged.connect(self.updateSeen)
+
+        self.update()
+        return
+
+    def remove(self, window, *args, **kwargs):
+        '''
+        Stop tracking a window.
+
+        Parameters
+        ----------
+            window : QWidget or QWindow
+                top level window given to add
+        '''
+
+        if window not in self.windows:
+            return
+
+        clock  = self.windows.pop(window)[0]
+        handle = _handle(window)
+        self._handles.pop(handle, None)
+
+        if handle is not None:
+            handle.removeEventFilter(self)
+            handle.visibilityChanged.disconnect(self.update)
+            handle.screenChanged.disconnect(self.update)
+        clock.opacityChanged.disconnect(self.updateSeen)
+
+        self.update()
+        return
+
+    def anyExposed(self, *args, **kwargs):
+        '''Whether at least one window is exposed.'''
+
+        return self._anyExposed
+
+    def anySeen(self, *args, **kwargs):
+        '''Whether at least one window is seen.'''
+
+        return self._anySeen
+
+    def exposed(self, window, *args, **kwargs):
+        '''Whether a window could be seen if its clock was not transparent. Windows not tracked are considered exposed.'''
+
+        if window not in self.windows:
+            return True
+
+        return self.windows[window][2]
+
+    def seen(self, window, *args, **kwargs):
+        '''Whether a window can be seen. Windows not tracked are considered seen.'''
+
+        if window not in self.windows:
+            return True
+
+        return self.windows[window][3]
+
+    def update(self, *args, **kwargs):
+        '''Update the state of every window and notify the changes.'''
+
+        # Windows being destroyed can still send events
+        for window in [w for w in self.windows if sip.isdeleted(w)]:
+            del self.windows[window]
+
+        for window, state in self.windows.items():
+            handle         = _handle(window)
+            screen         = None if handle is None else handle.screen()
+
+            state[2]       = (not self.screenSaver and window.isVisible() and handle is not None and
+                              not handle.windowState() & Qt.WindowMinimized and handle.isExposed() and
+                              screen is not None and not screen.geometry().isEmpty())
+
+        self.updateSeen()
+        return
+
+    def updateSeen(self, *args, **kwargs):
+        '''
+        Update whether every window is seen from its last exposed state and notify the changes. Called alone when only the
+        opacity of a clock changed, e.g. at every step of a blink, since it does not change whether windows are exposed.
+        '''
+
+        for window in [w for w in self.windows if sip.isdeleted(w)]:
+            del self.windows[window]
+
+        shown            = []
+        for window, state in self.windows.items():
+            clock, refresh, exposed = state[:3]
+            seen           = exposed and clock.opacity() > 0
+
+            if seen and not state[3]:
+                shown.append(refresh)
+
+            state[3]       = seen
+
+        # Catching up is done once every state is known, since it can be asked whether windows are seen
+        for refresh in shown:
+            refresh()
+
+        anyExposed       = any(state[2] for state in self.windows.values())
+        if anyExposed != self._anyExposed:
+            self._anyExposed = anyExposed
+            self.exposedChanged.emit(anyExposed)
+
+        anySeen          = any(state[3] for state in self.windows.values())
+        if anySeen != self._anySeen:
+            self._anySeen = anySeen
+            self.seenChanged.emit(anySeen)
+        return
+
+    def _watchScreenSaver(self, *args, **kwargs):
+        '''Be notified when the screen saver is activated, if D-Bus is available.'''
+
+        try:
+            from PyQt5.QtDBus import QDBusConnection
+        except ImportError:
+            return
+
+        bus = QDBusConnection.sessionBus()
+        if bus.isConnected():
+            for service, path, interface in SCREENSAVERS:
+                bus.connect(service, path, interface, 'ActiveChanged', self._screenSaverActive)
+        return
+
+    @pyqtSlot(bool)
+    def _screenSaverActive(self, active, *args, **kwargs):
+        '''Update the states when the screen saver is activated or deactivated.'''
+
+        self.screenSaver = active
+        self.update()
+        return
+
+    ##########################################
+    #               Qt methods               #
+    ##########################################
+
+    def eventFilter(self, obj, event, *args, **kwargs):
+        '''Update the states when a tracked window is exposed or hidden.'''
+
+        if obj in self._handles and event.type() in (QEvent.Expose, QEvent.Show, QEvent.Hide):
+            self.update()
+        return False
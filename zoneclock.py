@@ -0,0 +1,129 @@
+"""
+Mercier Wilfried - IRAP
+
+Additional clocks showing the time in other time zones, hosted by the main application.
+"""
+
+from   PyQt5.QtGui     import QFont
+from   PyQt5.QtCore    import Qt, QTimeZone
+
+# Own imports
+from   clockwidget     import ClockWidget
+from   drag            import DragMover
+import timing
+
+class ZoneClock(ClockWidget):
+    '''
+    Window showing the time in a given time zone.
+
+    It has no timer of its own: it is updated by the scheduler of the main application while it can be seen, and glyphs
+    are taken from the atlases shared with every other clock.
+    '''
+
+    def __init__(self, configuration, app, *args, **kwargs):
+        '''
+        Initialize the clock.
+
+        Parameters
+        ----------
+            configuration : dict
+                clock configuration with keys 'timezone', 'format', 'font', 'color', 'x', 'y' and 'opacity'
+            app : TopWatch.App
+                main application
+        '''
+
+        super().__init__('')
+
+        self.zone        = QTimeZone(configuration['timezone'].encode())
+        if not self.zone.isValid():
+            raise ValueError('Time zone %s is not a valid IANA time zone' %configuration['timezone'])
+
+        self.app         = app
+        self.timeFormat  = configuration['format']
+
+        # Opacity to go back to after blinking
+        self.baseOpacity = configuration['opacity']
+
+        self.setWindowTitle('TopWatch - %s' %configuration['timezone'])
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint | Qt.Dialog)
+        self.setAttribute(Qt.WA_NoSystemBackground, True)
+        self.setAttribute(Qt.WA_TranslucentBackground, True)
+
+        font             = QFont()
+        font.fromString(configuration['font'])
+        self.setFont(font)
+        self.setColor(configuration['color'])
+        self.setOpacity(self.baseOpacity)
+        self.setFormat(self.timeFormat)
+
+        self.dragger     = DragMover(self, snap=app.snap, parent=self)
+        self.move(configuration['x'], configuration['y'])
+
+        # Updated by the scheduler of the main application
+        app.ticker.watch(self.timeFormat, bytes(self.zone.id()))
+        app.ticker.tick.connect(self.showTime)
+        self.showTime()
+
+        size             = self.sizeHint()
+        self.setFixedSize(size.width()+5, size.height()+5)
+        self.show()
+
+    ###############################
+    #           Methods           #
+    ###############################
+
+    def configuration(self, *args, **kwargs):
+        '''Current configuration as written in the setting file.'''
+
+        return {'timezone' : bytes(self.zone.id()).decode(),
+                'format'   : self.timeFormat,
+                'font'     : self.font().toString(),
+                'color'    : self.color().name(),
+                'x'        : self.x(),
+                'y'        : self.y(),
+                'opacity'  : round(self.baseOpacity, 2)
+               }
+
+    def showTime(self, *args, **kwargs):
+        '''Update the time when value has changed.'''
+
+        if not self.app.visibility.seen(self):
+            return
+
+        now  = self.app.clock.dateTime()
+        self.setText(timing.formatTime(self.timeFormat, now.toMSecsSinceEpoch() + 1000*self.zone.offsetFromUtc(now)))
+        return
+
+    def closeEvent(self, event):
+        '''Stop being updated by the main application.'''
+
+        self.app.ticker.unwatch(self.timeFormat, bytes(self.zone.id()))
+        self.app.ticker.tick.disconnect(self.showTime)
+        self.app.visibility.remove(self)
+        super().closeEvent(event)
+        return
+
+    ############################################
+    #               Mouse events               #
+    ############################################
+
+    def mousePressEvent(self, event):
+
+        button = event.button()
+
+        if   button == 1:
+            self.dragger.start(event.globalPos())
+        elif button == 2:
+            self.app.close()
+        return
+
+    def mouseMoveEvent(self, event):
+        self.dragger.moveTo(event.globalPos())
+        return
+
+    def mouseReleaseEvent(self, event):
+
+        if event.button() == 1:
+            self.dragger.finish()
+            self.app.autosave.request()
+        return